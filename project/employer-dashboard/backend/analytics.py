@@ -0,0 +1,396 @@
+"""Salary and headcount analytics over a columnar in-memory copy of the employees table.
+
+Each server process keeps one NumPy array per column, in id order: salary
+as float64, hire_date as datetime64[D], and department and position as
+int32 codes into per-column dictionaries. Reports are vectorized group-bys
+over those arrays rather than loops over rows. NumPy is optional; without
+it the module still imports, and the /api/analytics handler answers 503.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date
+from models.employee_model import Employee
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+GROUP_COLUMNS = ('department', 'position')
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+MAX_PERCENTILES = 20
+MAX_HISTOGRAM_BINS = 200
+MAX_PROJECTION_MONTHS = 60
+INITIAL_CAPACITY = 1024
+
+class Dictionary:
+    """Dictionary encoding for a text column: each distinct value gets the next int code"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class EmployeeColumns:
+    """The employees table as parallel NumPy arrays, one slot per row in ascending id order.
+
+    Arrays grow by doubling. Deleted rows are only flagged in live and stay
+    until the next rebuild, so positions never move.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.deleted = 0
+        self.ids = np.empty(capacity, np.int64)
+        self.salary = np.empty(capacity, np.float64)
+        self.hire_date = np.empty(capacity, 'datetime64[D]')
+        self.department = np.empty(capacity, np.int32)
+        self.position = np.empty(capacity, np.int32)
+        self.live = np.zeros(capacity, bool)
+        self.departments = Dictionary()
+        self.positions = Dictionary()
+
+    def __len__(self):
+        return self.size - self.deleted
+
+    def _encode(self, rows):
+        count = len(rows)
+        return (
+            np.fromiter((row.id for row in rows), np.int64, count),
+            np.fromiter((row.salary for row in rows), np.float64, count),
+            np.array([row.hire_date for row in rows], 'datetime64[D]'),
+            np.fromiter((self.departments.encode(row.department) for row in rows), np.int32, count),
+            np.fromiter((self.positions.encode(row.position) for row in rows), np.int32, count),
+        )
+
+    def _reserve(self, count):
+        needed = self.size + count
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('ids', 'salary', 'hire_date', 'department', 'position', 'live'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype) if name == 'live' else np.empty(capacity, old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _locate(self, ids):
+        """Return (positions, found) of ids among the stored rows"""
+        positions = np.searchsorted(self.ids[:self.size], ids)
+        found = positions < self.size
+        found[found] = self.ids[positions[found]] == ids[found]
+        return positions, found
+
+    def append(self, rows):
+        """Add rows whose ids are all greater than any stored id, in id order"""
+        if not rows:
+            return
+        ids, salary, hire_date, department, position = self._encode(rows)
+        self._reserve(len(rows))
+        end = self.size + len(rows)
+        self.ids[self.size:end] = ids
+        self.salary[self.size:end] = salary
+        self.hire_date[self.size:end] = hire_date
+        self.department[self.size:end] = department
+        self.position[self.size:end] = position
+        self.live[self.size:end] = True
+        self.size = end
+
+    def upsert(self, rows):
+        """Insert or overwrite rows; returns False, changing nothing, if a new id sorts before a stored one"""
+        rows = list({row.id: row for row in rows}.values())
+        if not rows:
+            return True
+        ids, salary, hire_date, department, position = self._encode(rows)
+        positions, found = self._locate(ids)
+        new = ~found
+        if new.any() and self.size and ids[new].min() < self.ids[self.size - 1]:
+            return False
+
+        at = positions[found]
+        self.deleted -= int(np.count_nonzero(~self.live[at]))
+        self.salary[at] = salary[found]
+        self.hire_date[at] = hire_date[found]
+        self.department[at] = department[found]
+        self.position[at] = position[found]
+        self.live[at] = True
+
+        if new.any():
+            order = np.argsort(ids[new], kind='stable')
+            count = len(order)
+            self._reserve(count)
+            end = self.size + count
+            self.ids[self.size:end] = ids[new][order]
+            self.salary[self.size:end] = salary[new][order]
+            self.hire_date[self.size:end] = hire_date[new][order]
+            self.department[self.size:end] = department[new][order]
+            self.position[self.size:end] = position[new][order]
+            self.live[self.size:end] = True
+            self.size = end
+        return True
+
+    def remove(self, employee_ids):
+        if not employee_ids or not self.size:
+            return
+        ids = np.fromiter(employee_ids, np.int64, len(employee_ids))
+        positions, found = self._locate(ids)
+        at = positions[found]
+        self.deleted += int(np.count_nonzero(self.live[at]))
+        self.live[at] = False
+
+    def select(self, department=None, position=None):
+        """Return the mask of live rows in the given department and position"""
+        mask = self.live[:self.size].copy()
+        for column, dictionary, value in (('department', self.departments, department),
+                                          ('position', self.positions, position)):
+            if value is None:
+                continue
+            code = dictionary.codes.get(value)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= getattr(self, column)[:self.size] == code
+        return mask
+
+    def salary_percentiles(self, by=('department',), percentiles=DEFAULT_PERCENTILES, department=None, position=None):
+        """Salary distribution per group of the by columns (overall when by is empty)"""
+        mask = self.select(department, position)
+        groups, label = self._groups(by, mask)
+        codes, counts, sums, mins, maxs, quantiles = grouped_stats(groups, self.salary[:self.size][mask], percentiles)
+        names = [f"p{value:g}" for value in percentiles]
+        return [
+            {**label(code), 'headcount': count, 'salary_avg': round(total / count, 2),
+             'salary_min': low, 'salary_max': high, 'percentiles': dict(zip(names, row))}
+            for code, count, total, low, high, row in zip(codes.tolist(), counts.tolist(), sums.tolist(),
+                                                          _round(mins), _round(maxs), _round(quantiles))
+        ]
+
+    def tenure(self, by=(), department=None, position=None, as_of=None):
+        """Headcount, tenure and salary per hire-year cohort, oldest cohort first"""
+        as_of = np.datetime64(as_of or date.today(), 'D')
+        mask = self.select(department, position)
+        hired = self.hire_date[:self.size][mask]
+        years = hired.astype('datetime64[Y]').astype(np.int64) + 1970
+        first_year = int(years.min()) if len(years) else 0
+        cohorts = years - first_year
+        groups, label = self._groups(by, mask)
+        # Cohort varies fastest, so each group's cohorts come out in order
+        span = int(cohorts.max()) + 1 if len(cohorts) else 1
+        groups = groups * span + cohorts
+        codes, counts, salary_sums, _, _, medians = grouped_stats(groups, self.salary[:self.size][mask], (50,))
+        tenure_sums = np.bincount(groups, weights=(as_of - hired).astype(np.float64))[codes]
+        return [
+            {**label(code // span), 'cohort': first_year + code % span, 'headcount': count,
+             'tenure_years_avg': round(tenure / count / 365.25, 2), 'salary_avg': round(salary / count, 2),
+             'salary_median': median[0]}
+            for code, count, tenure, salary, median in zip(codes.tolist(), counts.tolist(), tenure_sums.tolist(),
+                                                           salary_sums.tolist(), _round(medians))
+        ]
+
+    def payroll_projection(self, months=12, annual_raise=3.0, by=(), department=None, position=None, as_of=None):
+        """Monthly payroll for the coming months, each salary rising by annual_raise percent on its hire anniversary"""
+        start = np.datetime64(as_of or date.today(), 'M')
+        mask = self.select(department, position)
+        hired = self.hire_date[:self.size][mask]
+        groups, label = self._groups(by, mask)
+        # Months from now until each employee's next anniversary, 1-12
+        hire_month = hired.astype('datetime64[M]').astype(np.int64) % 12
+        first_raise = (hire_month - int(start.astype(np.int64) % 12) - 1) % 12 + 1
+        codes = np.unique(groups)
+        index = np.searchsorted(codes, groups)
+        monthly = np.bincount(index * 12 + first_raise - 1, weights=self.salary[:self.size][mask] / 12,
+                              minlength=len(codes) * 12).reshape(len(codes), 12)
+        # raises[f - 1, k - 1]: anniversaries passed by month k for a first raise in month f
+        ahead = np.arange(1, months + 1)[None, :] - np.arange(1, 13)[:, None]
+        raises = np.where(ahead >= 0, ahead // 12 + 1, 0)
+        payroll = monthly @ (1 + annual_raise / 100) ** raises
+        labels = [str(start + offset) for offset in range(1, months + 1)]
+        projection = {'months': labels, 'total': _round(payroll.sum(axis=0))}
+        if by:
+            projection['groups'] = [{**label(code), 'payroll': row}
+                                    for code, row in zip(codes.tolist(), _round(payroll))]
+        return projection
+
+    def salary_histogram(self, bins=20, department=None, position=None):
+        """Salary counts in equal-width bins over the selected employees' salary range"""
+        salary = self.salary[:self.size][self.select(department, position)]
+        if not len(salary):
+            return {'edges': [], 'counts': [], 'headcount': 0}
+        counts, edges = np.histogram(salary, bins=bins)
+        return {'edges': _round(edges), 'counts': counts.tolist(), 'headcount': int(len(salary))}
+
+    def _groups(self, by, mask):
+        """Return a combined group code per selected row, and a function turning a code into its labels"""
+        if not by:
+            return np.zeros(int(np.count_nonzero(mask)), np.int64), lambda code: {}
+        dictionaries = [getattr(self, f"{column}s") for column in by]
+        sizes = [max(1, len(dictionary.values)) for dictionary in dictionaries]
+        groups = np.zeros(int(np.count_nonzero(mask)), np.int64)
+        for column, size in zip(by, sizes):
+            groups = groups * size + getattr(self, column)[:self.size][mask]
+
+        def label(code):
+            labels = {}
+            for column, dictionary, size in reversed(list(zip(by, dictionaries, sizes))):
+                code, value = divmod(code, size)
+                labels[column] = dictionary.values[value]
+            return {column: labels[column] for column in by}
+        return groups, label
+
+def grouped_stats(groups, values, percentiles=()):
+    """Vectorized per-group count, sum, min, max and linear-interpolated percentiles.
+
+    groups are non-negative int codes, one per value. Returns (codes,
+    counts, sums, mins, maxs, quantiles) with one entry per distinct code in
+    ascending order; quantiles has one column per requested percentile and
+    matches numpy.percentile's default method.
+    """
+    if not len(groups):
+        empty = np.empty(0, np.int64)
+        return empty, empty, np.empty(0), np.empty(0), np.empty(0), np.empty((0, len(percentiles)))
+    order = np.lexsort((values, groups))
+    groups = groups[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], len(groups)]
+    counts = ends - starts
+    sums = np.add.reduceat(values, starts)
+    mins = values[starts]
+    maxs = values[ends - 1]
+    fractions = np.asarray(percentiles, np.float64) / 100
+    ranks = starts[:, None] + (counts[:, None] - 1) * fractions[None, :]
+    low = np.floor(ranks).astype(np.int64)
+    high = np.ceil(ranks).astype(np.int64)
+    quantiles = values[low] + (values[high] - values[low]) * (ranks - low)
+    return groups[starts], counts, sums, mins, maxs, quantiles
+
+def _round(values):
+    return np.round(values, 2).tolist()
+
+class EmployeeAnalytics:
+    """Columnar analytics over the employees table, kept current incrementally.
+
+    Like the search index, each process keeps its own copy. Rows written
+    in this process are reloaded on the next report; rows written elsewhere
+    are found by polling updated_at at most every refresh_interval seconds,
+    and everything is rebuilt every rebuild_interval seconds to drop rows
+    deleted by other processes and reclaim deleted slots.
+    """
+
+    def __init__(self, refresh_interval=5.0, rebuild_interval=600.0):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._columns = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._changed = set()
+        self._deleted = set()
+        self._watermark = None
+        self._built_at = 0
+        self._synced_at = 0
+
+    @property
+    def available(self):
+        return np is not None
+
+    def mark_changed(self, employee_ids, deleted=False):
+        """Employee change listener; the rows are reloaded before the next report"""
+        with self._lock:
+            (self._deleted if deleted else self._changed).update(employee_ids)
+
+    def salary_percentiles(self, by=('department',), percentiles=DEFAULT_PERCENTILES, department=None, position=None):
+        columns = self._refresh()
+        with self._lock:
+            return columns.salary_percentiles(by, percentiles, department, position)
+
+    def tenure(self, by=(), department=None, position=None):
+        columns = self._refresh()
+        with self._lock:
+            return columns.tenure(by, department, position)
+
+    def payroll_projection(self, months=12, annual_raise=3.0, by=(), department=None, position=None):
+        columns = self._refresh()
+        with self._lock:
+            return columns.payroll_projection(months, annual_raise, by, department, position)
+
+    def salary_histogram(self, bins=20, department=None, position=None):
+        columns = self._refresh()
+        with self._lock:
+            return columns.salary_histogram(bins, department, position)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._columns is not None and now - self._built_at < self.rebuild_interval \
+                and not (self._changed or self._deleted) and now - self._synced_at < self.refresh_interval:
+            return self._columns
+        # Only one thread talks to the database; the others use the current snapshot
+        blocking = self._columns is None
+        if self._refresh_lock.acquire(blocking=blocking):
+            try:
+                if self._columns is None or time.monotonic() - self._built_at >= self.rebuild_interval:
+                    self._rebuild()
+                else:
+                    self._sync()
+            finally:
+                self._refresh_lock.release()
+        return self._columns
+
+    def _rebuild(self):
+        started = time.monotonic()
+        columns = EmployeeColumns()
+        watermark = None
+        for batch in Employee.iter_batches():
+            columns.append(batch)
+            for row in batch:
+                if row.updated_at and (watermark is None or row.updated_at > watermark):
+                    watermark = row.updated_at
+        with self._lock:
+            self._columns = columns
+            self._watermark = watermark
+        self._built_at = self._synced_at = time.monotonic()
+        logger.info("Built analytics columns over %d employees in %.2fs", len(columns), self._built_at - started)
+        # Catch writes made while the rows were being streamed
+        self._sync()
+
+    def _sync(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            deleted, self._deleted = self._deleted, set()
+        self._synced_at = time.monotonic()
+        try:
+            rows = Employee.get_updated_since(self._watermark)
+            if changed:
+                rows += Employee.get_rows_by_ids(changed)
+        except Exception:
+            with self._lock:
+                self._changed |= changed
+                self._deleted |= deleted
+            raise
+        found = {row.id for row in rows}
+        with self._lock:
+            self._columns.remove(list(deleted | (changed - found)))
+            if not self._columns.upsert(rows):
+                # Ids are assigned in increasing order, so this only follows manual inserts
+                self._built_at = 0
+            for row in rows:
+                if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                    self._watermark = row.updated_at
+
+employee_analytics = EmployeeAnalytics(
+    refresh_interval=float(os.getenv('ANALYTICS_REFRESH_INTERVAL', 5)),
+    rebuild_interval=float(os.getenv('ANALYTICS_REBUILD_INTERVAL', 600)),
+)
+if np is not None:
+    Employee.add_change_listener(employee_analytics.mark_changed)
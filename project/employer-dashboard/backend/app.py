@@ -1,29 +1,247 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+import tornado.httpserver
 import tornado.ioloop
+import tornado.netutil
+import tornado.process
 import tornado.web
-from handlers.employee_handler import EmployeeHandler, EmployeeDetailHandler
-from handlers.auth_handler import LoginHandler
+from tornado.log import access_log
+from compression import ResponseCompression
+from handlers.analytics_handler import AnalyticsHandler
+from handlers.base_handler import BaseHandler
+from handlers.employee_handler import (EmployeeHandler, EmployeeDetailHandler, EmployeeExportHandler, EmployeeBulkHandler,
+                                       EmployeeBatchHandler, EmployeeSearchHandler)
+from handlers.auth_handler import LoginHandler, LogoutHandler, TokenRefreshHandler
+from handlers.feed_handler import ChangeFeedHandler
+from handlers.metrics_handler import MetricsHandler
 from handlers.profile_handler import ProfileHandler
+from handlers.stats_handler import StatsHandler
+from logs import configure_logging
+from metrics import record_request
 
-class MainHandler(tornado.web.RequestHandler):
+logger = logging.getLogger(__name__)
+
+# Connections per server left free for admin tools, migrations and replicas
+RESERVED_DB_CONNECTIONS = 10
+# Seconds between trimming the change log down to FEED_RETENTION entries
+# and dropping revocations of tokens that have expired
+CHANGE_PRUNE_INTERVAL = 60
+
+class MainHandler(BaseHandler):
     def get(self):
         self.write("Employer Dashboard API is running!")
 
+def log_request(handler):
+    """Record every request's latency; only failed requests are logged by default"""
+    record_request(handler)
+    status = handler.get_status()
+    if status < 400:
+        log = access_log.info
+    elif status < 500:
+        log = access_log.warning
+    else:
+        log = access_log.error
+    log("%d %s %s (%s) %.2fms", status, handler.request.method, handler.request.uri,
+        handler.request.remote_ip, 1000.0 * handler.request.request_time())
+
 def make_app():
     return tornado.web.Application([
         (r"/", MainHandler),
         (r"/api/login", LoginHandler),
+        (r"/api/logout", LogoutHandler),
+        (r"/api/token/refresh", TokenRefreshHandler),
         (r"/api/employees", EmployeeHandler),
+        (r"/api/employees/export", EmployeeExportHandler),
+        (r"/api/employees/bulk", EmployeeBulkHandler),
+        (r"/api/employees/batch", EmployeeBatchHandler),
+        (r"/api/employees/search", EmployeeSearchHandler),
+        (r"/api/employees/changes", ChangeFeedHandler),
         (r"/api/employees/([0-9]+)", EmployeeDetailHandler),
         (r"/api/profile/([0-9]+)", ProfileHandler),
-    ])
+        (r"/api/stats", StatsHandler),
+        (r"/api/analytics", AnalyticsHandler),
+        (r"/metrics", MetricsHandler),
+    ], log_function=log_request, transforms=[ResponseCompression],
+        # Finds change feed clients that vanished without closing their connection
+        websocket_ping_interval=float(os.getenv('FEED_PING_INTERVAL', 30)))
 
-if __name__ == "__main__":
-    # Initialize database tables once
+def pool_size_per_worker(db, workers):
+    """Split the connection budget so all workers together stay under MySQL's max_connections"""
+    requested = db.pool.max_size
+    budget = os.getenv('DB_MAX_CONNECTIONS')
+    budget = int(budget) if budget else None
+    server_limit = db.get_max_connections()
+    if server_limit:
+        server_budget = server_limit - RESERVED_DB_CONNECTIONS
+        budget = min(budget, server_budget) if budget else server_budget
+    if budget is None:
+        return requested
+    return max(1, min(requested, budget // workers))
+
+async def reconcile_stats():
+    from db_executor import db_executor, DatabaseBusyError
+    from models.stats_model import EmployeeStats
+
+    try:
+        await db_executor.run(EmployeeStats.reconcile)
+    except DatabaseBusyError:
+        logger.warning("Skipping stats reconciliation: database is busy")
+    except Exception as e:
+        logger.error("Stats reconciliation failed: %s", e)
+
+async def prune_changes(keep):
+    from db_executor import db_executor, DatabaseBusyError
+    from models.change_model import EmployeeChanges
+
+    try:
+        await db_executor.run(EmployeeChanges.prune, keep)
+    except DatabaseBusyError:
+        logger.warning("Skipping change log pruning: database is busy")
+    except Exception as e:
+        logger.error("Change log pruning failed: %s", e)
+
+async def sync_revocations():
+    from auth_tokens import revoked_tokens
+    from db_executor import db_executor, DatabaseBusyError
+
+    try:
+        await db_executor.run(revoked_tokens.sync)
+    except DatabaseBusyError:
+        logger.warning("Skipping token revocation sync: database is busy")
+    except Exception as e:
+        logger.error("Token revocation sync failed: %s", e)
+
+async def prune_revocations():
+    from db_executor import db_executor, DatabaseBusyError
+    from models.token_model import RevokedTokens
+
+    try:
+        await db_executor.run(RevokedTokens.prune, int(time.time()))
+    except DatabaseBusyError:
+        logger.warning("Skipping revoked token pruning: database is busy")
+    except Exception as e:
+        logger.error("Revoked token pruning failed: %s", e)
+
+async def serve(sockets, shutdown_timeout, reconcile_interval=0, metrics_port=None, feed_retention=0,
+                revocation_sync_interval=1):
+    from audit import audit_writer
     from db import db
+    from db_executor import db_executor
+    from search_index import employee_search
+
+    server = tornado.httpserver.HTTPServer(make_app())
+    server.add_sockets(sockets)
+    # Each worker builds its own search index, before the first search needs it
+    employee_search.start()
+
+    # Metrics are per process, so with several workers each one also serves
+    # them on its own port for scrapers to target individually
+    metrics_server = None
+    if metrics_port:
+        metrics_server = tornado.httpserver.HTTPServer(tornado.web.Application([(r"/metrics", MetricsHandler)]))
+        metrics_server.listen(metrics_port + (tornado.process.task_id() or 0))
+
+    # One process is enough to correct rollup drift for everybody
+    reconciler = None
+    if reconcile_interval > 0 and tornado.process.task_id() in (None, 0):
+        reconciler = tornado.ioloop.PeriodicCallback(reconcile_stats, reconcile_interval * 1000)
+        reconciler.start()
+    pruner = None
+    if feed_retention > 0 and tornado.process.task_id() in (None, 0):
+        pruner = tornado.ioloop.PeriodicCallback(lambda: prune_changes(feed_retention), CHANGE_PRUNE_INTERVAL * 1000)
+        pruner.start()
+    revocation_pruner = None
+    if tornado.process.task_id() in (None, 0):
+        revocation_pruner = tornado.ioloop.PeriodicCallback(prune_revocations, CHANGE_PRUNE_INTERVAL * 1000)
+        revocation_pruner.start()
+
+    # Tokens revoked before this process started, e.g. before a restart
+    await sync_revocations()
+    # Workers check tokens against their own copy, so each one pulls in the others' revocations
+    revocation_sync = None
+    if tornado.process.task_id() is not None:
+        revocation_sync = tornado.ioloop.PeriodicCallback(sync_revocations, revocation_sync_interval * 1000)
+        revocation_sync.start()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    await stopping.wait()
+
+    # Stop accepting connections, then give in-flight requests time to finish
+    if reconciler:
+        reconciler.stop()
+    if pruner:
+        pruner.stop()
+    if revocation_pruner:
+        revocation_pruner.stop()
+    if revocation_sync:
+        revocation_sync.stop()
+    server.stop()
+    for feed in list(ChangeFeedHandler.connections):
+        feed.close(1001, "Server shutting down")
+    if metrics_server:
+        metrics_server.stop()
+    deadline = time.monotonic() + shutdown_timeout
+    while BaseHandler.in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if BaseHandler.in_flight:
+        logger.warning("Shutting down with %d requests still running", BaseHandler.in_flight)
+    await server.close_all_connections()
+    # Write out queued audit events while the connection pool is still open
+    await loop.run_in_executor(None, audit_writer.close)
+    db_executor.shutdown(wait=False)
+    db.close_all()
+
+def main():
+    from db import db
+    from db_executor import db_executor
+    from models.stats_model import EmployeeStats
+
+    port = int(os.getenv('PORT', 8000))
+    workers = int(os.getenv('WEB_WORKERS', 1)) or tornado.process.cpu_count()
+    shutdown_timeout = float(os.getenv('SHUTDOWN_TIMEOUT', 30))
+    reconcile_interval = float(os.getenv('STATS_RECONCILE_INTERVAL', 3600))
+    metrics_port = int(os.getenv('METRICS_PORT', 0)) or None
+    feed_retention = int(os.getenv('FEED_RETENTION', 100000))
+    revocation_sync_interval = float(os.getenv('REVOCATION_SYNC_INTERVAL', 1))
+    configure_logging()
+
+    # Apply schema migrations once, in the parent, before any worker starts
     db.initialize_database()
-    
-    app = make_app()
-    port = 8000
-    app.listen(port)
-    print(f"Server running on http://localhost:{port}")
-    tornado.ioloop.IOLoop.current().start()
\ No newline at end of file
+    EmployeeStats.ensure_populated()
+    pool_size = pool_size_per_worker(db, workers) if workers > 1 else db.pool.max_size
+    # Forked workers must not inherit (and share) the parent's MySQL sockets
+    db.close_all()
+
+    sockets = tornado.netutil.bind_sockets(port)
+    if workers > 1:
+        # Pass SIGINT/SIGTERM on to the workers so each one drains before
+        # exiting; the parent exits once they all have
+        def forward(signum, frame):
+            signal.signal(signum, signal.SIG_IGN)
+            if os.getpgid(0) == os.getpid():
+                os.killpg(os.getpid(), signum)
+            else:
+                # Not a process group leader, so we can't reach the workers as a group
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+        signal.signal(signal.SIGINT, forward)
+        signal.signal(signal.SIGTERM, forward)
+        logger.info("Starting %d workers with up to %d database connections each", workers, pool_size)
+        tornado.process.fork_processes(workers)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        db.configure_pool(pool_size)
+        db_executor.resize(min(db_executor.max_workers, pool_size))
+
+    logger.info("Server running on http://localhost:%d", port)
+    asyncio.run(serve(sockets, shutdown_timeout, reconcile_interval, metrics_port, feed_retention,
+                      revocation_sync_interval))
+
+if __name__ == "__main__":
+    main()
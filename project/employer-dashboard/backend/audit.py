@@ -0,0 +1,202 @@
+"""Background, batched writes of the employee_history audit trail.
+
+Model writes hand their events to audit_writer.record() once they have
+committed. That only appends to a bounded in-memory queue; a writer thread
+inserts the queue into employee_history with multi-row INSERTs whenever
+AUDIT_BATCH_SIZE events are waiting or the oldest has waited
+AUDIT_FLUSH_INTERVAL seconds, so requests never wait on the history table.
+The trade-off is durability: events still queued when a process is killed
+are lost, and a full queue drops new events rather than slowing committed
+writes down. Bulk imports avoid filling it by calling wait_for_room()
+before each chunk commits. Drops show up in the audit_* gauges on /metrics.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from db import current_session
+from metrics import AUDIT_FLUSH_DURATION, register_stats
+from models.history_model import EmployeeHistory
+
+logger = logging.getLogger(__name__)
+
+DROP_LOG_INTERVAL = 10
+
+class AuditWriter:
+    """A bounded queue of audit events and the thread that writes them out.
+
+    The thread starts on the first record(), so each forked worker runs its
+    own. close() writes out whatever is queued; it also runs at interpreter
+    exit for scripts that never call it.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=1.0, drain_timeout=10.0,
+                 enqueue_timeout=30.0):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self.enqueue_timeout = enqueue_timeout
+        # (monotonic time queued, history row), oldest first
+        self._queue = deque()
+        self._condition = threading.Condition()
+        # Same lock; wait_for_room() waits on it for the writer to free up room
+        self._not_full = threading.Condition(self._condition)
+        # Events taken off the queue by the writer and not yet written; they
+        # still count against max_queue so a failed batch always fits back in
+        self._writing = 0
+        self._thread = None
+        self._closing = False
+        self._recorded = 0
+        self._written = 0
+        self._waits = 0
+        self._dropped = 0
+        # Drops are logged at most once per DROP_LOG_INTERVAL seconds
+        self._unlogged_drops = 0
+        self._next_drop_log = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+
+    def record(self, events):
+        """Queue (employee_id, action, changes) events on behalf of the current session.
+
+        Never touches the database and never waits, since the write it
+        describes has already committed. Events that don't fit in the queue
+        are dropped and counted.
+        """
+        if not events:
+            return
+        actor_id = current_session.get()
+        changed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        queued_at = time.monotonic()
+        with self._condition:
+            room = 0 if self._closing else max(0, self._room())
+            if room < len(events):
+                self._drop(len(events) - room)
+                events = events[:room]
+            was_empty = not self._queue
+            self._queue.extend((queued_at, (employee_id, action, actor_id, changes, changed_at))
+                               for employee_id, action, changes in events)
+            self._recorded += len(events)
+            if self._thread is None and not self._closing:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            # The writer sleeps until the queue has something in it, then until a batch is due
+            if was_empty or len(self._queue) >= self.batch_size:
+                self._condition.notify()
+
+    def wait_for_room(self, count, timeout=None):
+        """Wait until count more events fit in the queue; returns False if they don't within timeout seconds.
+
+        For writers that can hold back before committing, such as bulk
+        imports, so their record() calls never overflow the queue. Counts
+        above max_queue wait for an empty queue.
+        """
+        count = min(count, self.max_queue)
+        deadline = time.monotonic() + (self.enqueue_timeout if timeout is None else timeout)
+        with self._condition:
+            while self._room() < count and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._waits += 1
+                self._not_full.wait(remaining)
+            return True
+
+    def _room(self):
+        # Events being written still count, so a failed batch always fits back in
+        return self.max_queue - len(self._queue) - self._writing
+
+    def _drop(self, count):
+        self._dropped += count
+        self._unlogged_drops += count
+        now = time.monotonic()
+        if now >= self._next_drop_log:
+            logger.warning("Audit queue is full; dropped %d events", self._unlogged_drops)
+            self._unlogged_drops = 0
+            self._next_drop_log = now + DROP_LOG_INTERVAL
+
+    def close(self, timeout=None):
+        """Write out the queue, waiting up to timeout (default drain_timeout) seconds; returns False if events remain"""
+        with self._condition:
+            self._closing = True
+            thread = self._thread
+            self._condition.notify()
+            self._not_full.notify_all()
+        if thread is None:
+            return True
+        thread.join(self.drain_timeout if timeout is None else timeout)
+        if thread.is_alive():
+            logger.warning("Shutting down with %d audit events unwritten", len(self._queue))
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._queue) < self.batch_size and not self._closing:
+                    if not self._queue:
+                        self._condition.wait()
+                        continue
+                    remaining = self._queue[0][0] + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if not self._queue:
+                    # Closing, and everything has been written
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._writing = len(batch)
+            if self._flush(batch):
+                with self._condition:
+                    self._writing = 0
+                    self._not_full.notify_all()
+                continue
+            with self._condition:
+                # Put the batch back in front for the retry; its room was held for it
+                self._writing = 0
+                self._queue.extendleft(reversed(batch))
+            time.sleep(self.flush_interval)
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        try:
+            EmployeeHistory.write([row for _, row in batch])
+        except Exception as e:
+            # Keep the thread alive through database outages; the batch is retried
+            self._failed_flushes += 1
+            logger.error("Writing %d audit events failed: %s", len(batch), e)
+            return False
+        AUDIT_FLUSH_DURATION.observe(time.perf_counter() - started)
+        self._flushes += 1
+        self._written += len(batch)
+        return True
+
+    def stats(self):
+        with self._condition:
+            queued = len(self._queue)
+            oldest = self._queue[0][0] if self._queue else None
+        return {
+            'queued': queued,
+            'max_queue': self.max_queue,
+            'oldest_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else 0,
+            'recorded': self._recorded,
+            'written': self._written,
+            'waits': self._waits,
+            'dropped': self._dropped,
+            'flushes': self._flushes,
+            'failed_flushes': self._failed_flushes,
+        }
+
+audit_writer = AuditWriter(
+    max_queue=int(os.getenv('AUDIT_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('AUDIT_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('AUDIT_FLUSH_INTERVAL', 1)),
+    drain_timeout=float(os.getenv('AUDIT_DRAIN_TIMEOUT', 10)),
+    enqueue_timeout=float(os.getenv('AUDIT_ENQUEUE_TIMEOUT', 30)),
+)
+register_stats('audit', 'Audit trail writer', audit_writer.stats)
@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from models.token_model import RevokedTokens
+
+ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', 15 * 60))
+REFRESH_TOKEN_TTL = int(os.getenv('REFRESH_TOKEN_TTL', 7 * 24 * 3600))
+# Revoked ids a sync reads again in case an earlier insert committed late
+SYNC_OVERLAP = 1000
+
+_secret = os.getenv('AUTH_SECRET')
+if not _secret:
+    logging.getLogger(__name__).warning("AUTH_SECRET is not set; using a random key, so tokens won't survive a "
+                                        "restart or be accepted by other server processes")
+    _secret = os.urandom(32).hex()
+SECRET = _secret.encode()
+
+class TokenError(Exception):
+    """Raised for malformed, forged, expired or revoked tokens"""
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=')
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
+
+# Tokens are JWTs signed with HS256; the header never changes
+_HEADER = _b64encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+
+def _sign(signing_input):
+    return _b64encode(hmac.new(SECRET, signing_input, hashlib.sha256).digest())
+
+class RevocationList:
+    """In-memory set of revoked token ids, each kept only until its token would expire anyway.
+
+    Tokens are checked against this set alone, without a database round
+    trip. The revoked_tokens table is the shared copy: revoke_token() writes
+    to both, and sync() pulls in what other processes revoked.
+    """
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0
+        self._last_id = 0
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self):
+        """Mirror revocations recorded in the revoked_tokens table since the last sync"""
+        # Auto-increment ids can commit out of order, so a window of recent ids is read again
+        rows = RevokedTokens.get_since(max(0, self._last_id - SYNC_OVERLAP), int(time.time()))
+        with self._lock:
+            for row_id, jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+                self._last_id = max(self._last_id, row_id)
+        return len(rows)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        if now >= self._next_prune:
+            self._prune(now)
+        return jti in self._revoked
+
+    def _prune(self, now):
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._next_prune = now + 60
+
+    def __len__(self):
+        return len(self._revoked)
+
+revoked_tokens = RevocationList()
+
+def issue_token(user, token_type='access'):
+    """Issue a signed token carrying the user's id, role and employee_id"""
+    now = int(time.time())
+    ttl = ACCESS_TOKEN_TTL if token_type == 'access' else REFRESH_TOKEN_TTL
+    claims = {
+        'sub': user.id,
+        'role': user.role,
+        'emp': user.employee_id,
+        'typ': token_type,
+        'iat': now,
+        'exp': now + ttl,
+        'jti': uuid.uuid4().hex,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    signing_input = _HEADER + b'.' + payload
+    return (signing_input + b'.' + _sign(signing_input)).decode()
+
+def issue_token_pair(user):
+    return {
+        'access_token': issue_token(user, 'access'),
+        'refresh_token': issue_token(user, 'refresh'),
+        'token_type': 'Bearer',
+        'expires_in': ACCESS_TOKEN_TTL,
+    }
+
+def verify_token(token, expected_type='access'):
+    """Return the token's claims, raising TokenError unless it is valid, current and unrevoked"""
+    try:
+        header, payload, signature = token.encode().split(b'.')
+    except (AttributeError, ValueError):
+        raise TokenError("Malformed token")
+    if header != _HEADER or not hmac.compare_digest(signature, _sign(header + b'.' + payload)):
+        raise TokenError("Invalid token signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise TokenError("Malformed token")
+    if claims.get('typ') != expected_type:
+        raise TokenError(f"Expected a {expected_type} token")
+    if claims.get('exp', 0) <= time.time():
+        raise TokenError("Token has expired")
+    if revoked_tokens.is_revoked(claims.get('jti')):
+        raise TokenError("Token has been revoked")
+    return claims
+
+def revoke_token(claims):
+    """Revoke a token in this process and in the shared list; returns False if it had already been revoked.
+
+    Writes to the database, so call it through run_db.
+    """
+    revoked_tokens.revoke(claims['jti'], claims['exp'])
+    return RevokedTokens.revoke(claims['jti'], claims['exp'])
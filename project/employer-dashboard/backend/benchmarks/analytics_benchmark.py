@@ -0,0 +1,92 @@
+"""Measure /api/analytics report latency over a synthetic columnar snapshot.
+
+Loads generated employees into the same EmployeeColumns the analytics
+endpoint uses (no database needed), in the batch size the export cursor
+reads, then times each report, printing one JSON object per report:
+
+    python benchmarks/analytics_benchmark.py --employees 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import EmployeeColumns, np
+from models.employee_model import EXPORT_BATCH_SIZE, EmployeeRow
+
+DEPARTMENTS = ['Engineering', 'Marketing', 'Sales', 'Finance', 'Human Resources', 'Operations', 'Legal', 'Support']
+POSITIONS = ['Engineer', 'Senior Engineer', 'Manager', 'Director', 'Analyst', 'Coordinator', 'Specialist', 'Associate']
+
+def make_batches(count, seed):
+    rng = random.Random(seed)
+    first_hire = date(2000, 1, 1)
+    for start in range(1, count + 1, EXPORT_BATCH_SIZE):
+        yield [
+            EmployeeRow(id=employee_id, name=None, email=None, position=rng.choice(POSITIONS),
+                        department=rng.choice(DEPARTMENTS), salary=float(rng.randrange(30000, 250000)),
+                        hire_date=first_hire + timedelta(days=rng.randrange(9000)), created_at=None, updated_at=None)
+            for employee_id in range(start, min(start + EXPORT_BATCH_SIZE, count + 1))
+        ]
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=1000000, help='number of generated employees')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per report')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("The analytics benchmark needs numpy")
+
+    batches = list(make_batches(args.employees, args.seed))
+    started = time.perf_counter()
+    columns = EmployeeColumns()
+    for batch in batches:
+        columns.append(batch)
+    print(json.dumps({
+        'employees': len(columns),
+        'build_s': round(time.perf_counter() - started, 2),
+        'bytes': sum(getattr(columns, name).nbytes
+                     for name in ('ids', 'salary', 'hire_date', 'department', 'position', 'live')),
+    }))
+
+    # One batch of edits through the incremental path
+    rng = random.Random(args.seed)
+    edits = [row._replace(salary=row.salary * 1.05) for row in rng.choice(batches)]
+    started = time.perf_counter()
+    columns.upsert(edits)
+    print(json.dumps({'kind': 'upsert', 'rows': len(edits), 'ms': round((time.perf_counter() - started) * 1000, 3)}))
+
+    reports = {
+        'percentiles_by_department': lambda: columns.salary_percentiles(('department',)),
+        'percentiles_by_department_position': lambda: columns.salary_percentiles(('department', 'position')),
+        'percentiles_filtered': lambda: columns.salary_percentiles(('position',), department='Engineering'),
+        'tenure_by_department': lambda: columns.tenure(('department',)),
+        'projection_36_months': lambda: columns.payroll_projection(36, 3.0, ('department',)),
+        'histogram_50_bins': lambda: columns.salary_histogram(50),
+    }
+    for kind, report in reports.items():
+        latencies = []
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            result = report()
+            latencies.append(time.perf_counter() - begin)
+        latencies.sort()
+        print(json.dumps({
+            'kind': kind,
+            'runs': args.repeat,
+            'groups': len(result) if isinstance(result, list) else len(result.get('groups', result.get('counts', []))),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3),
+        }))
+
+if __name__ == '__main__':
+    main()
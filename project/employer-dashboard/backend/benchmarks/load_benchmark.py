@@ -0,0 +1,190 @@
+"""Drive a running API server at fixed concurrency and report throughput and latency percentiles.
+
+Seed the server's database first with seed_employees.py, start the server
+(python app.py), then run one or more scenarios against it. Each scenario
+gets a warm-up period that is not measured, then runs --concurrency
+requests in flight for --duration seconds. One JSON object is printed per
+scenario, and --output also writes the whole run, including its
+configuration, to a file for comparing against a baseline:
+
+    python benchmarks/load_benchmark.py --scenarios list get profile login bulk --concurrency 32
+
+Scenarios:
+    list_all  GET /api/employees (the unpaginated listing; avoid at 1M rows)
+    list      GET /api/employees?limit=50, filtered by a random department half the time
+    get       GET /api/employees/{id} for random ids
+    profile   GET /api/profile/{id} for random ids
+    login     POST /api/login as a random load-test user
+    bulk      POST /api/employees/bulk with --bulk-size new employees (grows the table)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed_employees import DEFAULT_PASSWORD, DEPARTMENTS, USERNAME_PATTERN, make_employee
+
+SCENARIOS = ('list_all', 'list', 'get', 'profile', 'login', 'bulk')
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.url = args.url.rstrip('/')
+        self.rng = random.Random(args.seed)
+        self.run_id = uuid.uuid4().hex[:8]
+        self.bulk_count = 0
+        self.token = None
+        self.min_id = self.max_id = None
+        self.client = AsyncHTTPClient(max_clients=args.concurrency)
+
+    async def fetch(self, method, path, body=None, auth=True):
+        headers = {'Content-Type': 'application/json'}
+        if auth:
+            headers['Authorization'] = f"Bearer {self.token}"
+        request = HTTPRequest(self.url + path, method=method, headers=headers,
+                              body=json.dumps(body) if body is not None else None,
+                              request_timeout=self.args.timeout)
+        return await self.client.fetch(request, raise_error=False)
+
+    async def prepare(self):
+        """Log in as the admin and find the range of employee ids to sample from"""
+        response = await self.fetch('POST', '/api/login', {
+            'username': self.args.username, 'password': self.args.admin_password
+        }, auth=False)
+        if response.code != 200:
+            raise SystemExit(f"Admin login failed with status {response.code}")
+        self.token = json.loads(response.body)['access_token']
+
+        ids = []
+        for order in ('asc', 'desc'):
+            response = await self.fetch('GET', f"/api/employees?limit=1&sort=id&order={order}")
+            employees = json.loads(response.body)['employees'] if response.code == 200 else []
+            ids.extend(employee['id'] for employee in employees)
+        if not ids:
+            raise SystemExit("No employees found; run seed_employees.py first")
+        self.min_id, self.max_id = min(ids), max(ids)
+
+        response = await self.fetch('GET', '/api/stats')
+        return json.loads(response.body)['total_employees'] if response.code == 200 else None
+
+    def next_request(self, scenario):
+        """Return (method, path, body, auth) for one request of the scenario"""
+        rng = self.rng
+        if scenario == 'list_all':
+            return 'GET', '/api/employees', None, True
+        if scenario == 'list':
+            path = f"/api/employees?limit={self.args.page_size}"
+            if rng.random() < 0.5:
+                path += f"&department={rng.choice(DEPARTMENTS).replace(' ', '+')}"
+            return 'GET', path, None, True
+        if scenario == 'get':
+            return 'GET', f"/api/employees/{rng.randint(self.min_id, self.max_id)}", None, True
+        if scenario == 'profile':
+            return 'GET', f"/api/profile/{rng.randint(self.min_id, self.max_id)}", None, True
+        if scenario == 'login':
+            username = USERNAME_PATTERN.format(rng.randrange(self.args.users))
+            return 'POST', '/api/login', {'username': username, 'password': self.args.password}, False
+        if scenario == 'bulk':
+            rows = []
+            for _ in range(self.args.bulk_size):
+                row = make_employee(self.bulk_count, self.args.seed)
+                row['email'] = f"loadbench-{self.run_id}-{self.bulk_count}@example.com"
+                rows.append(row)
+                self.bulk_count += 1
+            return 'POST', '/api/employees/bulk', rows, True
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    async def run(self, scenario, duration, record):
+        latencies = []
+        statuses = {}
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                method, path, body, auth = self.next_request(scenario)
+                begin = time.perf_counter()
+                response = await self.fetch(method, path, body, auth)
+                latencies.append(time.perf_counter() - begin)
+                statuses[response.code] = statuses.get(response.code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        if not record:
+            return None
+
+        latencies.sort()
+        # 599 is the client's own code for timeouts and connection errors
+        errors = sum(count for code, count in statuses.items() if code >= 500 or code in (400, 401, 403))
+        return {
+            'scenario': scenario,
+            'concurrency': self.args.concurrency,
+            'duration_s': round(elapsed, 2),
+            'requests': len(latencies),
+            'requests_per_sec': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+            'errors': errors,
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000', help='base URL of the running server')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=['list', 'get', 'profile', 'login', 'bulk'])
+    parser.add_argument('--concurrency', type=int, default=16, help='requests in flight at once')
+    parser.add_argument('--duration', type=float, default=30.0, help='measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=5.0, help='unmeasured seconds before each scenario')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--page-size', type=int, default=50, help='limit for the list scenario')
+    parser.add_argument('--bulk-size', type=int, default=100, help='employees per bulk request')
+    parser.add_argument('--users', type=int, default=50, help='load-test logins created by seed_employees.py')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='password of the load-test logins')
+    parser.add_argument('--username', default='admin', help='admin account used for the authenticated scenarios')
+    parser.add_argument('--admin-password', default=os.getenv('LOADTEST_ADMIN_PASSWORD', 'admin123'))
+    parser.add_argument('--seed', type=int, default=1, help='seed for the request mix')
+    parser.add_argument('--output', help='also write the configuration and all results to this JSON file')
+    args = parser.parse_args()
+
+    test = LoadTest(args)
+    employees = await test.prepare()
+    config = {
+        'url': args.url,
+        'employees': employees,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'warmup_s': args.warmup,
+        'seed': args.seed,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+    results = []
+    for scenario in args.scenarios:
+        if args.warmup > 0:
+            await test.run(scenario, args.warmup, record=False)
+        result = await test.run(scenario, args.duration, record=True)
+        result['employees'] = employees
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Measure password verification throughput for a range of scrypt costs.
+
+Runs verifications concurrently on the same KDF pool LoginHandler uses and
+prints one JSON object per cost, so SCRYPT_N can be picked against a target
+number of logins per second:
+
+    python benchmarks/login_benchmark.py --costs 13 14 15 --target 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords
+
+async def run_cost(log_n, duration, concurrency):
+    stored = passwords.hash_password('benchmark-password', n=2 ** log_n)
+    started = time.perf_counter()
+    passwords.verify_password('benchmark-password', stored)
+    single = time.perf_counter() - started
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            begin = time.perf_counter()
+            await passwords.verify_password_async('benchmark-password', stored)
+            latencies.append(time.perf_counter() - begin)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'scrypt_n': 2 ** log_n,
+        'single_verify_ms': round(single * 1000, 2),
+        'logins': len(latencies),
+        'logins_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--costs', type=int, nargs='+', default=[13, 14, 15],
+                        help='log2 of the scrypt N parameters to try')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds to run each cost')
+    parser.add_argument('--concurrency', type=int, default=(os.cpu_count() or 1) * 2,
+                        help='logins in flight at once')
+    parser.add_argument('--target', type=float, help='required logins per second')
+    args = parser.parse_args()
+
+    results = []
+    for log_n in args.costs:
+        result = await run_cost(log_n, args.duration, args.concurrency)
+        if args.target:
+            result['meets_target'] = result['logins_per_sec'] >= args.target
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.target:
+        passing = [r['scrypt_n'] for r in results if r['meets_target']]
+        print(json.dumps({'target_logins_per_sec': args.target,
+                          'recommended_scrypt_n': max(passing) if passing else None}))
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Measure the memory an employee listing holds before and after tuple-backed rows.
+
+Builds the same synthetic listing the way the models used to (dictionary
+cursor rows, converted to dicts with the old row_to_dict) and the way they
+do now (plain cursor tuples wrapped in EmployeeRow, encoded only when the
+response is written), and reports with tracemalloc the bytes each retained
+employee costs and the peak memory and live allocations of one request,
+printing one JSON object per representation:
+
+    python benchmarks/memory_benchmark.py --rows 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.employee_model import EMPLOYEE_COLUMNS, fetch_rows
+from serialization import dumps, encode_employees
+
+class FakeCursor:
+    """Builds fresh column values for every fetch, as the connector does"""
+
+    def __init__(self, count, dictionary=False):
+        self.count = count
+        self.dictionary = dictionary
+
+    def fetchall(self):
+        rows = make_rows(self.count)
+        if self.dictionary:
+            return [dict(zip(EMPLOYEE_COLUMNS, row)) for row in rows]
+        return rows
+
+def make_rows(count):
+    created = datetime(2024, 1, 1, 9, 30)
+    return [(
+        i,
+        f"Employee {i}",
+        f"employee{i}@example.com",
+        'Engineer',
+        'Engineering',
+        Decimal('85000.00') + i,
+        date(2020, 1, 1) + timedelta(days=i % 1500),
+        created + timedelta(minutes=i),
+        created + timedelta(minutes=i, seconds=30),
+    ) for i in range(1, count + 1)]
+
+def legacy_row_to_dict(row):
+    # Employee.row_to_dict before rows were kept as tuples
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'email': row['email'],
+        'position': row['position'],
+        'department': row['department'],
+        'salary': float(row['salary']) if row['salary'] is not None else 0.0,
+        'hire_date': row['hire_date'].strftime('%Y-%m-%d') if isinstance(row['hire_date'], datetime) else str(row['hire_date']),
+        'created_at': row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if row['created_at'] else None,
+        'updated_at': row['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if row['updated_at'] else None
+    }
+
+def load_dicts(count):
+    return [legacy_row_to_dict(row) for row in FakeCursor(count, dictionary=True).fetchall()]
+
+def load_tuples(count):
+    return fetch_rows(FakeCursor(count))
+
+def traced(function, *args):
+    """Run function, returning (result, bytes it still holds, peak bytes, memory blocks it still holds)"""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    return result, current, peak, blocks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help='employees in the listing')
+    args = parser.parse_args()
+
+    paths = {
+        'dict_rows': (load_dicts, lambda rows: json.dumps(rows, default=str).encode()),
+        'tuple_rows': (load_tuples, lambda rows: dumps(encode_employees(rows))),
+    }
+    for name, (load, encode) in paths.items():
+        rows, held, _, _ = traced(load, args.rows)
+        del rows
+        # One request: fetch the listing and encode the response body, both
+        # still alive when the body is written
+        _, _, peak, blocks = traced(lambda: (lambda rows: (rows, encode(rows)))(load(args.rows)))
+        print(json.dumps({
+            'rows': name,
+            'employees': args.rows,
+            'bytes_per_employee': round(held / args.rows),
+            'request_peak_mb': round(peak / 2 ** 20, 1),
+            'request_blocks': blocks,
+        }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Measure employee search latency against a synthetic in-memory index.
+
+Builds the same TermIndex the /api/employees/search endpoint uses from
+generated employees (no database needed) and times uncached queries of
+each kind, printing one JSON object per kind:
+
+    python benchmarks/search_benchmark.py --employees 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.employee_model import EmployeeRow
+from search_index import TermIndex, tokenize
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Wei',
+               'Mohammed', 'Sofia', 'Lucas', 'Amara', 'Hiroshi', 'Olga', 'Mateo', 'Aisha', 'Noah', 'Chloe']
+DEPARTMENTS = ['Engineering', 'Marketing', 'Sales', 'Finance', 'Human Resources', 'Operations', 'Legal', 'Support']
+POSITIONS = ['Engineer', 'Senior Engineer', 'Manager', 'Director', 'Analyst', 'Coordinator', 'Specialist', 'Associate']
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    syllables = ['son', 'ley', 'man', 'ton', 'ber', 'ski', 'ez', 'ini', 'ova', 'berg', 'wood', 'field', 'ard', 'ell']
+    rows = []
+    for employee_id in range(1, count + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = (rng.choice('BCDFGHJKLMNPRSTVW') + rng.choice('aeiou') + rng.choice(syllables)
+                + rng.choice(['', rng.choice(syllables)]))
+        rows.append(EmployeeRow(
+            id=employee_id,
+            name=f"{first} {last}",
+            email=f"{first.lower()}.{last.lower()}{employee_id}@example.com",
+            position=rng.choice(POSITIONS),
+            department=rng.choice(DEPARTMENTS),
+            salary=None, hire_date=None, created_at=None, updated_at=None,
+        ))
+    return rows
+
+def typo(word, rng):
+    i = rng.randrange(1, len(word))
+    return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+
+def make_queries(rows, count, rng):
+    sample = [rng.choice(rows) for _ in range(count)]
+    return {
+        'exact_name': [row.name.split()[1] for row in sample],
+        'prefix': [row.name.split()[1][:3] for row in sample],
+        'typo': [typo(row.name.split()[1], rng) for row in sample],
+        'two_terms': [f"{row.name.split()[0][:4]} {row.department}" for row in sample],
+        'id': [str(row.id) for row in sample],
+    }
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=100000, help='number of generated employees')
+    parser.add_argument('--queries', type=int, default=500, help='queries per kind')
+    parser.add_argument('--limit', type=int, default=20, help='page size')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rows = make_rows(args.employees, args.seed)
+    started = time.perf_counter()
+    index = TermIndex()
+    for row in rows:
+        index.add(row)
+    print(json.dumps({
+        'employees': args.employees,
+        'terms': len(index.sorted_terms()),
+        'build_s': round(time.perf_counter() - started, 2),
+    }))
+
+    rng = random.Random(args.seed)
+    for kind, queries in make_queries(rows, args.queries, rng).items():
+        latencies = []
+        hits = 0
+        for query in queries:
+            begin = time.perf_counter()
+            ranked = index.rank(tokenize(query))
+            page = [index.rows[employee_id] for employee_id in ranked[:args.limit]]
+            latencies.append(time.perf_counter() - begin)
+            hits += len(page)
+        latencies.sort()
+        print(json.dumps({
+            'kind': kind,
+            'queries': len(queries),
+            'avg_results': round(hits / len(queries), 1),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'max_ms': round(latencies[-1] * 1000, 3),
+        }))
+
+if __name__ == '__main__':
+    main()
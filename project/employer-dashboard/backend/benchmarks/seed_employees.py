@@ -0,0 +1,98 @@
+"""Seed the configured database with a reproducible employee population for load tests.
+
+Employee i is generated from (--seed, i) alone, so every run with the same
+arguments produces the same rows; rerunning only inserts the ones that are
+missing. The first --users employees also get accounts named loadtest<i>
+(password --password) for the login and profile scenarios of
+load_benchmark.py. Rows go through Employee.bulk_create, so the stats
+rollups are maintained exactly as for a real import:
+
+    python benchmarks/seed_employees.py --employees 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import db
+from models.employee_model import Employee
+
+# Dataset sizes the load benchmarks are reported for
+SIZES = (1000, 100000, 1000000)
+EMAIL_PATTERN = 'loadtest{}@example.com'
+USERNAME_PATTERN = 'loadtest{}'
+DEFAULT_PASSWORD = 'loadtest-password'
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'Priya', 'Wei', 'Mohammed', 'Sofia', 'Lucas', 'Amara', 'Hiroshi', 'Olga', 'Mateo', 'Aisha']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Nguyen', 'Kim', 'Patel', 'Khan', 'Silva', 'Rossi', 'Muller', 'Novak', 'Tanaka', 'Okafor']
+DEPARTMENTS = ['Engineering', 'Marketing', 'Sales', 'Finance', 'Human Resources', 'Operations', 'Legal', 'Support']
+POSITIONS = ['Engineer', 'Senior Engineer', 'Manager', 'Director', 'Analyst', 'Coordinator', 'Specialist', 'Associate']
+
+def make_employee(index, seed, users=0, password=DEFAULT_PASSWORD):
+    """Return the bulk-import row for employee index"""
+    rng = random.Random(f"{seed}:{index}")
+    row = {
+        'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'email': EMAIL_PATTERN.format(index),
+        'position': rng.choice(POSITIONS),
+        'department': rng.choice(DEPARTMENTS),
+        'salary': rng.randrange(35000, 250000),
+        'hire_date': (date(2005, 1, 1) + timedelta(days=rng.randrange(7000))).isoformat(),
+    }
+    if index < users:
+        row['username'] = USERNAME_PATTERN.format(index)
+        row['password'] = password
+    return row
+
+def count_seeded():
+    """Return how many load-test employees already exist"""
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM employees WHERE email LIKE %s", (EMAIL_PATTERN.format('%'),))
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=SIZES[0],
+                        help=f"target number of load-test employees, e.g. {', '.join(map(str, SIZES))}")
+    parser.add_argument('--users', type=int, default=50, help='employees that also get a login')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='password of the load-test logins')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=10000, help='rows per bulk_create call')
+    args = parser.parse_args()
+
+    db.initialize_database()
+    existing = count_seeded()
+    inserted = failed = 0
+    started = time.perf_counter()
+    # Rows are numbered from 0, so the missing ones are the tail after the existing count
+    for start in range(existing, args.employees, args.batch):
+        rows = [make_employee(index, args.seed, args.users, args.password)
+                for index in range(start, min(start + args.batch, args.employees))]
+        results = Employee.bulk_create(rows)
+        created = sum(1 for result in results if 'id' in result)
+        inserted += created
+        failed += len(results) - created
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'employees': args.employees,
+        'existing': existing,
+        'inserted': inserted,
+        'failed': failed,
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(inserted / elapsed) if inserted and elapsed else None,
+    }))
+
+if __name__ == '__main__':
+    main()
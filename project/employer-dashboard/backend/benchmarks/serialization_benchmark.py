@@ -0,0 +1,130 @@
+"""Compare employee JSON serialization throughput before and after the shared encoder.
+
+Encodes the same synthetic rows, as dictionary-cursor rows, through the code
+paths the handlers used before serialization.py existed, and, as EmployeeRow
+tuples, through the shared encoder (with orjson when installed, and with the
+stdlib fallback), printing one JSON object per path:
+
+    python benchmarks/serialization_benchmark.py --rows 10000
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from models.employee_model import EmployeeRow
+
+def load_serialization(use_orjson):
+    """Import a private copy of serialization.py, optionally with orjson hidden"""
+    saved = sys.modules.get('orjson')
+    if not use_orjson:
+        sys.modules['orjson'] = None
+    try:
+        spec = importlib.util.spec_from_file_location(f"serialization_{use_orjson}",
+                                                      os.path.join(BACKEND_DIR, 'serialization.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        if saved is None:
+            sys.modules.pop('orjson', None)
+        else:
+            sys.modules['orjson'] = saved
+
+def make_rows(count):
+    created = datetime(2024, 1, 1, 9, 30)
+    return [{
+        'id': i,
+        'name': f"Employee {i}",
+        'email': f"employee{i}@example.com",
+        'position': 'Engineer',
+        'department': 'Engineering',
+        'salary': Decimal('85000.00') + i,
+        'hire_date': date(2020, 1, 1) + timedelta(days=i % 1500),
+        'created_at': created + timedelta(minutes=i),
+        'updated_at': created + timedelta(minutes=i, seconds=30),
+    } for i in range(1, count + 1)]
+
+# The per-row conversions the handlers used before serialization.py
+
+def legacy_row_to_dict(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'email': row['email'],
+        'position': row['position'],
+        'department': row['department'],
+        'salary': float(row['salary']) if row['salary'] is not None else 0.0,
+        'hire_date': row['hire_date'].strftime('%Y-%m-%d') if isinstance(row['hire_date'], datetime) else str(row['hire_date']),
+        'created_at': row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if row['created_at'] else None,
+        'updated_at': row['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if row['updated_at'] else None
+    }
+
+def legacy_profile_dict(row):
+    employee_dict = {
+        'id': row['id'],
+        'name': row['name'],
+        'email': row['email'],
+        'position': row['position'],
+        'department': row['department'],
+        'salary': float(row['salary']) if row['salary'] is not None else 0.0,
+        'hire_date': row['hire_date'].strftime('%Y-%m-%d') if hasattr(row['hire_date'], 'strftime') else str(row['hire_date']),
+    }
+    if row['created_at']:
+        employee_dict['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(row['created_at'], 'strftime') else str(row['created_at'])
+    if row['updated_at']:
+        employee_dict['updated_at'] = row['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(row['updated_at'], 'strftime') else str(row['updated_at'])
+    return employee_dict
+
+def measure(encode_list, rows, repeat):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(encode_list(rows))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='rows per encoded listing')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per path; the fastest is reported')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    tuple_rows = [EmployeeRow(**row) for row in rows]
+    fast = load_serialization(use_orjson=True)
+    stdlib = load_serialization(use_orjson=False)
+
+    paths = {
+        'legacy_list': (rows, lambda rows: json.dumps([legacy_row_to_dict(row) for row in rows], default=str)),
+        'legacy_profile': (rows, lambda rows: json.dumps([legacy_profile_dict(row) for row in rows])),
+        'shared_stdlib': (tuple_rows, lambda rows: stdlib.dumps(stdlib.encode_employees(rows))),
+    }
+    if fast.orjson is not None:
+        paths['shared_orjson'] = (tuple_rows, lambda rows: fast.dumps(fast.encode_employees(rows)))
+
+    baseline = None
+    for name, (path_rows, encode_list) in paths.items():
+        elapsed, size = measure(encode_list, path_rows, args.repeat)
+        rows_per_sec = args.rows / elapsed
+        baseline = baseline or rows_per_sec
+        print(json.dumps({
+            'path': name,
+            'rows': args.rows,
+            'ms': round(elapsed * 1000, 2),
+            'rows_per_sec': round(rows_per_sec),
+            'speedup': round(rows_per_sec / baseline, 2),
+            'bytes': size,
+        }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from metrics import register_stats
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL.
+
+    Counters used for invalidation generations are stored separately from the
+    cached entries so that they are never evicted.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached and current"""
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] < now:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = entry[1]
+        return found
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+class RedisCache:
+    """Cache backed by any client exposing the redis-py get/set/delete/incr API.
+
+    Values are pickled so rows keep their datetime and Decimal types. Redis
+    failures are logged and treated as misses; the database stays the source
+    of truth.
+    """
+
+    def __init__(self, client, ttl=60, prefix='employer_dashboard:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.error("Cache get failed: %s", e)
+            self._count('errors')
+            raw = None
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return pickle.loads(raw)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raws = self.client.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            logger.error("Cache get failed: %s", e)
+            self._count('errors')
+            raws = [None] * len(keys)
+        found = {key: pickle.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=ttl or self.ttl)
+        except Exception as e:
+            logger.error("Cache set failed: %s", e)
+            self._count('errors')
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.client.delete(*[self.prefix + key for key in keys])
+        except Exception as e:
+            logger.error("Cache delete failed: %s", e)
+            self._count('errors')
+
+    def incr(self, key):
+        try:
+            return self.client.incr(self.prefix + key)
+        except Exception as e:
+            logger.error("Cache incr failed: %s", e)
+            self._count('errors')
+            return None
+
+    def get_counter(self, key):
+        try:
+            return int(self.client.get(self.prefix + key) or 0)
+        except Exception as e:
+            logger.error("Cache counter read failed: %s", e)
+            self._count('errors')
+            return None
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        evictions = None
+        if hasattr(self.client, 'info'):
+            try:
+                evictions = self.client.info('stats').get('evicted_keys')
+            except Exception:
+                pass
+        with self._lock:
+            return {
+                'backend': 'redis',
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': evictions,
+                'errors': self.errors,
+            }
+
+class NullCache:
+    """Cache that stores nothing, for CACHE_BACKEND=none"""
+
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return {}
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def incr(self, key):
+        return None
+
+    def get_counter(self, key):
+        return None
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none'}
+
+def create_cache():
+    """Build the cache selected by the CACHE_BACKEND environment variable.
+
+    The in-process LRU only sees invalidations from its own process, so with
+    several WEB_WORKERS it would keep serving rows another worker changed.
+    Asking for it explicitly then refuses to start; by default the workers
+    run without a cache instead.
+    """
+    configured = os.getenv('CACHE_BACKEND')
+    backend = (configured or 'memory').lower()
+    ttl = int(os.getenv('CACHE_TTL', 60))
+    workers = int(os.getenv('WEB_WORKERS', 1)) or os.cpu_count() or 1
+
+    if backend == 'memory' and workers > 1:
+        if configured:
+            raise RuntimeError("CACHE_BACKEND=memory cannot be shared by several WEB_WORKERS; use redis or none")
+        logger.warning("Employee cache disabled: %d workers need CACHE_BACKEND=redis to share it", workers)
+        backend = 'none'
+
+    if backend == 'none':
+        return NullCache()
+    if backend == 'redis':
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+        return RedisCache(client, ttl=ttl)
+    return LRUCache(max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 10000)), ttl=ttl)
+
+# Global cache instance for employee reads
+employee_cache = create_cache()
+register_stats('cache', 'Employee cache', employee_cache.stats)
+
+# Bumped on every write; cached listings embed it in their keys
+CACHE_GENERATION_KEY = 'employees:generation'
+
+def employee_cache_key(employee_id):
+    return f"employee:{employee_id}"
+
+def employee_version_key(employee_id):
+    return f"employee:{employee_id}:version"
+
+def cached(make_key, load):
+    """Read-through helper for the employee cache.
+
+    make_key receives the current write generation. A freshly loaded value is
+    only stored if no write happened while it was being loaded, so a slow
+    reader cannot put a pre-write row back after the write invalidated it.
+    """
+    generation = employee_cache.get_counter(CACHE_GENERATION_KEY)
+    if generation is None:
+        return load()
+    key = make_key(generation)
+    value = employee_cache.get(key)
+    if value is not None:
+        return value
+    value = load()
+    if value is not None and employee_cache.get_counter(CACHE_GENERATION_KEY) == generation:
+        employee_cache.set(key, value)
+    return value
+
+def cached_many(keys, load_many):
+    """Read-through helper for many entries of the employee cache at once.
+
+    keys maps each wanted id to its cache key. load_many receives the ids
+    that were not cached and returns {id: value} for those that exist; like
+    cached(), the loaded values are only stored if no write happened
+    meanwhile. Returns {id: value} for every id found.
+    """
+    generation = employee_cache.get_counter(CACHE_GENERATION_KEY)
+    if generation is None:
+        return load_many(list(keys))
+    hits = employee_cache.get_many(keys.values())
+    found = {item: hits[key] for item, key in keys.items() if key in hits}
+    missing = [item for item in keys if item not in found]
+    if missing:
+        loaded = load_many(missing)
+        if loaded and employee_cache.get_counter(CACHE_GENERATION_KEY) == generation:
+            for item, value in loaded.items():
+                employee_cache.set(keys[item], value)
+        found.update(loaded)
+    return found
+
+def invalidate_employee(employee_id=None):
+    """Drop an employee's cached row and version and retire every cached listing"""
+    if employee_id is not None:
+        employee_cache.delete(employee_cache_key(employee_id), employee_version_key(employee_id))
+    employee_cache.incr(CACHE_GENERATION_KEY)
@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import logging
+import os
+from collections import deque
+from operator import itemgetter
+from db_executor import db_executor, DatabaseBusyError
+from metrics import register_stats
+from models.change_model import CREATED, DELETED, EmployeeChanges
+from models.employee_model import Employee
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+def encode_changes(events, seq):
+    return dumps({'type': 'changes', 'seq': seq, 'events': events})
+
+def merge(pending, event):
+    """Fold event into pending, an {employee id: event} map holding one event per employee"""
+    employee_id = event['id']
+    previous = pending.get(employee_id)
+    if previous is None:
+        pending[employee_id] = event
+    elif event['op'] == DELETED:
+        if previous['op'] == CREATED:
+            # Created and deleted before the subscriber heard of it
+            del pending[employee_id]
+        else:
+            pending[employee_id] = event
+    else:
+        # Events are shared between subscribers, so merge into a copy
+        pending[employee_id] = {**previous, 'seq': event['seq'],
+                                'fields': {**previous.get('fields', {}), **event.get('fields', {})}}
+
+class Subscription:
+    """One subscriber's delivery state.
+
+    send(message) writes an encoded message and returns a future that
+    resolves once it has been flushed to the socket. While one is pending,
+    new events are folded into one per employee and sent together when the
+    socket drains, so a slow client gets fewer, larger messages rather than
+    an ever-growing write buffer.
+    """
+    __slots__ = ('send', 'seq', 'pending', 'busy')
+
+    def __init__(self, send, seq):
+        self.send = send
+        # Last sequence number sent or queued for sending
+        self.seq = seq
+        self.pending = {}
+        self.busy = False
+
+    def deliver(self, events, message=None):
+        """Send events (oldest first), reusing message when it is their shared encoding; returns how many were coalesced"""
+        if events[0]['seq'] <= self.seq:
+            events = [event for event in events if event['seq'] > self.seq]
+            if not events:
+                return 0
+            message = None
+        self.seq = events[-1]['seq']
+        if self.busy:
+            for event in events:
+                merge(self.pending, event)
+            return len(events)
+        self.write(message or encode_changes(events, self.seq))
+        return 0
+
+    def write(self, message):
+        try:
+            future = self.send(message)
+        except Exception:
+            # Closed; the handler unsubscribes in on_close
+            return
+        self.busy = True
+        future.add_done_callback(self._written)
+
+    def _written(self, future):
+        self.busy = False
+        if future.cancelled() or future.exception() is not None:
+            return
+        if self.pending:
+            events = sorted(self.pending.values(), key=itemgetter('seq'))
+            self.pending = {}
+            self.write(encode_changes(events, self.seq))
+
+class ChangeFeed:
+    """Fans the employee change log out to this process's WebSocket subscribers.
+
+    While anybody is subscribed, the process polls employee_changes every
+    poll_interval seconds, and straight away after a write made through the
+    Employee model here. Each batch of new changes is encoded once and the
+    same message goes to every subscriber that is keeping up. The last
+    buffer_size changes are kept in memory so reconnecting clients can
+    resume without a query; older resumes are read from the log, as long as
+    it still holds them.
+    """
+
+    def __init__(self, poll_interval=0.5, buffer_size=10000, batch_size=1000):
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.seq = None
+        self._events = deque(maxlen=buffer_size)
+        self._subscriptions = set()
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._polls = 0
+        self._batches = 0
+        self._coalesced = 0
+        self._resyncs = 0
+
+    def notify(self, employee_ids, deleted=False):
+        """Employee change listener; wakes the poller, which may be in another thread's loop"""
+        if self._loop is None or not self._subscriptions:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # The loop has been closed
+            pass
+
+    async def subscribe(self, send, since=None):
+        """Start sending changes through send(message) and return the Subscription.
+
+        The first message is {"type": "hello", "seq": n}; changes after n
+        follow. With since, n is since and the changes missed since then are
+        sent first. If they are no longer available, or since is unknown,
+        {"type": "resync", "seq": n} is sent instead: the client should
+        reload what it shows and continue from n.
+        """
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        if not self._subscriptions:
+            # Nobody was listening, so nothing was polled; start from the log's current end
+            latest = await db_executor.run(EmployeeChanges.get_latest_seq)
+            if not self._subscriptions:
+                self.seq = latest
+                self._events.clear()
+
+        logged = None
+        if since is not None and 0 <= since < self.seq and not self._buffered(since):
+            logged = await db_executor.run(EmployeeChanges.get_since, since, self.buffer_size)
+
+        # No awaits from here on, so no batch can be published in between
+        events = self._missed(since, logged) if since is not None else None
+        if events is None:
+            subscription = Subscription(send, self.seq)
+            if since is not None:
+                self._resyncs += 1
+                subscription.write(dumps({'type': 'resync', 'seq': self.seq}))
+            else:
+                subscription.write(dumps({'type': 'hello', 'seq': self.seq}))
+        else:
+            subscription = Subscription(send, since)
+            subscription.write(dumps({'type': 'hello', 'seq': since}))
+            if events:
+                # Queued behind the hello, so the missed changes go out coalesced
+                subscription.deliver(events)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.discard(subscription)
+
+    def _buffered(self, since):
+        return bool(self._events) and self._events[0]['seq'] <= since + 1
+
+    def _missed(self, since, logged):
+        """Return the changes after since, or None if some of them are gone"""
+        if since == self.seq:
+            return []
+        if since < 0 or since > self.seq:
+            return None
+        if logged is None:
+            if not self._buffered(since):
+                return None
+            return list(itertools.dropwhile(lambda event: event['seq'] <= since, self._events))
+        if not logged or logged[0]['seq'] != since + 1:
+            return None
+        last = logged[-1]['seq']
+        if last >= self.seq:
+            return logged
+        # The log was read from a replica or before the latest poll; the buffer has the rest
+        if not self._buffered(last):
+            return None
+        return logged + list(itertools.dropwhile(lambda event: event['seq'] <= last, self._events))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._subscriptions:
+                continue
+            try:
+                self._polls += 1
+                events = await db_executor.run(EmployeeChanges.get_since, self.seq, self.batch_size)
+            except DatabaseBusyError:
+                continue
+            except Exception as e:
+                logger.error("Error polling employee changes: %s", e)
+                continue
+            self._publish(events)
+            if len(events) == self.batch_size:
+                # More are waiting
+                self._wake.set()
+
+    def _publish(self, events):
+        # A poll that started before the feed went idle and restarted may overlap
+        events = [event for event in events if event['seq'] > self.seq]
+        if not events:
+            return
+        self._events.extend(events)
+        self.seq = events[-1]['seq']
+        message = encode_changes(events, self.seq)
+        self._batches += 1
+        for subscription in list(self._subscriptions):
+            self._coalesced += subscription.deliver(events, message)
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscriptions),
+            'seq': self.seq or 0,
+            'buffered': len(self._events),
+            'polls': self._polls,
+            'batches': self._batches,
+            'coalesced': self._coalesced,
+            'resyncs': self._resyncs,
+        }
+
+change_feed = ChangeFeed(
+    poll_interval=float(os.getenv('FEED_POLL_INTERVAL', 0.5)),
+    buffer_size=int(os.getenv('FEED_BUFFER_SIZE', 10000)),
+)
+Employee.add_change_listener(change_feed.notify)
+register_stats('change_feed', 'WebSocket change feed', change_feed.stats)
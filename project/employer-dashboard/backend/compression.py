@@ -0,0 +1,162 @@
+"""Negotiated gzip/brotli response compression, plus a cache of compressed bodies.
+
+ResponseCompression is installed as an application output transform and
+compresses any large enough JSON, CSV or text response with the best
+encoding the client accepts. Handlers whose body is fully determined by a
+resource version can go further with compressed_bodies: the compressed
+bytes are kept under (key, version, encoding), so identical responses are
+encoded and compressed once rather than on every request.
+"""
+import gzip
+import os
+import zlib
+from collections import OrderedDict
+from tornado.web import OutputTransform
+from metrics import register_stats
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies gain little and cost a round through the compressor
+MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', 32 * 1024 * 1024))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+                      'image/svg+xml', 'text/')
+
+# Preferred first when the client accepts both equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate(accept_encoding):
+    """Return the encoding to use for an Accept-Encoding header value, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = weight
+    best = None
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best[0] if best else None
+
+def compressible(content_type):
+    return content_type.split(';')[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _compressor(encoding):
+    """Return (compress(chunk), flush(finishing)) for a streamed body"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, lambda finishing: compressor.finish() if finishing else compressor.flush()
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda finishing: compressor.flush(zlib.Z_FINISH if finishing else zlib.Z_SYNC_FLUSH)
+
+class ResponseCompression(OutputTransform):
+    """Compresses responses with the encoding negotiated from Accept-Encoding.
+
+    Replaces Tornado's gzip-only compress_response. Bodies written in one
+    piece are left alone below MIN_SIZE; streamed bodies are compressed
+    chunk by chunk, flushing after each so clients see rows as they are
+    written. Responses that already carry a Content-Encoding, such as
+    cached compressed bodies, pass through untouched.
+    """
+
+    def __init__(self, request):
+        self._encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        self._compress = None
+
+    def transform_first_chunk(self, status_code, headers, chunk, finishing):
+        if 'Vary' in headers:
+            if 'accept-encoding' not in headers['Vary'].lower():
+                headers['Vary'] += ', Accept-Encoding'
+        else:
+            headers['Vary'] = 'Accept-Encoding'
+        if (self._encoding is None or 'Content-Encoding' in headers or status_code in (204, 304)
+                or not compressible(headers.get('Content-Type', '')) or (finishing and len(chunk) < MIN_SIZE)):
+            return status_code, headers, chunk
+        headers['Content-Encoding'] = self._encoding
+        self._compress = _compressor(self._encoding)
+        chunk = self.transform_chunk(chunk, finishing)
+        if 'Content-Length' in headers:
+            if finishing:
+                headers['Content-Length'] = str(len(chunk))
+            else:
+                del headers['Content-Length']
+        return status_code, headers, chunk
+
+    def transform_chunk(self, chunk, finishing):
+        if self._compress is None:
+            return chunk
+        compress, flush = self._compress
+        return compress(chunk) + flush(finishing)
+
+class CompressedBodies:
+    """LRU cache of compressed response bodies, bounded by their total size.
+
+    Keys include the resource version, so a changed resource simply misses
+    and its old bodies age out. Used from the IOLoop thread only.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = body
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+compressed_bodies = CompressedBodies()
+register_stats('compressed_bodies', 'Cache of compressed response bodies', compressed_bodies.stats)
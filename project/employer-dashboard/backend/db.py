@@ -1,111 +1,553 @@
-import mysql.connector
+import contextvars
+import logging
 import os
-from mysql.connector import Error
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from urllib.parse import urlsplit
+from metrics import POOL_WAIT, register_stats
+from migrations import migrate
+
+try:
+    import mysql.connector
+    from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+except ImportError:
+    mysql = None
+
+logger = logging.getLogger(__name__)
+
+# Who the current model call runs for, set per request by the handlers; reads
+# for a session that wrote within DB_REPLICA_STICKY_SECONDS go to the primary
+current_session = contextvars.ContextVar('db_session', default=None)
+# Sessions remembered for read-your-writes before expired ones are pruned
+MAX_STICKY_SESSIONS = 10000
+# Seconds to wait for another process's migrations, which may be building indexes on large tables
+MIGRATION_LOCK_TIMEOUT = int(os.getenv('DB_MIGRATION_LOCK_TIMEOUT', 600))
+
+class PooledConnection:
+    """A pooled connection plus the bookkeeping used for recycling"""
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+class ConnectionPool:
+    """Bounded pool of database connections with health checks and recycling.
+
+    error is the driver's base exception class, timeout_error the one raised
+    when no connection frees up in time.
+    """
+
+    def __init__(self, connect, max_size=10, checkout_timeout=5.0, max_idle=300.0,
+                 max_lifetime=3600.0, health_check_interval=30.0, error=Exception, timeout_error=TimeoutError):
+        self._connect = connect
+        self.error = error
+        self.timeout_error = timeout_error
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._lock = threading.Condition()
+
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._created = 0
+        self._recycled = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def _is_expired(self, entry, now):
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - entry.last_used > self.max_idle:
+            return True
+        return False
+
+    def _is_healthy(self, entry, now):
+        """Ping connections that have been idle long enough to have gone stale"""
+        if now - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            entry.connection.ping(reconnect=False)
+            return True
+        except self.error:
+            return False
+
+    def _discard(self, entry):
+        try:
+            entry.connection.close()
+        except self.error:
+            pass
+
+    def acquire(self):
+        """Check out a connection, waiting up to checkout_timeout for one to free up"""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+
+        while True:
+            entry = None
+            create = False
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._checkout_failures += 1
+                        raise self.timeout_error(
+                            f"Timed out after {self.checkout_timeout}s waiting for a database connection")
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            now = time.monotonic()
+            if create:
+                try:
+                    entry = PooledConnection(self._connect())
+                except self.error:
+                    with self._lock:
+                        self._size -= 1
+                        self._checkout_failures += 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._created += 1
+            elif self._is_expired(entry, now) or not self._is_healthy(entry, now):
+                self._discard(entry)
+                with self._lock:
+                    self._size -= 1
+                    self._recycled += 1
+                    self._lock.notify()
+                continue
+
+            waited = time.monotonic() - started
+            POOL_WAIT.observe(waited)
+            with self._lock:
+                self._in_use += 1
+                self._checkouts += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            return entry
+
+    def release(self, entry, discard=False):
+        """Return a connection to the pool, closing it if it is broken or expired"""
+        now = time.monotonic()
+        if not discard and self._is_expired(entry, now):
+            discard = True
+
+        if discard:
+            self._discard(entry)
+
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self._recycled += 1
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+            self._lock.notify()
+
+    def close_all(self):
+        """Close every idle connection; checked-out connections close on release"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'checkout_failures': self._checkout_failures,
+                'created': self._created,
+                'recycled': self._recycled,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+                'wait_time_avg': round(self._wait_time_total / self._checkouts, 6) if self._checkouts else 0.0,
+            }
+
+class Replica:
+    """A read replica's connection pool plus its health.
+
+    A replica that can't be connected to, or whose connection breaks
+    mid-query, is ejected: reads skip it for retry_interval seconds, doubling
+    with each consecutive failure up to max_retry_interval. Once that passes
+    the next read tries it again, and a clean checkout clears the failures.
+    """
+
+    def __init__(self, name, pool, retry_interval=5.0, max_retry_interval=60.0):
+        self.name = name
+        self.pool = pool
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def available(self, now):
+        return now >= self.ejected_until
+
+    def record_failure(self, error):
+        self.failures += 1
+        backoff = min(self.retry_interval * 2 ** (self.failures - 1), self.max_retry_interval)
+        self.ejected_until = time.monotonic() + backoff
+        self.ejections += 1
+        logger.warning("Ejecting read replica %s for %.1fs: %s", self.name, backoff, error)
+
+    def record_success(self):
+        self.failures = 0
 
 class Database:
+    """Pooled connections plus schema setup for one storage engine.
+
+    Models only use the mysql-connector style API every backend's
+    connections provide (cursor(), %s placeholders, start_transaction(),
+    commit(), rollback(), in_transaction) and catch the backend's Error,
+    IntegrityError and DataError, re-exported at the bottom of this module.
+    The few SQL fragments that differ between engines come from the
+    upsert(), inserted(), least/greatest and month_start() members.
+
+    Backends that support it may add read replicas; connection(read=True)
+    then balances reads across the healthy ones. Writers call
+    record_write() after committing, and reads for that session stay on the
+    primary for DB_REPLICA_STICKY_SECONDS so it sees its own writes.
+    """
+    engine = None
+    Error = IntegrityError = DataError = Exception
+    # Errors after which a connection is never handed out again
+    broken_errors = ()
+    least = 'LEAST'
+    greatest = 'GREATEST'
+
+    def __init__(self, database, timeout_error):
+        self.database = database
+        self.timeout_error = timeout_error
+        self.pool = self._create_pool(self._create_connection)
+        self.replicas = []
+        self.sticky_seconds = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+        self._session_writes = {}
+        self._next_replica = 0
+        self._routing_lock = threading.Lock()
+        self._replica_reads = 0
+        self._unrouted_reads = 0
+        self._sticky_reads = 0
+        self._fallback_reads = 0
+
+    def _create_pool(self, connect):
+        return ConnectionPool(
+            connect,
+            max_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            max_idle=float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+            error=self.Error,
+            timeout_error=self.timeout_error,
+        )
+
+    def _create_connection(self):
+        raise NotImplementedError
+
+    def upsert(self, key):
+        """Clause that makes the preceding INSERT update the row that already has the same key"""
+        raise NotImplementedError
+
+    def inserted(self, column):
+        """Reference, inside an upsert() clause, to the value the INSERT tried to write to column"""
+        raise NotImplementedError
+
+    def month_start(self, column):
+        """Expression for the first day of the month of a DATE column"""
+        raise NotImplementedError
+
+    @contextmanager
+    def connection(self, existing=None, read=False):
+        """Check out a pooled connection for the duration of a with-block.
+
+        Callers that already hold a connection can pass it as ``existing``;
+        it is yielded as-is and left for its owner to return. Pass read=True
+        for reads that may be served by a replica; they fall back to the
+        primary when no replica is healthy or the session just wrote.
+        """
+        if existing is not None:
+            yield existing
+            return
+
+        replica = self._route_read() if read else None
+        entry = None
+        if replica is not None:
+            try:
+                entry = replica.pool.acquire()
+            except self.timeout_error:
+                # Busy rather than unhealthy: use the primary this time
+                replica = None
+            except self.Error as e:
+                replica.record_failure(e)
+                replica = None
+            if replica is None:
+                with self._routing_lock:
+                    self._fallback_reads += 1
+        pool = replica.pool if replica is not None else self.pool
+        if entry is None:
+            entry = pool.acquire()
+
+        broken = False
+        try:
+            yield entry.connection
+        except self.broken_errors as e:
+            # Lost or unusable connection, never hand it out again
+            broken = True
+            if replica is not None:
+                replica.record_failure(e)
+            raise
+        except BaseException:
+            # Includes GeneratorExit from a streaming reader that was closed early
+            broken = not self._reset(entry.connection)
+            raise
+        else:
+            broken = not self._reset(entry.connection)
+            if replica is not None:
+                replica.record_success()
+        finally:
+            pool.release(entry, discard=broken)
+
+    def _route_read(self):
+        """Pick the replica for a read, or None if it should go to the primary"""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        session = current_session.get()
+        with self._routing_lock:
+            wrote_at = self._session_writes.get(session) if session is not None else None
+            if wrote_at is not None and now - wrote_at < self.sticky_seconds:
+                self._sticky_reads += 1
+                return None
+            healthy = [replica for replica in self.replicas if replica.available(now)]
+            if not healthy:
+                self._unrouted_reads += 1
+                return None
+            self._replica_reads += 1
+            # The least busy replica, starting the tie-break at the next one in turn
+            self._next_replica = (self._next_replica + 1) % len(healthy)
+            candidates = healthy[self._next_replica:] + healthy[:self._next_replica]
+        return min(candidates, key=lambda replica: replica.pool.in_use)
+
+    def record_write(self):
+        """Keep the current session's reads on the primary for a while after a committed write"""
+        session = current_session.get()
+        if not self.replicas or session is None:
+            return
+        now = time.monotonic()
+        with self._routing_lock:
+            self._session_writes[session] = now
+            if len(self._session_writes) > MAX_STICKY_SESSIONS:
+                self._session_writes = {key: wrote_at for key, wrote_at in self._session_writes.items()
+                                        if now - wrote_at < self.sticky_seconds}
+
+    def _reset(self, connection):
+        """Roll back anything left open so the next borrower starts clean"""
+        if connection.unread_result:
+            return False
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            return True
+        except self.Error:
+            return False
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def replica_stats(self):
+        now = time.monotonic()
+        with self._routing_lock:
+            stats = {
+                'replicas': len(self.replicas),
+                'healthy': sum(1 for replica in self.replicas if replica.available(now)),
+                'ejections': sum(replica.ejections for replica in self.replicas),
+                'replica_reads': self._replica_reads,
+                'unrouted_reads': self._unrouted_reads,
+                'sticky_reads': self._sticky_reads,
+                'fallback_reads': self._fallback_reads,
+                'sticky_sessions': len(self._session_writes),
+            }
+        stats['in_use'] = sum(replica.pool.in_use for replica in self.replicas)
+        return stats
+
+    def configure_pool(self, max_size):
+        """Resize the pools; call before they are first used (e.g. right after forking)"""
+        for pool in [self.pool] + [replica.pool for replica in self.replicas]:
+            pool.close_all()
+            pool.max_size = max_size
+
+    def close_all(self):
+        """Close the idle connections of the primary and replica pools"""
+        self.pool.close_all()
+        for replica in self.replicas:
+            replica.pool.close_all()
+
+    def get_max_connections(self):
+        """Return the server's connection limit, or None if it has none or it can't be read"""
+        return None
+
+    def initialize_database(self):
+        """Apply any pending schema migrations (call this once at app startup).
+
+        An up-to-date database costs one primary-key lookup on schema_version.
+        A failed migration is re-raised, so startup stops rather than serving
+        from a missing or half-migrated schema.
+        """
+        try:
+            with self.connection() as connection:
+                logger.info("Connected to %s database %s, server version %s", self.engine, self.database,
+                            connection.get_server_info())
+                version = migrate(self, connection)
+            logger.info("Database schema is at version %d", version)
+        except self.Error as e:
+            logger.error("Failed to initialize database: %s", e)
+            raise
+
+    def schema_lock(self, connection):
+        """Context manager that keeps other processes from migrating the schema for the duration of a with-block"""
+        raise NotImplementedError
+
+    def add_index(self, cursor, table, name, columns):
+        """Create the named index on table's columns, e.g. '(created_at, id)', unless it exists"""
+        raise NotImplementedError
+
+class MySQLDatabase(Database):
+    engine = 'MySQL'
+
+    if mysql is not None:
+        Error = mysql.connector.Error
+        IntegrityError = mysql.connector.IntegrityError
+        DataError = mysql.connector.DataError
+        broken_errors = (InterfaceError, OperationalError)
+
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
-        self.database = os.getenv('DB_NAME', 'employer_dashboard')
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD', 'yourpassword')
         self.port = os.getenv('DB_PORT', 3306)
-        
-    def get_connection(self):
-        """Get database connection with proper configuration"""
+        super().__init__(os.getenv('DB_NAME', 'employer_dashboard'), PoolError)
+
+        # Comma-separated [user[:password]@]host[:port]; missing parts are the primary's
+        retry_interval = float(os.getenv('DB_REPLICA_RETRY_INTERVAL', 5))
+        for dsn in filter(None, (part.strip() for part in os.getenv('DB_REPLICAS', '').split(','))):
+            parts = urlsplit(f"//{dsn}")
+            connect = partial(self._create_connection, host=parts.hostname, port=parts.port or self.port,
+                              user=parts.username or self.user, password=parts.password or self.password)
+            self.replicas.append(Replica(f"{parts.hostname}:{parts.port or self.port}", self._create_pool(connect),
+                                         retry_interval=retry_interval))
+
+    def _create_connection(self, host=None, port=None, user=None, password=None):
+        """Open a new connection to the primary, or to the given replica, with proper configuration"""
+        return mysql.connector.connect(
+            host=host or self.host,
+            database=self.database,
+            user=user or self.user,
+            password=password or self.password,
+            port=port or self.port,
+            autocommit=True,
+            charset='utf8mb4',
+            use_unicode=True
+        )
+
+    def upsert(self, key):
+        return "ON DUPLICATE KEY UPDATE"
+
+    def inserted(self, column):
+        return f"VALUES({column})"
+
+    def month_start(self, column):
+        return f"{column} - INTERVAL (DAYOFMONTH({column}) - 1) DAY"
+
+    def get_max_connections(self):
+        """Return the server's max_connections setting, or None if it can't be read"""
         try:
-            connection = mysql.connector.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password,
-                port=self.port,
-                autocommit=True,
-                charset='utf8mb4',
-                use_unicode=True
-            )
-            
-            if connection.is_connected():
-                print(f"Successfully connected to MySQL database: {self.database}")
-                print(f"Server version: {connection.get_server_info()}")
-                return connection
-                
-        except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            with self.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute("SELECT @@max_connections")
+                    return int(cursor.fetchone()[0])
+                finally:
+                    cursor.close()
+        except self.Error as e:
+            logger.error("Error reading max_connections: %s", e)
             return None
-    
-    def initialize_database(self):
-        """Initialize database tables (call this once at app startup)"""
-        print("Initializing database tables...")
-        connection = self.get_connection()
-        if connection:
-            self.create_tables(connection)
-            connection.close()
-            print("Database initialization completed")
-        else:
-            print("Failed to initialize database: No connection")
-    
-    def create_tables(self, connection):
-        """Create employees and users tables if they don't exist"""
+
+    @contextmanager
+    def schema_lock(self, connection):
+        """Hold a server-wide named lock, so only one process migrates the database at a time.
+
+        MySQL commits each DDL statement on its own, so nothing is rolled
+        back if a migration fails part way; migrations are safe to rerun.
+        """
+        lock = f"{self.database}.schema_migrations"
+        cursor = connection.cursor()
         try:
-            cursor = connection.cursor()
-            
-            # Create employees table if it doesn't exist
-            create_employees_table = """
-            CREATE TABLE IF NOT EXISTS employees (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                position VARCHAR(100) NOT NULL,
-                department VARCHAR(100) NOT NULL,
-                salary DECIMAL(10,2) NOT NULL,
-                hire_date DATE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-            """
-            
-            cursor.execute(create_employees_table)
-            print("Employees table checked/created successfully")
-            
-            # Create users table if it doesn't exist
-            create_users_table = """
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role ENUM('admin', 'employee') DEFAULT 'employee',
-                employee_id INT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE SET NULL
-            )
-            """
-            
-            cursor.execute(create_users_table)
-            print("Users table checked/created successfully")
-            
-            # Create default admin user if not exists
-            cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
-            admin_count = cursor.fetchone()[0]
-            
-            if admin_count == 0:
-                cursor.execute("""
-                    INSERT INTO users (username, password, role) 
-                    VALUES ('admin', 'admin123', 'admin')
-                """)
-                print("Default admin user created (username: admin, password: admin123)")
-            else:
-                print("Admin user already exists")
-            
-            # Count current employees
-            cursor.execute("SELECT COUNT(*) FROM employees")
-            count = cursor.fetchone()[0]
-            print(f"Total employees in database: {count}")
-            
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (lock, MIGRATION_LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise self.Error(f"Timed out after {MIGRATION_LOCK_TIMEOUT}s waiting for another process to migrate")
+            try:
+                yield
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (lock,))
+                cursor.fetchall()
+        finally:
             cursor.close()
-            
-        except Error as e:
-            print(f"Error checking/creating tables: {e}")
+
+    def add_index(self, cursor, table, name, columns):
+        """Build the index online: reads and writes to table continue while InnoDB builds it"""
+        cursor.execute("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, name))
+        if cursor.fetchall():
+            return
+        # Fails, rather than falling back to a table copy under lock, where it can't be done in place
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} {columns}, ALGORITHM=INPLACE, LOCK=NONE")
+        logger.info("Created index %s on %s", name, table)
+
+def create_database():
+    """Build the storage backend selected by the DB_BACKEND environment variable"""
+    backend = os.getenv('DB_BACKEND', 'mysql').lower()
+    if backend == 'sqlite':
+        from db_sqlite import SQLiteDatabase
+        return SQLiteDatabase(os.getenv('SQLITE_PATH', 'employer_dashboard.db'))
+    if mysql is None:
+        raise RuntimeError("DB_BACKEND=mysql requires the mysql-connector-python package")
+    return MySQLDatabase()
 
 # Global database instance
-db = Database()
\ No newline at end of file
+db = create_database()
+register_stats('db_pool', 'Connection pool', db.pool_stats)
+register_stats('db_replicas', 'Read replica routing', db.replica_stats)
+
+# Exception classes of the selected backend, for models to catch
+Error = db.Error
+IntegrityError = db.IntegrityError
+DataError = db.DataError
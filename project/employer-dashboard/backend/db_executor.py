@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from metrics import register_stats
+
+class DatabaseBusyError(Exception):
+    """Raised when a database call cannot get a worker slot in time"""
+
+class DatabaseExecutor:
+    """Runs blocking model calls on a bounded thread pool off the IOLoop.
+
+    At most ``max_workers`` calls run at once. Up to ``max_queue`` more may
+    wait for a slot, each for at most ``queue_timeout`` seconds; anything
+    beyond that is rejected with DatabaseBusyError so handlers can shed load
+    with a 503 instead of letting latency grow without bound.
+    """
+
+    def __init__(self, max_workers=10, max_queue=100, queue_timeout=2.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-worker')
+        self._semaphore = None
+        self._waiting = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and return its result.
+
+        The call sees the caller's context variables, such as db.current_session.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise DatabaseBusyError("Database request queue is full")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise DatabaseBusyError(f"Timed out after {self.queue_timeout}s waiting for a database worker")
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, partial(fn, *args, **kwargs))
+        finally:
+            self._active -= 1
+            self._completed += 1
+            self._semaphore.release()
+
+    def resize(self, max_workers):
+        """Change the worker count; call before the executor is first used (e.g. right after forking)"""
+        self._executor.shutdown(wait=False)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-worker')
+        self._semaphore = None
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'active': self._active,
+            'waiting': self._waiting,
+            'completed': self._completed,
+            'rejected': self._rejected,
+        }
+
+# Global executor; defaults to one worker per pooled connection
+db_executor = DatabaseExecutor(
+    max_workers=int(os.getenv('DB_MAX_CONCURRENCY', os.getenv('DB_POOL_SIZE', 10))),
+    max_queue=int(os.getenv('DB_MAX_QUEUE', 100)),
+    queue_timeout=float(os.getenv('DB_QUEUE_TIMEOUT', 2)),
+)
+register_stats('db_executor', 'Database executor', db_executor.stats)
@@ -0,0 +1,170 @@
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from db import Database
+
+# Compiled statements kept per connection; the models use a few dozen
+# distinct SQL strings, so every one of them stays prepared
+STATEMENT_CACHE_SIZE = 256
+# How long a writer waits for another connection's write transaction
+BUSY_TIMEOUT = 5.0
+
+# Store dates, timestamps and decimals as text and convert columns declared
+# DATE, TIMESTAMP or DECIMAL back, so rows carry the same types MySQL returns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DECIMAL', lambda raw: Decimal(raw.decode()))
+sqlite3.register_converter('DATE', lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.fromisoformat(raw.decode()))
+
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_translated = {}
+
+def translate(operation):
+    """Rewrite a model's MySQL-style statement for SQLite.
+
+    %s placeholders become ?, and FOR UPDATE is dropped: writes run in
+    BEGIN IMMEDIATE transactions, which already hold the database's single
+    write lock. Results are memoized, so each distinct statement is
+    rewritten once and then always maps to the same prepared statement.
+    """
+    statement = _translated.get(operation)
+    if statement is None:
+        statement = _translated[operation] = _FOR_UPDATE.sub('', operation.replace('%s', '?'))
+    return statement
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """The subset of the mysql-connector cursor API the models use"""
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            cursor.row_factory = _dict_row
+
+    def execute(self, operation, params=()):
+        self._cursor.execute(translate(operation), params)
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(translate(operation), seq_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """A SQLite connection behind the subset of the mysql-connector connection API the models use.
+
+    The connection runs in autocommit mode; start_transaction() opens an
+    explicit write transaction. A pool hands each connection to one thread
+    at a time, so it may move between the executor's threads.
+    """
+    # Statements outside a transaction commit on their own, as with MySQL's autocommit
+    autocommit = True
+    unread_result = False
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                           detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                           cached_statements=STATEMENT_CACHE_SIZE)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        # With WAL, NORMAL only syncs at checkpoints and can't corrupt the database
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute("PRAGMA foreign_keys = ON")
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def cursor(self, buffered=None, dictionary=False, prepared=False):
+        # SQLite cursors step through results lazily, so buffered is ignored, and the
+        # connection's statement cache already keeps every statement compiled
+        return SQLiteCursor(self._connection.cursor(), dictionary=dictionary)
+
+    def start_transaction(self):
+        self._connection.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        self._connection.execute("SELECT 1")
+
+    def get_server_info(self):
+        return sqlite3.sqlite_version
+
+    def close(self):
+        self._connection.close()
+
+class SQLiteDatabase(Database):
+    """Embedded storage in a single SQLite file in WAL mode, for single-node installs, tests and benchmarks.
+
+    WAL lets readers run alongside the one writer; writers queue on the
+    database lock for up to BUSY_TIMEOUT seconds. Text columns compare
+    case-insensitively, matching MySQL's default collation.
+    """
+    engine = 'SQLite'
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    DataError = sqlite3.DataError
+    broken_errors = (sqlite3.InterfaceError,)
+    least = 'MIN'
+    greatest = 'MAX'
+
+    def __init__(self, path):
+        super().__init__(path, sqlite3.OperationalError)
+
+    def _create_connection(self):
+        return SQLiteConnection(self.database)
+
+    def upsert(self, key):
+        return f"ON CONFLICT ({key}) DO UPDATE SET"
+
+    def inserted(self, column):
+        return f"excluded.{column}"
+
+    def month_start(self, column):
+        return f"DATE({column}, 'start of month')"
+
+    @contextmanager
+    def schema_lock(self, connection):
+        """Run the migrations in one write transaction, which also keeps other processes out.
+
+        SQLite's DDL is transactional, so the migrations apply entirely or not at all.
+        """
+        connection.start_transaction()
+        try:
+            yield
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+
+    def add_index(self, cursor, table, name, columns):
+        # SQLite has no online index builds; writers wait on the database lock meanwhile
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}")
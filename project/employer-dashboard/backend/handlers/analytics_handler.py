@@ -0,0 +1,100 @@
+import logging
+from analytics import (DEFAULT_PERCENTILES, GROUP_COLUMNS, MAX_HISTOGRAM_BINS, MAX_PERCENTILES, MAX_PROJECTION_MONTHS,
+                       employee_analytics)
+from db_executor import DatabaseBusyError
+from handlers.base_handler import BaseHandler
+
+logger = logging.getLogger(__name__)
+
+REPORTS = ('percentiles', 'tenure', 'projection', 'histogram')
+
+def parse_group_columns(value):
+    """Parse a comma-separated ?by= list of GROUP_COLUMNS"""
+    by = tuple(part.strip() for part in value.split(',') if part.strip())
+    unknown = [column for column in by if column not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"Cannot group by {', '.join(unknown)}")
+    if len(set(by)) != len(by):
+        raise ValueError("Each column can only be grouped by once")
+    return by
+
+def parse_percentiles(value):
+    try:
+        percentiles = tuple(float(part) for part in value.split(',') if part.strip())
+    except ValueError:
+        raise ValueError("percentiles must be comma-separated numbers")
+    if not 1 <= len(percentiles) <= MAX_PERCENTILES or not all(0 <= p <= 100 for p in percentiles):
+        raise ValueError(f"Give 1 to {MAX_PERCENTILES} percentiles between 0 and 100")
+    return percentiles
+
+class AnalyticsHandler(BaseHandler):
+    """Salary and headcount reports computed from the in-memory columnar snapshot"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        self.set_status(204)
+        self.finish()
+
+    async def get(self):
+        if not self.authorize(role='admin'):
+            return
+        if not employee_analytics.available:
+            self.set_status(503)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Analytics requires the numpy package"})
+            return
+        try:
+            report = self.get_query_argument('report', 'percentiles')
+            filters = {
+                'department': self.get_query_argument('department', None) or None,
+                'position': self.get_query_argument('position', None) or None,
+            }
+            if report == 'percentiles':
+                by = parse_group_columns(self.get_query_argument('by', 'department'))
+                percentiles = parse_percentiles(self.get_query_argument('percentiles', '')) \
+                    if self.get_query_argument('percentiles', '') else DEFAULT_PERCENTILES
+                groups = await self.run_db(employee_analytics.salary_percentiles, by, percentiles, **filters)
+                self.write_json({"report": report, "groups": groups})
+            elif report == 'tenure':
+                by = parse_group_columns(self.get_query_argument('by', ''))
+                cohorts = await self.run_db(employee_analytics.tenure, by, **filters)
+                self.write_json({"report": report, "cohorts": cohorts})
+            elif report == 'projection':
+                by = parse_group_columns(self.get_query_argument('by', ''))
+                months = int(self.get_query_argument('months', 12))
+                if not 1 <= months <= MAX_PROJECTION_MONTHS:
+                    raise ValueError(f"months must be between 1 and {MAX_PROJECTION_MONTHS}")
+                annual_raise = float(self.get_query_argument('raise', 3.0))
+                if not -100 < annual_raise <= 100:
+                    raise ValueError("raise must be a percentage above -100 and at most 100")
+                projection = await self.run_db(employee_analytics.payroll_projection, months, annual_raise, by,
+                                               **filters)
+                self.write_json({"report": report, **projection})
+            elif report == 'histogram':
+                bins = int(self.get_query_argument('bins', 20))
+                if not 1 <= bins <= MAX_HISTOGRAM_BINS:
+                    raise ValueError(f"bins must be between 1 and {MAX_HISTOGRAM_BINS}")
+                histogram = await self.run_db(employee_analytics.salary_histogram, bins, **filters)
+                self.write_json({"report": report, **histogram})
+            else:
+                raise ValueError(f"Unknown report '{report}'; use one of {', '.join(REPORTS)}")
+        except ValueError as e:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Invalid query: {str(e)}"})
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            logger.exception("Error computing analytics")
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
@@ -1,8 +1,11 @@
-import tornado.web
 import json
+from auth_tokens import TokenError, issue_token_pair, revoke_token, verify_token
+from db_executor import DatabaseBusyError
+from handlers.base_handler import BaseHandler
 from models.user_model import User
+from passwords import DUMMY_HASH, hash_password_async, needs_rehash, verify_password_async
 
-class LoginHandler(tornado.web.RequestHandler):
+class LoginHandler(BaseHandler):
     def set_default_headers(self):
         # Allow both common frontend development ports
         allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
@@ -18,7 +21,7 @@ class LoginHandler(tornado.web.RequestHandler):
         self.set_status(204)
         self.finish()
     
-    def post(self):
+    async def post(self):
         try:
             data = json.loads(self.request.body)
             username = data.get('username')
@@ -30,14 +33,26 @@ class LoginHandler(tornado.web.RequestHandler):
                 self.write({"error": "Username and password are required"})
                 return
             
-            user = User.authenticate(username, password)
+            user = await self.run_db(User.get_by_username, username)
+            # Unknown usernames are checked against a dummy hash so they take as long as wrong passwords
+            valid = await verify_password_async(password, user.password if user else DUMMY_HASH)
+            if not valid:
+                user = None
+            
+            if user and needs_rehash(user.password):
+                # Upgrade plaintext or outdated hashes while we have the password
+                try:
+                    new_hash = await hash_password_async(password)
+                    await self.run_db(User.update_password, user.id, new_hash)
+                except DatabaseBusyError:
+                    pass
             
             if user:
-                self.set_header("Content-Type", "application/json")
-                self.write({
+                self.write_json({
                     "success": True,
                     "user": user.to_dict(),
-                    "message": "Login successful"
+                    "message": "Login successful",
+                    **issue_token_pair(user)
                 })
             else:
                 self.set_status(401)
@@ -48,7 +63,92 @@ class LoginHandler(tornado.web.RequestHandler):
             self.set_status(400)
             self.set_header("Content-Type", "application/json")
             self.write({"error": "Invalid JSON data"})
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class TokenRefreshHandler(BaseHandler):
+    """Trades a refresh token for a new token pair without a database lookup"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        self.set_status(204)
+        self.finish()
+
+    async def post(self):
+        try:
+            data = json.loads(self.request.body)
+            if not isinstance(data, dict):
+                self.set_status(400)
+                self.set_header("Content-Type", "application/json")
+                self.write({"error": "Expected a JSON object with a refresh_token"})
+                return
+            claims = verify_token(data.get('refresh_token') or '', expected_type='refresh')
+            # Refresh tokens are single use; the shared list rejects a replay on any worker
+            if not await self.run_db(revoke_token, claims):
+                raise TokenError("Token has been revoked")
+            # Tokens carry the role and employee they were issued with, so reissue from the current row
+            user = await self.run_db(User.get_by_id, claims['sub'])
+            if user is None:
+                raise TokenError("User no longer exists")
+            self.write_json(issue_token_pair(user))
+        except json.JSONDecodeError:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Invalid JSON data"})
+        except TokenError as e:
+            self.set_status(401)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": str(e)})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
             self.set_status(500)
             self.set_header("Content-Type", "application/json")
-            self.write({"error": f"Internal server error: {str(e)}"})
\ No newline at end of file
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class LogoutHandler(BaseHandler):
+    """Revokes the caller's access token and, if given, its refresh token"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        self.set_status(204)
+        self.finish()
+
+    async def post(self):
+        if not self.authorize():
+            return
+        try:
+            await self.run_db(revoke_token, self.current_user)
+            try:
+                data = json.loads(self.request.body or b'{}')
+                if isinstance(data, dict) and data.get('refresh_token'):
+                    await self.run_db(revoke_token, verify_token(data['refresh_token'], expected_type='refresh'))
+            except (json.JSONDecodeError, TokenError):
+                pass
+        except DatabaseBusyError:
+            self.write_busy()
+            return
+        self.set_header("Content-Type", "application/json")
+        self.write({"message": "Logged out"})
@@ -0,0 +1,146 @@
+import hashlib
+import time
+from email.utils import parsedate_to_datetime
+import tornado.web
+from tornado import httputil
+from auth_tokens import TokenError, verify_token
+from compression import MIN_SIZE, compress, compressed_bodies, negotiate
+from db import current_session
+from db_executor import db_executor
+from metrics import SERIALIZATION_DURATION
+from serialization import dumps
+
+class BaseHandler(tornado.web.RequestHandler):
+    """Shared helpers for the API handlers"""
+
+    # Requests currently being handled by this process, so shutdown can drain them
+    in_flight = 0
+
+    def prepare(self):
+        BaseHandler.in_flight += 1
+        self._counted = True
+        # Lets the database keep this user's reads on the primary right after they write
+        claims = self.current_user
+        current_session.set(claims['sub'] if claims else None)
+
+    def on_finish(self):
+        if getattr(self, '_counted', False):
+            BaseHandler.in_flight -= 1
+            self._counted = False
+
+    async def run_db(self, fn, *args, **kwargs):
+        """Run a blocking model call without stalling the IOLoop"""
+        return await db_executor.run(fn, *args, **kwargs)
+
+    def get_current_user(self):
+        """Return the claims of a valid bearer token, verified in-process without touching the database"""
+        scheme, _, token = self.request.headers.get("Authorization", "").partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        try:
+            return verify_token(token.strip())
+        except TokenError:
+            return None
+
+    def authorize(self, role=None, employee_id=None):
+        """Check the caller's token, writing a 401/403 and returning False when access is denied.
+
+        Admins may do anything. Other users need the given role, and must own
+        employee_id when one is given.
+        """
+        claims = self.current_user
+        if claims is None:
+            self.set_status(401)
+            self.set_header("WWW-Authenticate", "Bearer")
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Authentication required"})
+            return False
+        if claims['role'] == 'admin':
+            return True
+        if (role and claims['role'] != role) or (employee_id is not None and claims.get('emp') != employee_id):
+            self.set_status(403)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Not allowed"})
+            return False
+        return True
+
+    def write_json(self, value, version=None):
+        """Write value as the JSON response body through the shared encoder.
+
+        With a version, the body is compressed here and kept in
+        compressed_bodies for write_cached() to serve until the version
+        changes. Only pass one for responses that are the same for every
+        caller allowed to see them.
+        """
+        self.set_header("Content-Type", "application/json")
+        started = time.perf_counter()
+        body = dumps(value)
+        SERIALIZATION_DURATION.observe(time.perf_counter() - started, type(self).__name__)
+        encoding = negotiate(self.request.headers.get("Accept-Encoding")) if version is not None else None
+        if encoding and len(body) >= MIN_SIZE:
+            body = compress(body, encoding)
+            compressed_bodies.set((self.request.uri, version, encoding), body)
+            self.set_header("Content-Encoding", encoding)
+        self.write(body)
+
+    def write_cached(self, version):
+        """Write the compressed body cached for this URL at version, returning False if there is none.
+
+        Call it once the request is authorized and before loading anything;
+        on a miss, build the response and pass the same version to
+        write_json().
+        """
+        encoding = negotiate(self.request.headers.get("Accept-Encoding"))
+        body = compressed_bodies.get((self.request.uri, version, encoding)) if encoding else None
+        if body is None:
+            return False
+        self.set_header("Content-Type", "application/json")
+        self.set_header("Content-Encoding", encoding)
+        self.write(body)
+        return True
+
+    def write_busy(self):
+        """Shed load when the database executor is saturated"""
+        self.clear_validators()
+        self.set_status(503)
+        self.set_header("Retry-After", "1")
+        self.set_header("Content-Type", "application/json")
+        self.write({"error": "Service temporarily overloaded, please retry"})
+
+    def not_modified(self, *version, last_modified=None):
+        """Set validators derived from a resource version and answer 304 when the client's copy is current.
+
+        Returns True if a 304 was set, in which case the handler should return
+        without loading or serializing anything. Timestamps come back from
+        MySQL without a zone and are treated as UTC.
+        """
+        digest = hashlib.sha1(repr(version).encode()).hexdigest()
+        self.set_header("Etag", f'"{digest}"')
+        self.set_header("Cache-Control", "no-cache")
+        if last_modified is not None:
+            self.set_header("Last-Modified", httputil.format_timestamp(last_modified))
+
+        if self.request.headers.get("If-None-Match"):
+            modified = not self.check_etag_header()
+        else:
+            modified = not self._unmodified_since(last_modified)
+
+        if not modified:
+            self.set_status(304)
+        return not modified
+
+    def clear_validators(self):
+        """Remove the headers set by not_modified(), for a response that failed after they were set"""
+        for name in ("Etag", "Last-Modified", "Cache-Control"):
+            self.clear_header(name)
+
+    def _unmodified_since(self, last_modified):
+        header = self.request.headers.get("If-Modified-Since")
+        if not header or last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(header).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second precision
+        return last_modified.replace(microsecond=0) <= since
@@ -1,10 +1,55 @@
-import tornado.web
+import asyncio
+import csv
+import io
 import json
-from models.employee_model import Employee
+import logging
+import os
+from tornado.iostream import StreamClosedError
+from db_executor import DatabaseBusyError
+from handlers.base_handler import BaseHandler
+from models.employee_model import Employee, DEFAULT_PAGE_SIZE
 from models.user_model import User
+from passwords import hash_password_async
+from search_index import employee_search, MIN_QUERY_LENGTH
+from serialization import dumps_items, dumps_lines, encode_employees, encode_employees_by_id
 from datetime import datetime
 
-class EmployeeHandler(tornado.web.RequestHandler):
+logger = logging.getLogger(__name__)
+
+# Query parameters that switch GET /api/employees to the paginated response
+PAGE_ARGUMENTS = ('limit', 'cursor', 'sort', 'order', 'department', 'position', 'hired_from', 'hired_to')
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'csv': 'text/csv; charset=UTF-8',
+}
+EXPORT_COLUMNS = ('id', 'name', 'email', 'position', 'department', 'salary', 'hire_date', 'created_at', 'updated_at')
+MAX_CONCURRENT_EXPORTS = int(os.getenv('MAX_CONCURRENT_EXPORTS', 2))
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 50000))
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+def parse_ids(values):
+    """Return employee ids given as integers or digit strings, raising ValueError for anything else"""
+    ids = []
+    for value in values:
+        if isinstance(value, str) and value.strip().isdigit():
+            ids.append(int(value))
+        elif isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+            ids.append(value)
+        else:
+            raise ValueError(f"Invalid employee id: {value!r}")
+    return ids
+
+def batch_response(ids, employees):
+    """The multi-get response: found employees keyed by id, in request order, plus the ids not found"""
+    return {
+        "employees": encode_employees_by_id(employees[employee_id] for employee_id in ids if employee_id in employees),
+        "missing": [employee_id for employee_id in dict.fromkeys(ids) if employee_id not in employees]
+    }
+
+class EmployeeHandler(BaseHandler):
     def set_default_headers(self):
     # Allow both common frontend development ports
         allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
@@ -20,22 +65,76 @@ class EmployeeHandler(tornado.web.RequestHandler):
         self.set_status(204)
         self.finish()
     
-    def get(self):
+    async def get(self):
+        if not self.authorize():
+            return
         try:
-            employees = Employee.get_all()
+            # The list only changes when the change log advances or the latest update does
+            version = await self.run_db(Employee.get_collection_version)
+            if version and self.not_modified(version, self.request.query, last_modified=version[-1]):
+                return
+            # Identical list requests share one compressed body until the list changes
+            if version and self.write_cached(version):
+                return
+
+            # ?ids=1,2,3 fetches just those employees in one query
+            ids = self.get_query_argument('ids', None)
+            if ids is not None:
+                ids = parse_ids(filter(None, ids.split(',')))
+                employees = await self.run_db(Employee.get_many, ids)
+                self.write_json(batch_response(ids, employees), version=version)
+                return
+
+            # Without paging or filter parameters keep returning the full list for older clients
+            if not any(self.get_query_argument(name, None) for name in PAGE_ARGUMENTS):
+                employees = await self.run_db(Employee.get_all)
+                self.write_json(encode_employees(employees), version=version)
+                return
+
+            limit = int(self.get_query_argument('limit', DEFAULT_PAGE_SIZE))
+            employees, next_cursor = await self.run_db(
+                Employee.get_page,
+                limit=limit,
+                cursor=self.get_query_argument('cursor', None),
+                department=self.get_query_argument('department', None),
+                position=self.get_query_argument('position', None),
+                hired_from=self._parse_date('hired_from'),
+                hired_to=self._parse_date('hired_to'),
+                sort=self.get_query_argument('sort', 'created_at'),
+                order=self.get_query_argument('order', 'desc').lower()
+            )
+            self.write_json({
+                "employees": encode_employees(employees),
+                "next_cursor": next_cursor,
+                "limit": limit
+            }, version=version)
+        except ValueError as e:
+            self.clear_validators()
+            self.set_status(400)
             self.set_header("Content-Type", "application/json")
-            self.write(json.dumps(employees, default=str))
+            self.write({"error": f"Invalid query: {str(e)}"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
+            logger.exception("Error listing employees")
+            self.clear_validators()
             self.set_status(500)
             self.write({"error": f"Internal server error: {str(e)}"})
-    
-    def post(self):
+
+    def _parse_date(self, name):
+        value = self.get_query_argument(name, None)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+    async def post(self):
+        if not self.authorize(role='admin'):
+            return
         try:
-            print("Received POST request to create employee")
-            print(f"Request body: {self.request.body}")
-            
             data = json.loads(self.request.body)
-            print(f"Parsed data: {data}")
             
             # Validate required fields
             required_fields = ['name', 'email', 'position', 'department', 'salary', 'hire_date']
@@ -69,47 +168,220 @@ class EmployeeHandler(tornado.web.RequestHandler):
                 hire_date=data['hire_date']
             )
             
-            print(f"Created employee object: {employee.__dict__}")
-            
-            if employee.save():
-                print("Employee saved successfully")
+            if await self.run_db(employee.save):
+                logger.debug("Created employee %s", employee.id)
                 
                 # Create user account if username and password provided
                 if 'username' in data and 'password' in data:
-                    if User.create_employee_user(data['username'], data['password'], employee.id):
-                        print(f"User account created for employee {employee.id}")
+                    password_hash = await hash_password_async(data['password'])
+                    if await self.run_db(User.create_employee_user, data['username'], None, employee.id,
+                                         password_hash=password_hash):
+                        logger.debug("Created user account for employee %s", employee.id)
                     else:
-                        print(f"Failed to create user account for employee {employee.id}")
+                        logger.warning("Failed to create user account for employee %s", employee.id)
                 
                 self.set_status(201)
                 self.set_header("Content-Type", "application/json")
                 self.write({"message": "Employee created successfully", "id": employee.id})
             else:
-                print("Failed to save employee")
+                logger.error("Failed to save employee")
                 self.set_status(500)
                 self.set_header("Content-Type", "application/json")
                 self.write({"error": "Failed to create employee"})
                 
         except json.JSONDecodeError:
-            print("JSON decode error")
             self.set_status(400)
             self.set_header("Content-Type", "application/json")
             self.write({"error": "Invalid JSON data"})
         except ValueError as e:
-            print(f"Value error: {e}")
+            logger.debug("Rejected employee: %s", e)
             self.set_status(400)
             self.set_header("Content-Type", "application/json")
             self.write({"error": f"Invalid data: {str(e)}"})
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            logger.exception("Unexpected error creating employee")
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class EmployeeBulkHandler(BaseHandler):
+    """Creates many employees from a JSON array or a CSV upload"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        # Handle preflight requests
+        self.set_status(204)
+        self.finish()
+
+    async def post(self):
+        if not self.authorize(role='admin'):
+            return
+        try:
+            rows = self._parse_rows()
+            if not rows:
+                self.set_status(400)
+                self.set_header("Content-Type", "application/json")
+                self.write({"error": "No rows to import"})
+                return
+            if len(rows) > BULK_IMPORT_MAX_ROWS:
+                self.set_status(413)
+                self.set_header("Content-Type", "application/json")
+                self.write({"error": f"At most {BULK_IMPORT_MAX_ROWS} rows can be imported per request"})
+                return
+
+            results = await self.run_db(Employee.bulk_create, rows)
+            created = sum(1 for result in results if 'id' in result)
+            self.set_status(201 if created else 200)
+            self.write_json({
+                "created": created,
+                "failed": len(results) - created,
+                "results": results
+            })
+        except (json.JSONDecodeError, UnicodeDecodeError, csv.Error) as e:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Invalid import data: {str(e)}"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            logger.exception("Unexpected error during bulk import")
             self.set_status(500)
             self.set_header("Content-Type", "application/json")
             self.write({"error": f"Internal server error: {str(e)}"})
 
-class EmployeeDetailHandler(tornado.web.RequestHandler):
+    def _parse_rows(self):
+        """Read rows from a JSON array, a text/csv body or a multipart 'file' field"""
+        body = self.request.body
+        content_type = self.request.headers.get("Content-Type", "")
+        is_csv = content_type.startswith("text/csv")
+
+        uploads = self.request.files.get('file')
+        if uploads:
+            body = uploads[0]['body']
+            is_csv = uploads[0]['filename'].lower().endswith('.csv') or uploads[0]['content_type'].startswith('text/csv')
+
+        if is_csv:
+            return list(csv.DictReader(io.StringIO(body.decode('utf-8-sig'))))
+
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get('employees')
+        if not isinstance(data, list):
+            raise json.JSONDecodeError("Expected a JSON array of employees", '', 0)
+        return data
+
+class EmployeeBatchHandler(BaseHandler):
+    """Fetches many employees by id; the POST form of GET /api/employees?ids= for long id lists"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "POST, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        # Handle preflight requests
+        self.set_status(204)
+        self.finish()
+
+    async def post(self):
+        if not self.authorize():
+            return
+        try:
+            data = json.loads(self.request.body)
+            if isinstance(data, dict):
+                data = data.get('ids')
+            if not isinstance(data, list):
+                raise ValueError("Expected a JSON array of ids or an object with an 'ids' array")
+            ids = parse_ids(data)
+            employees = await self.run_db(Employee.get_many, ids)
+            self.write_json(batch_response(ids, employees))
+        except json.JSONDecodeError:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Invalid JSON data"})
+        except ValueError as e:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": str(e)})
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            logger.exception("Error fetching employees by id")
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class EmployeeSearchHandler(BaseHandler):
+    """Ranked, typo-tolerant prefix search over name, email, position, department and id"""
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        # Handle preflight requests
+        self.set_status(204)
+        self.finish()
+
+    async def get(self):
+        if not self.authorize():
+            return
+        try:
+            query = self.get_query_argument('q', '').strip()
+            if len(query) < MIN_QUERY_LENGTH:
+                raise ValueError(f"q must be at least {MIN_QUERY_LENGTH} characters")
+            limit = int(self.get_query_argument('limit', SEARCH_PAGE_SIZE))
+            offset = int(self.get_query_argument('offset', 0))
+            if not 1 <= limit <= MAX_SEARCH_PAGE_SIZE:
+                raise ValueError(f"Limit must be between 1 and {MAX_SEARCH_PAGE_SIZE}")
+            if offset < 0:
+                raise ValueError("Offset must not be negative")
+
+            employees, total = await self.run_db(employee_search.search, query, limit=limit, offset=offset)
+            self.write_json({
+                "employees": encode_employees(employees),
+                "total": total,
+                "next_offset": offset + limit if offset + limit < total else None,
+                "limit": limit
+            })
+        except ValueError as e:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": str(e)})
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            logger.exception("Error searching employees")
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class EmployeeDetailHandler(BaseHandler):
     def set_default_headers(self):
         self.set_header("Access-Control-Allow-Origin", "*")
-        self.set_header("Access-Control-Allow-Headers", "Content-Type")
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
         self.set_header("Access-Control-Allow-Methods", "GET, DELETE, OPTIONS")
     
     def options(self, employee_id):
@@ -117,25 +389,37 @@ class EmployeeDetailHandler(tornado.web.RequestHandler):
         self.set_status(204)
         self.finish()
     
-    def get(self, employee_id):
+    async def get(self, employee_id):
+        if not self.authorize():
+            return
         try:
-            employee = Employee.get_by_id(int(employee_id))
+            employee_id = int(employee_id)
+            version = await self.run_db(Employee.get_version, employee_id)
+            if version and self.not_modified(employee_id, *version, last_modified=version[0]):
+                return
+
+            employee = await self.run_db(Employee.get_by_id, employee_id)
             if employee:
-                self.set_header("Content-Type", "application/json")
-                self.write(json.dumps(employee, default=str))
+                self.write_json(employee.to_dict())
             else:
                 self.set_status(404)
                 self.write({"error": "Employee not found"})
         except ValueError:
             self.set_status(400)
             self.write({"error": "Invalid employee ID"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
+            logger.exception("Error fetching employee")
+            self.clear_validators()
             self.set_status(500)
             self.write({"error": f"Internal server error: {str(e)}"})
     
-    def delete(self, employee_id):
+    async def delete(self, employee_id):
+        if not self.authorize(role='admin'):
+            return
         try:
-            if Employee.delete(int(employee_id)):
+            if await self.run_db(Employee.delete_by_id, int(employee_id)):
                 self.set_header("Content-Type", "application/json")
                 self.write({"message": "Employee deleted successfully"})
             else:
@@ -144,6 +428,111 @@ class EmployeeDetailHandler(tornado.web.RequestHandler):
         except ValueError:
             self.set_status(400)
             self.write({"error": "Invalid employee ID"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
             self.set_status(500)
-            self.write({"error": f"Internal server error: {str(e)}"})
\ No newline at end of file
+            self.write({"error": f"Internal server error: {str(e)}"})
+
+class EmployeeExportHandler(BaseHandler):
+    """Streams the whole employees table as NDJSON, a JSON array or CSV"""
+
+    # Each running export holds a pooled connection until it finishes
+    active_exports = 0
+
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        # Handle preflight requests
+        self.set_status(204)
+        self.finish()
+
+    async def get(self):
+        if not self.authorize(role='admin'):
+            return
+        export_format = self.get_query_argument('format', 'ndjson').lower()
+        if export_format not in EXPORT_CONTENT_TYPES:
+            self.set_status(400)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Unsupported export format: {export_format}"})
+            return
+
+        if EmployeeExportHandler.active_exports >= MAX_CONCURRENT_EXPORTS:
+            self.write_busy()
+            return
+
+        EmployeeExportHandler.active_exports += 1
+        batches = None
+        started = False
+        try:
+            batches = Employee.iter_batches()
+            batch = await self.run_db(next, batches, None)
+
+            self.set_header("Content-Type", EXPORT_CONTENT_TYPES[export_format])
+            self.set_header("Content-Disposition", f'attachment; filename="employees.{export_format}"')
+            started = True
+
+            if export_format == 'csv':
+                self.write(self._csv_chunk([EXPORT_COLUMNS]))
+            elif export_format == 'json':
+                self.write('[')
+
+            first = True
+            while batch is not None:
+                rows = encode_employees(batch)
+                if export_format == 'ndjson':
+                    self.write(dumps_lines(rows))
+                elif export_format == 'json':
+                    chunk = dumps_items(rows)
+                    self.write(chunk if first else b',\n' + chunk)
+                else:
+                    self.write(self._csv_chunk([row[column] for column in EXPORT_COLUMNS] for row in rows))
+                first = False
+                # Waits until the chunk has been handed to the socket, so a slow
+                # client throttles how fast rows are read from the database
+                await self.flush()
+                batch = await self.run_db(next, batches, None)
+
+            if export_format == 'json':
+                self.write(']')
+        except StreamClosedError:
+            logger.info("Client disconnected during employee export")
+        except DatabaseBusyError:
+            if started:
+                self._abort("database is busy")
+            else:
+                self.write_busy()
+        except Exception as e:
+            logger.exception("Error exporting employees")
+            if started:
+                self._abort(str(e))
+            else:
+                self.set_status(500)
+                self.set_header("Content-Type", "application/json")
+                self.write({"error": f"Internal server error: {str(e)}"})
+        finally:
+            EmployeeExportHandler.active_exports -= 1
+            if batches is not None:
+                # Closing releases the pooled connection, so it never runs on the IOLoop
+                try:
+                    await self.run_db(batches.close)
+                except DatabaseBusyError:
+                    await asyncio.get_running_loop().run_in_executor(None, batches.close)
+
+    def _abort(self, reason):
+        """Drop the connection mid-export so the client sees a truncated download, not a complete 200"""
+        logger.error("Aborting employee export after it started: %s", reason)
+        self.request.connection.close()
+
+    def _csv_chunk(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
@@ -0,0 +1,91 @@
+import logging
+import time
+import tornado.ioloop
+import tornado.websocket
+from auth_tokens import TokenError, verify_token
+from change_feed import change_feed
+from db_executor import DatabaseBusyError
+
+logger = logging.getLogger(__name__)
+
+# Close codes from the range WebSocket leaves to applications
+TOKEN_EXPIRED = 4001
+
+class ChangeFeedHandler(tornado.websocket.WebSocketHandler):
+    """Pushes employee changes to the client as JSON messages as they are committed.
+
+    Browsers can't set headers on a WebSocket, so the access token may be
+    passed as ?token= instead of an Authorization header. Pass ?since= with
+    the last seq received to pick up where a dropped connection left off;
+    change_feed.ChangeFeed.subscribe describes the messages.
+    """
+
+    # Open feeds in this process, so shutdown can close them
+    connections = set()
+
+    def check_origin(self, origin):
+        # Allow both common frontend development ports, as the REST handlers do
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        return origin in allowed_origins or super().check_origin(origin)
+
+    def get_current_user(self):
+        scheme, _, token = self.request.headers.get("Authorization", "").partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            token = self.get_query_argument('token', '')
+        if not token:
+            return None
+        try:
+            return verify_token(token.strip())
+        except TokenError:
+            return None
+
+    async def get(self, *args, **kwargs):
+        # Refuse before upgrading, so the client gets a status code
+        if self.current_user is None:
+            self.set_status(401)
+            self.finish({"error": "Authentication required"})
+            return
+        self.since = None
+        since = self.get_query_argument('since', None)
+        if since is not None:
+            try:
+                self.since = int(since)
+            except ValueError:
+                self.set_status(400)
+                self.finish({"error": "since must be a sequence number"})
+                return
+        self.subscription = None
+        self.expiry = None
+        await super().get(*args, **kwargs)
+
+    async def open(self):
+        try:
+            subscription = await change_feed.subscribe(self.write_message, self.since)
+        except DatabaseBusyError:
+            self.close(1013, "Try again later")
+            return
+        except Exception as e:
+            logger.error("Error subscribing to the change feed: %s", e)
+            self.close(1011, "Change feed unavailable")
+            return
+        if self.ws_connection is None or self.ws_connection.is_closing():
+            # The client left while we were subscribing
+            change_feed.unsubscribe(subscription)
+            return
+        self.subscription = subscription
+        ChangeFeedHandler.connections.add(self)
+        self.expiry = tornado.ioloop.IOLoop.current().call_later(
+            max(0, self.current_user['exp'] - time.time()), self.close, TOKEN_EXPIRED, "Token expired")
+
+    def on_message(self, message):
+        # Clients only listen
+        pass
+
+    def on_close(self):
+        ChangeFeedHandler.connections.discard(self)
+        if self.subscription is not None:
+            change_feed.unsubscribe(self.subscription)
+            self.subscription = None
+        if self.expiry is not None:
+            tornado.ioloop.IOLoop.current().remove_timeout(self.expiry)
+            self.expiry = None
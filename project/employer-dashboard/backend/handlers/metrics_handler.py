@@ -0,0 +1,20 @@
+import hmac
+import os
+from handlers.base_handler import BaseHandler
+from metrics import render
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+class MetricsHandler(BaseHandler):
+    """Prometheus scrape endpoint for this process's metrics"""
+
+    def get(self):
+        if METRICS_TOKEN and not hmac.compare_digest(self.request.headers.get("Authorization", ""),
+                                                     f"Bearer {METRICS_TOKEN}"):
+            self.set_status(401)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": "Authentication required"})
+            return
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(render())
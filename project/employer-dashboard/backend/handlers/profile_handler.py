@@ -1,8 +1,12 @@
-import tornado.web
 import json
+import logging
+from db_executor import DatabaseBusyError
+from handlers.base_handler import BaseHandler
 from models.employee_model import Employee
 
-class ProfileHandler(tornado.web.RequestHandler):
+logger = logging.getLogger(__name__)
+
+class ProfileHandler(BaseHandler):
     def set_default_headers(self):
         # Allow both common frontend development ports
         allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
@@ -17,34 +21,21 @@ class ProfileHandler(tornado.web.RequestHandler):
         self.set_status(204)
         self.finish()
     
-    def get(self, employee_id):
+    async def get(self, employee_id):
+        if not self.authorize(employee_id=int(employee_id)):
+            return
         try:
-            print(f"Fetching profile for employee ID: {employee_id}")
-            employee = Employee.get_by_id(int(employee_id))
+            employee_id = int(employee_id)
+            version = await self.run_db(Employee.get_version, employee_id)
+            if version and self.not_modified(employee_id, *version, last_modified=version[0]):
+                return
+
+            employee = await self.run_db(Employee.get_by_id, employee_id)
             
             if employee:
-                print(f"Found employee: {employee.name}")
-                # Convert Employee object to dictionary for JSON serialization
-                employee_dict = {
-                    'id': employee.id,
-                    'name': employee.name,
-                    'email': employee.email,
-                    'position': employee.position,
-                    'department': employee.department,
-                    'salary': float(employee.salary) if employee.salary is not None else 0.0,
-                    'hire_date': employee.hire_date.strftime('%Y-%m-%d') if hasattr(employee.hire_date, 'strftime') else str(employee.hire_date),
-                }
-                
-                # Handle optional fields
-                if employee.created_at:
-                    employee_dict['created_at'] = employee.created_at.strftime('%Y-%m-%d %H:%M:%S') if hasattr(employee.created_at, 'strftime') else str(employee.created_at)
-                if employee.updated_at:
-                    employee_dict['updated_at'] = employee.updated_at.strftime('%Y-%m-%d %H:%M:%S') if hasattr(employee.updated_at, 'strftime') else str(employee.updated_at)
-                
-                self.set_header("Content-Type", "application/json")
-                self.write(json.dumps(employee_dict))
+                self.write_json(employee.to_dict())
             else:
-                print(f"Employee with ID {employee_id} not found in database")
+                logger.debug("Employee %s not found", employee_id)
                 self.set_status(404)
                 self.set_header("Content-Type", "application/json")
                 self.write({"error": "Employee not found"})
@@ -52,13 +43,18 @@ class ProfileHandler(tornado.web.RequestHandler):
             self.set_status(400)
             self.set_header("Content-Type", "application/json")
             self.write({"error": "Invalid employee ID"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
-            print(f"Error in profile handler: {str(e)}")
+            logger.exception("Error in profile handler")
+            self.clear_validators()
             self.set_status(500)
             self.set_header("Content-Type", "application/json")
             self.write({"error": f"Internal server error: {str(e)}"})
     
-    def put(self, employee_id):
+    async def put(self, employee_id):
+        if not self.authorize(employee_id=int(employee_id)):
+            return
         try:
             data = json.loads(self.request.body)
             
@@ -72,7 +68,7 @@ class ProfileHandler(tornado.web.RequestHandler):
                 self.write({"error": "No valid fields to update"})
                 return
             
-            if Employee.update_profile(int(employee_id), update_data):
+            if await self.run_db(Employee.update_profile, int(employee_id), update_data):
                 self.set_header("Content-Type", "application/json")
                 self.write({"message": "Profile updated successfully"})
             else:
@@ -88,6 +84,8 @@ class ProfileHandler(tornado.web.RequestHandler):
             self.set_status(400)
             self.set_header("Content-Type", "application/json")
             self.write({"error": "Invalid employee ID"})
+        except DatabaseBusyError:
+            self.write_busy()
         except Exception as e:
             self.set_status(500)
             self.set_header("Content-Type", "application/json")
@@ -0,0 +1,37 @@
+import logging
+from db_executor import DatabaseBusyError
+from handlers.base_handler import BaseHandler
+from models.stats_model import EmployeeStats
+
+logger = logging.getLogger(__name__)
+
+class StatsHandler(BaseHandler):
+    def set_default_headers(self):
+        # Allow both common frontend development ports
+        allowed_origins = ["http://localhost:3000", "http://localhost:5173"]
+        origin = self.request.headers.get('Origin')
+        if origin in allowed_origins:
+            self.set_header("Access-Control-Allow-Origin", origin)
+        self.set_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        self.set_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.set_header("Access-Control-Allow-Credentials", "true")
+
+    def options(self):
+        self.set_status(204)
+        self.finish()
+
+    async def get(self):
+        if not self.authorize():
+            return
+        try:
+            # Tornado's automatic ETag turns an unchanged summary into a 304
+            summary = await self.run_db(EmployeeStats.get_summary)
+            self.set_header("Cache-Control", "no-cache")
+            self.write_json(summary)
+        except DatabaseBusyError:
+            self.write_busy()
+        except Exception as e:
+            logger.exception("Error fetching stats")
+            self.set_status(500)
+            self.set_header("Content-Type", "application/json")
+            self.write({"error": f"Internal server error: {str(e)}"})
@@ -0,0 +1,56 @@
+import logging
+import os
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` records per message template and level every `interval` seconds.
+
+    Records are keyed by their unformatted message, so a failing query that
+    logs the same error on every request produces a handful of lines per
+    interval plus a count of what was dropped, rather than a flood.
+    """
+
+    def __init__(self, burst=10, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+def configure_logging():
+    """Set up the root logger from LOG_LEVEL, LOG_RATE_LIMIT and LOG_RATE_INTERVAL.
+
+    Loggers check their level before formatting anything, so debug calls in
+    hot paths cost one comparison when debug logging is off.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    burst = int(os.getenv('LOG_RATE_LIMIT', 10))
+    if burst > 0:
+        handler.addFilter(RateLimitFilter(burst, float(os.getenv('LOG_RATE_INTERVAL', 60))))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    # Request latency is exported by /metrics rather than logged line by line
+    logging.getLogger('tornado.access').setLevel(logging.WARNING)
@@ -0,0 +1,153 @@
+import bisect
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels.
+
+    Each observation increments one bucket; the cumulative counts Prometheus
+    expects are only summed up when the metrics are rendered.
+    """
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((label_values, list(counts)) for label_values, counts in self._series.items())
+        for label_values, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time to handle a request, by handler, method and status',
+                             labels=('handler', 'method', 'status'))
+QUERY_DURATION = Histogram('db_query_duration_seconds', 'Time spent executing and fetching a named model query',
+                           labels=('query',))
+QUERY_ROWS = Counter('db_query_rows_total', 'Rows returned or affected by a named model query', labels=('query',))
+QUERY_ERRORS = Counter('db_query_errors_total', 'Named model queries that raised', labels=('query',))
+POOL_WAIT = Histogram('db_pool_wait_seconds', 'Time spent waiting to check out a pooled database connection')
+SERIALIZATION_DURATION = Histogram('serialization_duration_seconds',
+                                   'Time spent encoding JSON response bodies, by handler', labels=('handler',))
+STATEMENTS_PREPARED = Counter('db_statements_prepared_total',
+                              'Prepared statements opened on a connection, by registered query', labels=('query',))
+AUDIT_FLUSH_DURATION = Histogram('audit_flush_duration_seconds',
+                                 'Time to write one batch of audit events, including the connection checkout')
+
+_metrics = [REQUEST_DURATION, QUERY_DURATION, QUERY_ROWS, QUERY_ERRORS, POOL_WAIT, SERIALIZATION_DURATION,
+            STATEMENTS_PREPARED, AUDIT_FLUSH_DURATION]
+# (prefix, description, stats function) for components that keep their own counters
+_stats_sources = []
+
+def register_stats(prefix, description, stats):
+    """Export the numeric values of stats() as gauges named {prefix}_{key}"""
+    _stats_sources.append((prefix, description, stats))
+
+def render():
+    """Return every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, description, stats in _stats_sources:
+        try:
+            values = stats()
+        except Exception:
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.append(f"# HELP {name} {description}: {key}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+class QueryTimer:
+    """Times a named query; set .rows inside the with-block to record a row count"""
+    __slots__ = ('name', 'rows', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        QUERY_DURATION.observe(time.perf_counter() - self.started, self.name)
+        if exc_type is not None:
+            QUERY_ERRORS.inc(1, self.name)
+        elif self.rows:
+            QUERY_ROWS.inc(self.rows, self.name)
+        return False
+
+def timed_query(name):
+    """with timed_query('employees.page') as query: ...execute and fetch...; query.rows = len(rows)"""
+    return QueryTimer(name)
+
+def record_request(handler):
+    """Record a finished request's latency"""
+    REQUEST_DURATION.observe(handler.request.request_time(), type(handler).__name__,
+                             handler.request.method, handler.get_status())
@@ -0,0 +1,293 @@
+"""Versioned schema migrations, applied in order at startup.
+
+Each migration has a version number, recorded in the schema_version table
+once it has been applied. Startup reads the highest recorded version (one
+primary-key lookup) and applies only the migrations above it, so a
+database that is already up to date costs no DDL, table scans or probes.
+
+Migrations take (db, cursor) and branch on db.engine where the dialects
+differ. They are written to be safe to rerun: MySQL commits every DDL
+statement by itself, so one that fails part way is simply applied again
+on the next start, and a database created before schema_version existed
+is adopted by running them all once. Indexes are added with
+db.add_index(), which builds them online on MySQL.
+
+To change the schema, append a migration with the next version number;
+never edit one that has shipped.
+"""
+import logging
+import time
+from collections import namedtuple
+from passwords import hash_password
+
+logger = logging.getLogger(__name__)
+
+# Secondary indexes backing the keyset-paginated, filtered employee listing,
+# the latest-updated_at collection version and the search and analytics refreshes
+EMPLOYEE_INDEXES = {
+    'idx_employees_created_at': '(created_at, id)',
+    'idx_employees_department_created_at': '(department, created_at, id)',
+    'idx_employees_position_created_at': '(position, created_at, id)',
+    'idx_employees_hire_date': '(hire_date, id)',
+    'idx_employees_salary': '(salary, id)',
+    'idx_employees_name': '(name, id)',
+    'idx_employees_updated_at': '(updated_at)',
+}
+
+Migration = namedtuple('Migration', ('version', 'description', 'apply'))
+
+# Ordered by version; see migration()
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register the decorated apply(db, cursor) function as the migration to version"""
+    def register(apply):
+        if version != len(MIGRATIONS) + 1:
+            raise ValueError(f"Migration {version} is out of order; expected {len(MIGRATIONS) + 1}")
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+    return register
+
+@migration(1, "Create the employees and users tables and the default admin")
+def create_employees_and_users(db, cursor):
+    if db.engine == 'SQLite':
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL COLLATE NOCASE,
+            email VARCHAR(100) UNIQUE NOT NULL COLLATE NOCASE,
+            position VARCHAR(100) NOT NULL COLLATE NOCASE,
+            department VARCHAR(100) NOT NULL COLLATE NOCASE,
+            salary DECIMAL(10,2) NOT NULL,
+            hire_date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        # Stands in for MySQL's ON UPDATE CURRENT_TIMESTAMP, which only fires when a value changed
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS employees_updated_at
+        AFTER UPDATE OF name, email, position, department, salary, hire_date ON employees
+        WHEN NEW.updated_at IS OLD.updated_at AND (
+            NEW.name IS NOT OLD.name OR NEW.email IS NOT OLD.email OR NEW.position IS NOT OLD.position
+            OR NEW.department IS NOT OLD.department OR NEW.salary IS NOT OLD.salary
+            OR NEW.hire_date IS NOT OLD.hire_date)
+        BEGIN
+            UPDATE employees SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) UNIQUE NOT NULL COLLATE NOCASE,
+            password VARCHAR(255) NOT NULL,
+            role TEXT NOT NULL DEFAULT 'employee' CHECK (role IN ('admin', 'employee')),
+            employee_id INTEGER REFERENCES employees(id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS users_updated_at
+        AFTER UPDATE OF username, password, role, employee_id ON users
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+        """)
+    else:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            position VARCHAR(100) NOT NULL,
+            department VARCHAR(100) NOT NULL,
+            salary DECIMAL(10,2) NOT NULL,
+            hire_date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role ENUM('admin', 'employee') DEFAULT 'employee',
+            employee_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE SET NULL
+        )
+        """)
+
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO users (username, password, role) VALUES ('admin', %s, 'admin')",
+                       (hash_password('admin123'),))
+        logger.warning("Default admin user created (username: admin, password: admin123)")
+
+@migration(2, "Add the employee listing, sort and updated_at indexes")
+def add_employee_indexes(db, cursor):
+    for name, columns in EMPLOYEE_INDEXES.items():
+        db.add_index(cursor, 'employees', name, columns)
+
+@migration(3, "Create the department stats rollups")
+def create_stats_tables(db, cursor):
+    # Rollups behind /api/stats, maintained by models/stats_model.py
+    if db.engine == 'SQLite':
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS department_stats (
+            department VARCHAR(100) PRIMARY KEY COLLATE NOCASE,
+            headcount INTEGER NOT NULL DEFAULT 0,
+            salary_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+            salary_min DECIMAL(10,2),
+            salary_max DECIMAL(10,2)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS department_hire_stats (
+            department VARCHAR(100) NOT NULL COLLATE NOCASE,
+            hire_month DATE NOT NULL,
+            headcount INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (department, hire_month)
+        )
+        """)
+    else:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS department_stats (
+            department VARCHAR(100) PRIMARY KEY,
+            headcount INT NOT NULL DEFAULT 0,
+            salary_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+            salary_min DECIMAL(10,2),
+            salary_max DECIMAL(10,2)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS department_hire_stats (
+            department VARCHAR(100) NOT NULL,
+            hire_month DATE NOT NULL,
+            headcount INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (department, hire_month)
+        )
+        """)
+
+@migration(4, "Create the employee change log")
+def create_change_log(db, cursor):
+    # Change log behind the WebSocket feed, written by models/change_model.py
+    sqlite = db.engine == 'SQLite'
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS employee_changes (
+        seq {'INTEGER' if sqlite else 'BIGINT'} PRIMARY KEY,
+        employee_id {'INTEGER' if sqlite else 'INT'} NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        data TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS employee_change_sequence (
+        id {'INTEGER' if sqlite else 'TINYINT'} PRIMARY KEY,
+        seq {'INTEGER' if sqlite else 'BIGINT'} NOT NULL
+    )
+    """)
+    # The sequence counter is a single row
+    cursor.execute("SELECT COUNT(*) FROM employee_change_sequence")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO employee_change_sequence (id, seq) VALUES (1, 0)")
+
+@migration(5, "Create the employee history audit trail")
+def create_history(db, cursor):
+    # Written in batches by audit.py; rows outlive the employees they describe
+    if db.engine == 'SQLite':
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employee_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            actor_id INTEGER,
+            changes TEXT,
+            changed_at TIMESTAMP NOT NULL
+        )
+        """)
+    else:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employee_history (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            employee_id INT NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            actor_id INT,
+            changes TEXT,
+            changed_at DATETIME(6) NOT NULL
+        )
+        """)
+    db.add_index(cursor, 'employee_history', 'idx_employee_history_employee', '(employee_id, id)')
+
+@migration(6, "Index the change log by employee")
+def index_changes_by_employee(db, cursor):
+    # A row's latest change sequence number is part of its ETag
+    db.add_index(cursor, 'employee_changes', 'idx_employee_changes_employee', '(employee_id, seq)')
+
+@migration(7, "Create the shared token revocation list")
+def create_revoked_tokens(db, cursor):
+    # Written by models/token_model.py; every worker mirrors it in memory
+    if db.engine == 'SQLite':
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti CHAR(32) UNIQUE NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """)
+    else:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            jti CHAR(32) UNIQUE NOT NULL,
+            expires_at BIGINT NOT NULL
+        )
+        """)
+    db.add_index(cursor, 'revoked_tokens', 'idx_revoked_tokens_expires_at', '(expires_at)')
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(db, cursor):
+    """Return the highest applied migration, or 0 for a database without schema_version"""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except db.Error:
+        return 0
+    return cursor.fetchone()[0] or 0
+
+def migrate(db, connection):
+    """Apply the migrations above the database's version, in order, and return the version now in place"""
+    cursor = connection.cursor()
+    try:
+        version = current_version(db, cursor)
+        if version > LATEST_VERSION:
+            logger.warning("Database schema version %d is newer than this code's %d", version, LATEST_VERSION)
+        if version >= LATEST_VERSION:
+            return version
+
+        with db.schema_lock(connection):
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description VARCHAR(200) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            # Another process may have migrated while this one waited for the lock
+            version = current_version(db, cursor)
+            for pending in MIGRATIONS[version:]:
+                started = time.monotonic()
+                pending.apply(db, cursor)
+                cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                               (pending.version, pending.description))
+                version = pending.version
+                logger.info("Applied migration %d (%s) in %.2fs", version, pending.description,
+                            time.monotonic() - started)
+        return version
+    finally:
+        cursor.close()
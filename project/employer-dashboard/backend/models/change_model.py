@@ -0,0 +1,100 @@
+import json
+import logging
+from db import db
+from metrics import timed_query
+from models.queries import execute, fetch_all, fetch_one, register
+from serialization import format_date, format_decimal
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+# Writable employee columns, in the order the models read them, with the
+# converter that makes each JSON-ready (None when it already is)
+CHANGE_FIELDS = (
+    ('name', None),
+    ('email', None),
+    ('position', None),
+    ('department', None),
+    ('salary', format_decimal),
+    ('hire_date', format_date),
+)
+
+# The counter row is locked by the increment until the writer's transaction
+# ends, so sequence numbers are handed out in commit order
+ADVANCE_SEQUENCE = "UPDATE employee_change_sequence SET seq = seq + %s WHERE id = 1"
+READ_SEQUENCE = "SELECT seq FROM employee_change_sequence WHERE id = 1"
+INSERT_CHANGE = "INSERT INTO employee_changes (seq, employee_id, kind, data) VALUES (%s, %s, %s, %s)"
+
+GET_LATEST = register('changes.latest', READ_SEQUENCE)
+GET_SINCE = register('changes.since', """
+    SELECT seq, employee_id, kind, data FROM employee_changes
+    WHERE seq > %s ORDER BY seq LIMIT %s
+""")
+PRUNE = register('changes.prune', "DELETE FROM employee_changes WHERE seq <= %s")
+
+def encode_fields(values):
+    """Return the JSON-ready fields of a (name, email, position, department, salary, hire_date) row"""
+    return {name: convert(value) if convert else value for (name, convert), value in zip(CHANGE_FIELDS, values)}
+
+def diff_fields(previous, current):
+    """Return the JSON-ready fields whose values differ between two rows of the writable columns"""
+    before = encode_fields(previous)
+    return {name: value for name, value in encode_fields(current).items() if before[name] != value}
+
+class EmployeeChanges:
+    """The append-only log of employee changes behind the WebSocket change feed"""
+
+    @staticmethod
+    def record(cursor, changes):
+        """Append (employee_id, kind, fields) changes on the caller's cursor, inside its transaction.
+
+        The shared sequence row stays locked until the transaction ends, so
+        call this right before committing. A reader that has seen sequence
+        number n has then seen every change numbered below it.
+        """
+        if not changes:
+            return
+        cursor.execute(ADVANCE_SEQUENCE, (len(changes),))
+        cursor.execute(READ_SEQUENCE)
+        first = cursor.fetchone()[0] - len(changes) + 1
+        cursor.executemany(INSERT_CHANGE, [
+            (first + offset, employee_id, kind, json.dumps(fields, separators=(',', ':')) if fields else None)
+            for offset, (employee_id, kind, fields) in enumerate(changes)
+        ])
+
+    @staticmethod
+    def get_latest_seq():
+        """Return the sequence number of the last committed change (0 before the first)"""
+        with db.connection(read=True) as connection:
+            with timed_query('changes.latest'):
+                row = fetch_one(connection, GET_LATEST)
+        return row[0] if row else 0
+
+    @staticmethod
+    def get_since(seq, limit):
+        """Return up to limit changes after seq as event dicts, oldest first"""
+        with db.connection(read=True) as connection:
+            with timed_query('changes.since') as query:
+                rows = fetch_all(connection, GET_SINCE, (seq, limit))
+                query.rows = len(rows)
+        events = []
+        for seq, employee_id, kind, data in rows:
+            event = {'seq': seq, 'op': kind, 'id': employee_id}
+            if data:
+                event['fields'] = json.loads(data)
+            events.append(event)
+        return events
+
+    @staticmethod
+    def prune(keep):
+        """Drop all but the newest keep changes; returns how many were removed"""
+        with db.connection() as connection:
+            with timed_query('changes.prune') as query:
+                latest = fetch_one(connection, GET_LATEST)
+                query.rows = execute(connection, PRUNE, ((latest[0] if latest else 0) - keep,)).rowcount
+        if query.rows:
+            logger.debug("Pruned %d employee changes", query.rows)
+        return query.rows
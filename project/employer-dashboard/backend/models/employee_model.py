@@ -1,9 +1,110 @@
-from datetime import datetime
-from db import db
-import mysql.connector
-from mysql.connector import Error
+import base64
+import json
+import logging
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from audit import audit_writer
+from cache import employee_cache_key, employee_version_key, cached, cached_many, invalidate_employee
+from db import db, DataError, Error, IntegrityError
+from metrics import timed_query
+from models.change_model import CREATED, DELETED, UPDATED, EmployeeChanges, diff_fields, encode_fields
+from models.history_model import field_changes
+from models.queries import QUERIES, execute, fetch_all, fetch_one, register, update_statement
+from models.stats_model import EmployeeStats, ROLLUP_FIELDS
+from models.user_model import User
+from passwords import hash_passwords
+from serialization import encode_employee
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+BULK_CHUNK_SIZE = 1000
+
+REQUIRED_FIELDS = ('name', 'email', 'position', 'department', 'salary', 'hire_date')
+# Limits from the employees/users column definitions in db.py
+MAX_TEXT_LENGTH = 100
+MAX_USERNAME_LENGTH = 50
+MAX_SALARY = 10 ** 8
+
+# Columns the listing may be sorted by; each has a matching (column, id) index
+SORT_COLUMNS = ('created_at', 'hire_date', 'salary', 'name', 'id')
+
+# Field order of EmployeeRow; queries name these columns rather than using *
+EMPLOYEE_COLUMNS = ('id', 'name', 'email', 'position', 'department', 'salary', 'hire_date', 'created_at', 'updated_at')
+SELECT_EMPLOYEES = f"SELECT {', '.join(EMPLOYEE_COLUMNS)} FROM employees"
+
+# Fixed statements, run as prepared statements through models/queries.py
+GET_BY_ID = register('employees.get_by_id', f"{SELECT_EMPLOYEES} WHERE id = %s")
+GET_UPDATED_SINCE = register('employees.updated_since', f"{SELECT_EMPLOYEES} WHERE updated_at >= %s")
+GET_ALL = register('employees.all', f"{SELECT_EMPLOYEES} ORDER BY created_at DESC")
+# updated_at only has one-second resolution; the row's latest change
+# sequence number tells apart edits made within the same second
+GET_VERSION = register('employees.version', """
+    SELECT e.updated_at, (SELECT MAX(c.seq) FROM employee_changes c WHERE c.employee_id = e.id)
+    FROM employees e WHERE e.id = %s
+""")
+# The newest row's own column keeps its declared type on every backend,
+# where SQLite would return MAX(updated_at) as plain text
+GET_COLLECTION_VERSION = register('employees.collection_version', """
+    SELECT (SELECT seq FROM employee_change_sequence WHERE id = 1), updated_at
+    FROM employees ORDER BY updated_at DESC LIMIT 1
+""")
+# A row's writable columns, in REQUIRED_FIELDS order; writes diff them for
+# the change log and use the last three (ROLLUP_FIELDS) for the stats rollups
+GET_FIELDS = register('employees.fields', f"SELECT {', '.join(REQUIRED_FIELDS)} FROM employees WHERE id = %s")
+LOCK_FIELDS = register('employees.lock_fields',
+                       f"SELECT {', '.join(REQUIRED_FIELDS)} FROM employees WHERE id = %s FOR UPDATE")
+INSERT_EMPLOYEE = register('employees.insert', """
+    INSERT INTO employees (name, email, position, department, salary, hire_date)
+    VALUES (%s, %s, %s, %s, %s, %s)
+""")
+DELETE_EMPLOYEE = register('employees.delete', "DELETE FROM employees WHERE id = %s")
+
+class EmployeeRow(namedtuple('EmployeeRow', EMPLOYEE_COLUMNS)):
+    """An employees row as a plain cursor returns it.
+
+    Listings, the cache and the search index hold these tuples rather than
+    dictionaries; values are only converted to JSON types when a response
+    is written.
+    """
+    __slots__ = ()
+
+def fetch_rows(cursor, size=None):
+    """Fetch the cursor's remaining rows (or at most size of them) as EmployeeRows"""
+    rows = cursor.fetchall() if size is None else cursor.fetchmany(size)
+    return list(map(EmployeeRow._make, rows))
+
+def encode_cursor(value, employee_id):
+    """Encode the last row's sort key as an opaque page cursor"""
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps([value, employee_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, employee_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(employee_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+# Callables notified with (employee_ids, deleted) after a write commits
+_change_listeners = []
+
+def notify_change(employee_ids, deleted=False):
+    for listener in _change_listeners:
+        listener(employee_ids, deleted)
 
 class Employee:
+    __slots__ = EMPLOYEE_COLUMNS
+
     def __init__(self, name=None, email=None, position=None, department=None, salary=None, hire_date=None, id=None,
                  created_at=None, updated_at=None):
         self.id = id
@@ -18,181 +119,520 @@ class Employee:
     
     def to_dict(self):
         """Convert employee object to dictionary"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'position': self.position,
-            'department': self.department,
-            'salary': float(self.salary) if self.salary else None,
-            'hire_date': self.hire_date.strftime('%Y-%m-%d') if isinstance(self.hire_date, datetime) else self.hire_date,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
-        }
+        return encode_employee(self)
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Convert an EmployeeRow to a JSON-friendly dictionary"""
+        return encode_employee(row)
+    
+    @staticmethod
+    def from_row(row):
+        return Employee(row.name, row.email, row.position, row.department, row.salary, row.hire_date,
+                        id=row.id, created_at=row.created_at, updated_at=row.updated_at)
     
     def save(self, connection=None):
-        if not connection:
-            connection = db.get_connection()
-        if not connection:
-            raise Exception("No database connection available")
-        
-        cursor = None
-        try:
-            cursor = connection.cursor()
+        if not all([self.name, self.email, self.position, self.department, self.salary, self.hire_date]):
+            raise ValueError("All fields are required")
 
-            if not all([self.name, self.email, self.position, self.department, self.salary, self.hire_date]):
-                raise ValueError("All fields are required")
-            
-            if self.id:  # update
-                update_query = """
-                    UPDATE employees
-                    SET name=%s, email=%s, position=%s, department=%s, salary=%s, hire_date=%s
-                    WHERE id=%s
-                """
-                cursor.execute(update_query, (self.name, self.email, self.position,
-                                              self.department, self.salary, self.hire_date, self.id))
-            else:  # insert new
-                insert_query = """
-                    INSERT INTO employees (name, email, position, department, salary, hire_date)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                cursor.execute(insert_query, (self.name, self.email, self.position,
-                                              self.department, self.salary, self.hire_date))
-                self.id = cursor.lastrowid
+        try:
+            with db.connection(connection) as connection:
+                cursor = connection.cursor()
+                try:
+                    # The stats rollups and the change log are updated in the same transaction
+                    if not connection.in_transaction:
+                        connection.start_transaction()
+                    with timed_query('employees.save') as query:
+                        values = (self.name, self.email, self.position, self.department, self.salary, self.hire_date)
+                        changes = []
+                        history = []
+                        if self.id:  # update
+                            previous = fetch_one(connection, LOCK_FIELDS, (self.id,))
+                            update, _ = update_statement('employees', REQUIRED_FIELDS)
+                            execute(connection, update, values + (self.id,))
+                            if previous:
+                                current = fetch_one(connection, GET_FIELDS, (self.id,))
+                                EmployeeStats.apply(cursor, added=[current[3:]], removed=[previous[3:]])
+                                fields = diff_fields(previous, current)
+                                if fields:
+                                    changes.append((self.id, UPDATED, fields))
+                                    history.append((self.id, UPDATED, field_changes(previous, current)))
+                        else:  # insert new
+                            self.id = execute(connection, INSERT_EMPLOYEE, values).lastrowid
+                            current = fetch_one(connection, GET_FIELDS, (self.id,))
+                            EmployeeStats.apply(cursor, added=[current[3:]])
+                            changes.append((self.id, CREATED, encode_fields(current)))
+                            history = changes
+                        EmployeeChanges.record(cursor, changes)
+                        connection.commit()
+                        query.rows = 1
 
-            connection.commit()
-            return True
+                    db.record_write()
+                    invalidate_employee(self.id)
+                    notify_change([self.id])
+                except Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
 
-        except mysql.connector.IntegrityError:
-            if connection:
-                connection.rollback()
+        except IntegrityError:
             raise Exception(f"Email already exists: {self.email}")
-        except mysql.connector.Error as e:
-            if connection:
-                connection.rollback()
-            raise Exception(f"MySQL error: {str(e)}")
-        finally:
-            if cursor:
-                cursor.close()
+        except Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        audit_writer.record(history)
+        return True
     
     @staticmethod
     def get_by_id(employee_id):
-        connection = db.get_connection()
-        if not connection:
-            return None
-        
-        cursor = None
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM employees WHERE id = %s", (employee_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                # Create Employee object with explicit field mapping
-                employee = Employee(
-                    id=row['id'],
-                    name=row['name'],
-                    email=row['email'],
-                    position=row['position'],
-                    department=row['department'],
-                    salary=row['salary'],
-                    hire_date=row['hire_date'],
-                    created_at=row['created_at'],
-                    updated_at=row['updated_at']
-                )
-                return employee
-            return None
-        except Error as e:
-            print(f"Error fetching employee: {e}")
-            return None
-        finally:
-            if cursor:
+        def load():
+            with db.connection(read=True) as connection:
+                with timed_query('employees.get_by_id') as query:
+                    row = fetch_one(connection, GET_BY_ID, (employee_id,))
+                    query.rows = int(row is not None)
+            return EmployeeRow._make(row) if row else None
+
+        row = cached(lambda generation: employee_cache_key(employee_id), load)
+        return Employee.from_row(row) if row else None
+    
+    @staticmethod
+    def add_change_listener(listener):
+        """Register listener(employee_ids, deleted) to be called after every committed write"""
+        _change_listeners.append(listener)
+    
+    @staticmethod
+    def get_rows_by_ids(employee_ids, read=False):
+        """Return the given employees as EmployeeRows, skipping ids that don't exist.
+
+        Ids are read with IN queries of at most MAX_BATCH_SIZE each. Reads go
+        to the primary unless read=True lets a replica serve them.
+        """
+        employee_ids = list(employee_ids)
+        rows = []
+        if not employee_ids:
+            return rows
+        with db.connection(read=read) as connection:
+            cursor = connection.cursor()
+            try:
+                for start in range(0, len(employee_ids), MAX_BATCH_SIZE):
+                    chunk = employee_ids[start:start + MAX_BATCH_SIZE]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    with timed_query('employees.get_by_ids') as query:
+                        cursor.execute(f"{SELECT_EMPLOYEES} WHERE id IN ({placeholders})", chunk)
+                        batch = fetch_rows(cursor)
+                        query.rows = len(batch)
+                    rows += batch
+            finally:
                 cursor.close()
+        return rows
+    
+    @staticmethod
+    def get_many(employee_ids):
+        """Return {id: EmployeeRow} for those of the given ids that exist.
+
+        Rows already in the employee cache are served from it; the rest are
+        read through get_rows_by_ids() and cached one by one, so later batches
+        and single-employee reads hit them too. Raises ValueError for more
+        than MAX_BATCH_SIZE distinct ids.
+        """
+        employee_ids = list(dict.fromkeys(employee_ids))
+        if len(employee_ids) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} ids can be fetched at once")
+        if not employee_ids:
+            return {}
+
+        def load_many(missing):
+            return {row.id: row for row in Employee.get_rows_by_ids(missing, read=True)}
+
+        return cached_many({employee_id: employee_cache_key(employee_id) for employee_id in employee_ids}, load_many)
+    
+    @staticmethod
+    def get_updated_since(since=None):
+        """Return employees whose updated_at is at or after since (every employee when since is None)"""
+        with db.connection() as connection:
+            with timed_query('employees.updated_since') as query:
+                if since is None:
+                    rows = fetch_all(connection, GET_ALL)
+                else:
+                    rows = fetch_all(connection, GET_UPDATED_SINCE, (since,))
+                query.rows = len(rows)
+        return list(map(EmployeeRow._make, rows))
+    
+    @staticmethod
+    def get_version(employee_id):
+        """Return (updated_at, last change seq) for the employee without loading the row, or None if it doesn't exist.
+
+        The sequence number is None once the row's changes have been pruned
+        from the change log.
+        """
+        def load():
+            with db.connection(read=True) as connection:
+                with timed_query('employees.version'):
+                    result = fetch_one(connection, GET_VERSION, (employee_id,))
+            return tuple(result) if result else None
+
+        return cached(lambda generation: employee_version_key(employee_id), load)
+    
+    @staticmethod
+    def get_collection_version():
+        """Return (last change seq, latest updated_at) for the employees table.
+
+        Every committed insert, update and delete advances the change log's
+        sequence number, so the pair can stand in for the whole listing when
+        validating client caches or keying cached responses, even for edits
+        within the same second. Both come from index lookups, never a scan.
+        """
+        def load():
+            with db.connection(read=True) as connection:
+                with timed_query('employees.collection_version'):
+                    return fetch_one(connection, GET_COLLECTION_VERSION) or (None, None)
+
+        return cached(lambda generation: f"employees:version:{generation}", load)
     
     @staticmethod
     def update_profile(employee_id, update_data):
-        connection = db.get_connection()
-        if not connection:
+        """Update some of an employee's columns.
+
+        Raises ValueError if update_data names a column outside
+        UPDATABLE_COLUMNS['employees'] in models/queries.py.
+        """
+        if not update_data:
             return False
-        
-        cursor = None
+        update, columns = update_statement('employees', update_data)
+        values = tuple(update_data[column] for column in columns) + (employee_id,)
+        touches_rollups = any(field in ROLLUP_FIELDS for field in columns)
         try:
-            cursor = connection.cursor()
-            set_clauses = []
-            values = []
-            
-            for field, value in update_data.items():
-                set_clauses.append(f"{field} = %s")
-                values.append(value)
-            
-            if not set_clauses:
-                return False
-            
-            values.append(employee_id)
-            update_query = f"UPDATE employees SET {', '.join(set_clauses)} WHERE id = %s"
-            cursor.execute(update_query, values)
-            connection.commit()
-            return cursor.rowcount > 0
+            with db.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    with timed_query('employees.update_profile') as query:
+                        # The previous values are locked so the change log and history record an exact diff
+                        history = []
+                        connection.start_transaction()
+                        previous = fetch_one(connection, LOCK_FIELDS, (employee_id,))
+                        updated = execute(connection, update, values).rowcount > 0
+                        if previous and updated:
+                            current = fetch_one(connection, GET_FIELDS, (employee_id,))
+                            if touches_rollups:
+                                EmployeeStats.apply(cursor, added=[current[3:]], removed=[previous[3:]])
+                            fields = diff_fields(previous, current)
+                            if fields:
+                                EmployeeChanges.record(cursor, [(employee_id, UPDATED, fields)])
+                                history = [(employee_id, UPDATED, field_changes(previous, current))]
+                        connection.commit()
+                        query.rows = int(updated)
+                    db.record_write()
+                    invalidate_employee(employee_id)
+                    if updated:
+                        notify_change([employee_id])
+                except Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
         except Error as e:
-            print(f"Error updating employee profile: {e}")
-            connection.rollback()
+            logger.error("Error updating employee profile: %s", e)
             return False
-        finally:
-            if cursor:
-                cursor.close()
+        audit_writer.record(history)
+        return updated
     
     @staticmethod
     def get_all(connection=None):
-        if not connection:
-            connection = db.get_connection()
-        if not connection:
-            return []
+        """Return every employee as an EmployeeRow; the list may be shared with the cache, so don't mutate it"""
+        def load():
+            with db.connection(connection, read=True) as conn:
+                with timed_query('employees.all') as query:
+                    rows = fetch_all(conn, GET_ALL)
+                    query.rows = len(rows)
+            return list(map(EmployeeRow._make, rows))
+
+        return cached(lambda generation: f"employees:all:{generation}", load)
+    
+    @staticmethod
+    def get_page(limit=DEFAULT_PAGE_SIZE, cursor=None, department=None, position=None,
+                 hired_from=None, hired_to=None, sort='created_at', order='desc'):
+        """Fetch one page of employees using keyset pagination on (sort column, id).
+
+        Returns (employees, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for an unknown sort column, bad limit or bad cursor.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        if order not in ('asc', 'desc'):
+            raise ValueError("Order must be 'asc' or 'desc'")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
         
-        cursor = None
-        try:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM employees ORDER BY created_at DESC")
-            rows = cursor.fetchall()
-            
-            # Convert each row to a dictionary with proper data types
-            employees = []
-            for row in rows:
-                employee_dict = {
-                    'id': row['id'],
-                    'name': row['name'],
-                    'email': row['email'],
-                    'position': row['position'],
-                    'department': row['department'],
-                    'salary': float(row['salary']) if row['salary'] is not None else 0.0,
-                    'hire_date': row['hire_date'].strftime('%Y-%m-%d') if isinstance(row['hire_date'], datetime) else str(row['hire_date']),
-                    'created_at': row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if row['created_at'] else None,
-                    'updated_at': row['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if row['updated_at'] else None
-                }
-                employees.append(employee_dict)
+        where = []
+        params = []
+        if department:
+            where.append("department = %s")
+            params.append(department)
+        if position:
+            where.append("position = %s")
+            params.append(position)
+        if hired_from:
+            where.append("hire_date >= %s")
+            params.append(hired_from)
+        if hired_to:
+            where.append("hire_date <= %s")
+            params.append(hired_to)
+        
+        op = '<' if order == 'desc' else '>'
+        if cursor:
+            last_value, last_id = decode_cursor(cursor)
+            if sort == 'id':
+                where.append(f"id {op} %s")
+                params.append(last_id)
+            else:
+                where.append(f"({sort} {op} %s OR ({sort} = %s AND id {op} %s))")
+                params.extend([last_value, last_value, last_id])
+        
+        query = SELECT_EMPLOYEES
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        direction = order.upper()
+        if sort == 'id':
+            query += f" ORDER BY id {direction}"
+        else:
+            query += f" ORDER BY {sort} {direction}, id {direction}"
+        query += " LIMIT %s"
+        # One extra row tells us whether another page exists
+        params.append(limit + 1)
+        
+        def load():
+            with db.connection(read=True) as connection:
+                db_cursor = connection.cursor()
+                try:
+                    with timed_query('employees.page') as timer:
+                        db_cursor.execute(query, params)
+                        rows = fetch_rows(db_cursor)
+                        timer.rows = len(rows)
+                finally:
+                    db_cursor.close()
             
-            return employees
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(getattr(last, sort), last.id)
+            return rows, next_cursor
+
+        return cached(lambda generation: f"employees:page:{generation}:{query}:{params}", load)
+    
+    @staticmethod
+    def iter_batches(batch_size=EXPORT_BATCH_SIZE):
+        """Yield every employee in id order as lists of at most batch_size EmployeeRows.
+
+        Rows are read from an unbuffered cursor, so only one batch is held in
+        memory at a time. The pooled connection stays checked out until the
+        generator is exhausted or closed; closing it early discards the
+        connection rather than draining the rest of the result set.
+        """
+        with db.connection(read=True) as connection:
+            cursor = connection.cursor(buffered=False)
+            with timed_query('employees.export'):
+                cursor.execute(f"{SELECT_EMPLOYEES} ORDER BY id")
+            while True:
+                with timed_query('employees.export_batch') as query:
+                    rows = fetch_rows(cursor, batch_size)
+                    query.rows = len(rows)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+    
+    @staticmethod
+    def validate_import_row(data):
+        """Check one bulk-import row and return (employee values, account or None).
+
+        Raises ValueError describing the first problem found.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Row must be an object")
+        for field in REQUIRED_FIELDS:
+            value = data.get(field)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                raise ValueError(f"Missing required field: {field}")
+        try:
+            salary = float(data['salary'])
+        except (TypeError, ValueError):
+            raise ValueError("Salary must be a number")
+        if not 0 <= salary < MAX_SALARY:
+            raise ValueError(f"Salary must be between 0 and {MAX_SALARY}")
+        try:
+            hire_date = datetime.strptime(str(data['hire_date']).strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError("hire_date must be a YYYY-MM-DD date")
+
+        values = (str(data['name']).strip(), str(data['email']).strip(), str(data['position']).strip(),
+                  str(data['department']).strip(), salary, hire_date)
+        for field, value in zip(REQUIRED_FIELDS[:4], values):
+            if len(value) > MAX_TEXT_LENGTH:
+                raise ValueError(f"{field} is longer than {MAX_TEXT_LENGTH} characters")
+
+        account = None
+        username = data.get('username')
+        password = data.get('password')
+        if username or password:
+            if not username or not password:
+                raise ValueError("username and password must be given together")
+            account = (str(username).strip(), str(password))
+            if len(account[0]) > MAX_USERNAME_LENGTH:
+                raise ValueError(f"username is longer than {MAX_USERNAME_LENGTH} characters")
+        return values, account
+    
+    @staticmethod
+    def bulk_create(rows, chunk_size=BULK_CHUNK_SIZE):
+        """Validate and insert many employees (and optional user accounts).
+
+        Rows are written chunk by chunk, each chunk as one transaction with a
+        multi-row INSERT for employees and another for users. Returns one
+        result per input row, in order: {'index', 'id'} on success or
+        {'index', 'error'} on failure; a bad row never blocks the others.
+        """
+        results = [None] * len(rows)
+        valid = []
+        seen_emails = set()
+        seen_usernames = set()
+        for index, data in enumerate(rows):
+            try:
+                values, account = Employee.validate_import_row(data)
+                email = values[1].lower()
+                if email in seen_emails:
+                    raise ValueError(f"Duplicate email in import: {values[1]}")
+                if account and account[0].lower() in seen_usernames:
+                    raise ValueError(f"Duplicate username in import: {account[0]}")
+            except ValueError as e:
+                results[index] = {'index': index, 'error': str(e)}
+                continue
+            seen_emails.add(email)
+            if account:
+                seen_usernames.add(account[0].lower())
+            valid.append((index, values, account))
+
+        # Hash passwords on the KDF pool up front so no connection or lock is
+        # held while scrypt runs; imports with accounts are bound by its cost
+        hashes = iter(hash_passwords([account[1] for _, _, account in valid if account]))
+        valid = [(index, values, (account[0], next(hashes)) if account else None)
+                 for index, values, account in valid]
+
+        try:
+            with db.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    for start in range(0, len(valid), chunk_size):
+                        chunk = valid[start:start + chunk_size]
+                        # Hold back until the chunk's history fits, rather than dropping it after the commit
+                        if not audit_writer.wait_for_room(len(chunk)):
+                            for index, _, _ in valid[start:]:
+                                results[index] = {'index': index, 'error': "History queue is full; retry later"}
+                            break
+                        try:
+                            Employee._insert_chunk(connection, cursor, chunk, results)
+                        except (IntegrityError, DataError):
+                            # A concurrent writer or a value the database rejected; redo the
+                            # chunk row by row so the failure is pinned to its row
+                            connection.rollback()
+                            for item in chunk:
+                                try:
+                                    Employee._insert_chunk(connection, cursor, [item], results)
+                                except (IntegrityError, DataError) as e:
+                                    connection.rollback()
+                                    results[item[0]] = {'index': item[0], 'error': f"Rejected by database: {getattr(e, 'msg', None) or e}"}
+                finally:
+                    cursor.close()
         except Error as e:
-            print(f"Error fetching employees: {e}")
-            return []
+            logger.error("Error importing employees: %s", e)
+            for index, _, _ in valid:
+                if results[index] is None:
+                    results[index] = {'index': index, 'error': f"Database error: {str(e)}"}
         finally:
-            if cursor:
-                cursor.close()
+            db.record_write()
+            invalidate_employee()
+            notify_change([result['id'] for result in results if result and 'id' in result])
+
+        return results
     
     @staticmethod
-    def delete_by_id(connection, employee_id):
-        if not connection:
-            return False
-        
-        cursor = None
-        try:
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM employees WHERE id = %s", (employee_id,))
+    def _insert_chunk(connection, cursor, chunk, results):
+        emails = [values[1] for _, values, _ in chunk]
+        usernames = [account[0] for _, _, account in chunk if account]
+
+        placeholders = ', '.join(['%s'] * len(emails))
+        cursor.execute(f"SELECT email FROM employees WHERE email IN ({placeholders})", emails)
+        taken_emails = {row[0].lower() for row in cursor.fetchall()}
+        taken_usernames = User.find_existing_usernames(cursor, usernames)
+
+        insertable = []
+        for index, values, account in chunk:
+            if values[1].lower() in taken_emails:
+                results[index] = {'index': index, 'error': f"Email already exists: {values[1]}"}
+            elif account and account[0].lower() in taken_usernames:
+                results[index] = {'index': index, 'error': f"Username already exists: {account[0]}"}
+            else:
+                insertable.append((index, values, account))
+        if not insertable:
+            return
+
+        with timed_query('employees.insert_chunk') as query:
+            connection.start_transaction()
+            # Plain cursor: its executemany folds the rows into one multi-row INSERT
+            cursor.executemany(QUERIES[INSERT_EMPLOYEE], [values for _, values, _ in insertable])
+
+            # Auto-increment ids of a multi-row insert are not guaranteed to be
+            # contiguous, so map them back through the unique email column; the
+            # stored values are what the change log reports
+            emails = [values[1] for _, values, _ in insertable]
+            placeholders = ', '.join(['%s'] * len(emails))
+            cursor.execute(f"SELECT id, {', '.join(REQUIRED_FIELDS)} FROM employees WHERE email IN ({placeholders})",
+                           emails)
+            stored = cursor.fetchall()
+            ids = {row[2].lower(): row[0] for row in stored}
+
+            User.insert_employee_users(cursor, [
+                (account[0], account[1], ids[values[1].lower()])
+                for _, values, account in insertable if account
+            ])
+            EmployeeStats.apply(cursor, added=[values[3:6] for _, values, _ in insertable])
+            created = [(row[0], CREATED, encode_fields(row[1:])) for row in sorted(stored)]
+            EmployeeChanges.record(cursor, created)
             connection.commit()
-            return cursor.rowcount > 0
+            query.rows = len(insertable)
+        audit_writer.record(created)
+
+        for index, values, _ in insertable:
+            results[index] = {'index': index, 'id': ids[values[1].lower()]}
+    
+    @staticmethod
+    def delete_by_id(employee_id, connection=None):
+        try:
+            with db.connection(connection) as connection:
+                cursor = connection.cursor()
+                try:
+                    if not connection.in_transaction:
+                        connection.start_transaction()
+                    with timed_query('employees.delete') as query:
+                        previous = fetch_one(connection, LOCK_FIELDS, (employee_id,))
+                        if previous is None:
+                            connection.rollback()
+                            return False
+                        execute(connection, DELETE_EMPLOYEE, (employee_id,))
+                        EmployeeStats.apply(cursor, removed=[previous[3:]])
+                        EmployeeChanges.record(cursor, [(employee_id, DELETED, None)])
+                        connection.commit()
+                        query.rows = 1
+                    db.record_write()
+                    invalidate_employee(employee_id)
+                    notify_change([employee_id], deleted=True)
+                except Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
         except Error as e:
-            print(f"Error deleting employee: {e}")
-            connection.rollback()
+            logger.error("Error deleting employee: %s", e)
             return False
-        finally:
-            if cursor:
-                cursor.close()
\ No newline at end of file
+        # The history keeps what the deleted row held
+        audit_writer.record([(employee_id, DELETED, encode_fields(previous))])
+        return True
\ No newline at end of file
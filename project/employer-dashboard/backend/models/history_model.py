@@ -0,0 +1,35 @@
+import json
+from db import db
+from metrics import timed_query
+from models.change_model import encode_fields
+
+# Column order of the rows audit.py queues
+HISTORY_COLUMNS = ('employee_id', 'action', 'actor_id', 'changes', 'changed_at')
+INSERT_HISTORY = f"INSERT INTO employee_history ({', '.join(HISTORY_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)"
+
+def field_changes(previous, current):
+    """Return {field: [before, after]} for the writable columns that differ between two rows"""
+    before = encode_fields(previous)
+    return {name: [before[name], value] for name, value in encode_fields(current).items() if before[name] != value}
+
+class EmployeeHistory:
+    """The employee_history audit trail: who created, changed or deleted which employee, and from what to what"""
+
+    @staticmethod
+    def write(rows):
+        """Insert (employee_id, action, actor_id, changes, changed_at) rows as one multi-row INSERT.
+
+        changes is a dict of JSON-ready fields or None; it is encoded here,
+        on the writer's thread rather than the request's.
+        """
+        rows = [(employee_id, action, actor_id, json.dumps(changes, separators=(',', ':')) if changes else None,
+                 changed_at) for employee_id, action, actor_id, changes, changed_at in rows]
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                with timed_query('history.insert') as query:
+                    # Plain cursor: its executemany folds the rows into one multi-row INSERT
+                    cursor.executemany(INSERT_HISTORY, rows)
+                    query.rows = len(rows)
+            finally:
+                cursor.close()
@@ -0,0 +1,100 @@
+"""Named SQL statements for the models, run as prepared statements cached per connection.
+
+Every fixed statement a model runs is registered here under a name, which
+is also the name its timed_query() metric uses where a query is a single
+statement. execute() runs a named statement on a cursor opened with
+cursor(prepared=True) and kept for the life of the pooled connection: MySQL
+parses and plans it on first use, and every later call only sends the
+parameters. mysql-connector re-prepares whenever it is handed a different
+string object, so the registry hands out the one registered string.
+
+Statements whose shape changes from call to call (the filtered listing, IN
+lists, multi-row imports) still go through plain cursors.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from metrics import STATEMENTS_PREPARED
+
+# Prepared statements kept per connection; MySQL's max_prepared_stmt_count
+# (16382 by default) is shared by every connection to the server
+STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 64))
+
+# Columns each table may have updated through update_statement(), in the
+# order they appear in the generated SET clause
+UPDATABLE_COLUMNS = {
+    'employees': ('name', 'email', 'position', 'department', 'salary', 'hire_date'),
+    'users': ('password', 'role'),
+}
+
+QUERIES = {}
+
+# connection -> OrderedDict of statement name -> prepared cursor, least recently used first
+_cursors = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def register(name, sql):
+    """Register sql under name and return the name; registering a different statement twice is an error"""
+    registered = QUERIES.setdefault(name, sql)
+    if registered != sql:
+        raise ValueError(f"Query '{name}' is already registered with different SQL")
+    return name
+
+def update_statement(table, columns):
+    """Return (name, columns) of the registered UPDATE setting columns of table's row WHERE id = %s.
+
+    The statement's parameters are the values of the returned columns, in
+    that order, followed by the id. Only columns in UPDATABLE_COLUMNS may
+    be set; anything else raises ValueError, so caller-supplied field names
+    never reach the SQL text. Each distinct column set is one statement.
+    """
+    allowed = UPDATABLE_COLUMNS.get(table, ())
+    unknown = sorted(set(columns) - set(allowed))
+    if unknown:
+        raise ValueError(f"Cannot update {', '.join(unknown)}")
+    columns = tuple(column for column in allowed if column in columns)
+    if not columns:
+        raise ValueError("No columns to update")
+    name = f"{table}.update:{','.join(columns)}"
+    if name not in QUERIES:
+        register(name, f"UPDATE {table} SET {', '.join(f'{column} = %s' for column in columns)} WHERE id = %s")
+    return name, columns
+
+def prepared_cursor(connection, name):
+    """Return connection's prepared cursor for the named statement, opening it on first use"""
+    with _lock:
+        cursors = _cursors.get(connection)
+        if cursors is None:
+            cursors = _cursors[connection] = OrderedDict()
+    # A connection is only used by one thread at a time, so its own cache needs no lock
+    cursor = cursors.get(name)
+    if cursor is not None:
+        cursors.move_to_end(name)
+        return cursor
+    cursor = cursors[name] = connection.cursor(prepared=True)
+    STATEMENTS_PREPARED.inc(1, name)
+    if len(cursors) > STATEMENT_CACHE_SIZE:
+        # Closing the cursor deallocates its statement on the server
+        _, evicted = cursors.popitem(last=False)
+        evicted.close()
+    return cursor
+
+def execute(connection, name, params=()):
+    """Run the named statement and return its cursor, e.g. for rowcount or lastrowid.
+
+    The cursor stays cached with the connection: don't close it, and fetch
+    its rows before running anything else on the connection.
+    """
+    cursor = prepared_cursor(connection, name)
+    cursor.execute(QUERIES[name], tuple(params))
+    return cursor
+
+def fetch_one(connection, name, params=()):
+    """Run the named statement and return its first row, or None"""
+    rows = execute(connection, name, params).fetchall()
+    return rows[0] if rows else None
+
+def fetch_all(connection, name, params=()):
+    """Run the named statement and return all of its rows"""
+    return execute(connection, name, params).fetchall()
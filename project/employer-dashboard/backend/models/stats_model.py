@@ -0,0 +1,251 @@
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from cache import cached, invalidate_employee
+from db import db, Error
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+# Employee columns the rollups are derived from; writes touching none of
+# them leave the stats unchanged
+ROLLUP_FIELDS = ('department', 'salary', 'hire_date')
+CENT = Decimal('0.01')
+
+# Upserts in the selected backend's dialect; min/max only move outwards here,
+# a departing extreme is handled separately in apply()
+UPSERT_DEPARTMENT_STATS = f"""
+    INSERT INTO department_stats (department, headcount, salary_sum, salary_min, salary_max)
+    VALUES (%s, %s, %s, %s, %s)
+    {db.upsert('department')}
+        headcount = headcount + {db.inserted('headcount')},
+        salary_sum = salary_sum + {db.inserted('salary_sum')},
+        salary_min = {db.least}(COALESCE(salary_min, {db.inserted('salary_min')}),
+                                COALESCE({db.inserted('salary_min')}, salary_min)),
+        salary_max = {db.greatest}(COALESCE(salary_max, {db.inserted('salary_max')}),
+                                   COALESCE({db.inserted('salary_max')}, salary_max))
+"""
+UPSERT_HIRE_STATS = f"""
+    INSERT INTO department_hire_stats (department, hire_month, headcount)
+    VALUES (%s, %s, %s)
+    {db.upsert('department, hire_month')} headcount = headcount + {db.inserted('headcount')}
+"""
+
+def hire_month(hire_date):
+    """Return the first day of the month an employee was hired in"""
+    if isinstance(hire_date, datetime):
+        hire_date = hire_date.date()
+    elif not isinstance(hire_date, date):
+        hire_date = date.fromisoformat(str(hire_date)[:10])
+    return hire_date.replace(day=1)
+
+def _rollup(values):
+    """(headcount, salary sum, min, max) with the salaries as cents, however the backend returned them"""
+    headcount, *salaries = values
+    return (headcount, *(None if salary is None else Decimal(str(salary)).quantize(CENT) for salary in salaries))
+
+class EmployeeStats:
+    """Pre-computed rollups of the employees table.
+
+    department_stats holds headcount and salary sum/min/max per department,
+    department_hire_stats a monthly hire histogram per department. Writers
+    call apply() inside the same transaction as their employee change, so
+    reading the stats never scans employees. reconcile() rebuilds both tables
+    from scratch and is run periodically to correct any drift.
+    """
+
+    @staticmethod
+    def apply(cursor, added=(), removed=()):
+        """Fold added and removed (department, salary, hire_date) rows into the rollups.
+
+        Must run after the employee rows themselves were written, on the same
+        connection and before the commit.
+        """
+        departments = {}
+        months = {}
+        for sign, rows in ((1, added), (-1, removed)):
+            for department, salary, hire_date in rows:
+                salary = Decimal(str(salary))
+                delta = departments.setdefault(department, {
+                    'count': 0, 'sum': 0, 'min': None, 'max': None, 'removed': []
+                })
+                delta['count'] += sign
+                delta['sum'] += sign * salary
+                if sign > 0:
+                    delta['min'] = salary if delta['min'] is None else min(delta['min'], salary)
+                    delta['max'] = salary if delta['max'] is None else max(delta['max'], salary)
+                else:
+                    delta['removed'].append(salary)
+                key = (department, hire_month(hire_date))
+                months[key] = months.get(key, 0) + sign
+
+        for department, delta in departments.items():
+            cursor.execute(UPSERT_DEPARTMENT_STATS,
+                           (department, delta['count'], delta['sum'], delta['min'], delta['max']))
+
+            if delta['removed']:
+                # Only a departing extreme invalidates min/max, and then only
+                # this department's rows are read to find the new one
+                cursor.execute("""
+                    UPDATE department_stats
+                    SET salary_min = (SELECT MIN(salary) FROM employees WHERE department = %s),
+                        salary_max = (SELECT MAX(salary) FROM employees WHERE department = %s)
+                    WHERE department = %s AND (salary_min >= %s OR salary_max <= %s)
+                """, (department, department, department, min(delta['removed']), max(delta['removed'])))
+                cursor.execute("DELETE FROM department_stats WHERE department = %s AND headcount <= 0",
+                               (department,))
+
+        for (department, month), count in months.items():
+            if count == 0:
+                continue
+            cursor.execute(UPSERT_HIRE_STATS, (department, month, count))
+            if count < 0:
+                cursor.execute("""
+                    DELETE FROM department_hire_stats
+                    WHERE department = %s AND hire_month = %s AND headcount <= 0
+                """, (department, month))
+
+    @staticmethod
+    def get_summary():
+        """Return overall totals plus per-department figures and hire histograms"""
+        def load():
+            with db.connection(read=True) as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    with timed_query('stats.summary') as query:
+                        cursor.execute("""
+                            SELECT department, headcount, salary_sum, salary_min, salary_max
+                            FROM department_stats WHERE headcount > 0 ORDER BY department
+                        """)
+                        department_rows = cursor.fetchall()
+                        cursor.execute("""
+                            SELECT department, hire_month, headcount
+                            FROM department_hire_stats WHERE headcount > 0 ORDER BY department, hire_month
+                        """)
+                        month_rows = cursor.fetchall()
+                        query.rows = len(department_rows) + len(month_rows)
+                finally:
+                    cursor.close()
+
+            hires = {}
+            overall_hires = {}
+            for row in month_rows:
+                month = row['hire_month'].strftime('%Y-%m')
+                hires.setdefault(row['department'], {})[month] = row['headcount']
+                overall_hires[month] = overall_hires.get(month, 0) + row['headcount']
+
+            departments = []
+            total_employees = 0
+            total_salary = 0.0
+            for row in department_rows:
+                salary_sum = float(row['salary_sum'])
+                total_employees += row['headcount']
+                total_salary += salary_sum
+                departments.append({
+                    'department': row['department'],
+                    'headcount': row['headcount'],
+                    'salary_sum': salary_sum,
+                    'salary_min': float(row['salary_min']) if row['salary_min'] is not None else None,
+                    'salary_max': float(row['salary_max']) if row['salary_max'] is not None else None,
+                    'salary_avg': salary_sum / row['headcount'],
+                    'hires_by_month': hires.get(row['department'], {}),
+                })
+
+            return {
+                'total_employees': total_employees,
+                'total_salary': total_salary,
+                'average_salary': total_salary / total_employees if total_employees else 0.0,
+                'department_count': len(departments),
+                'departments': departments,
+                'hires_by_month': dict(sorted(overall_hires.items())),
+            }
+
+        return cached(lambda generation: f"stats:summary:{generation}", load)
+
+    @staticmethod
+    def reconcile():
+        """Rebuild the rollups from the employees table and return how many rows were corrected.
+
+        The rollup tables are locked before employees is read, so a writer
+        either commits before the rebuild sees its row, or waits and applies
+        its delta on top of the rebuilt values.
+        """
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                with timed_query('stats.reconcile') as query:
+                    connection.start_transaction()
+                    cursor.execute("""
+                        SELECT department, headcount, salary_sum, salary_min, salary_max
+                        FROM department_stats FOR UPDATE
+                    """)
+                    stored = {row[0]: _rollup(row[1:]) for row in cursor.fetchall()}
+                    cursor.execute("SELECT department, hire_month, headcount FROM department_hire_stats FOR UPDATE")
+                    stored_months = {(row[0], hire_month(row[1])): row[2] for row in cursor.fetchall()}
+
+                    cursor.execute("""
+                        SELECT department, COUNT(*), SUM(salary), MIN(salary), MAX(salary)
+                        FROM employees GROUP BY department
+                    """)
+                    actual = {row[0]: _rollup(row[1:]) for row in cursor.fetchall()}
+                    cursor.execute(f"""
+                        SELECT department, {db.month_start('hire_date')} AS hire_month, COUNT(*)
+                        FROM employees GROUP BY department, hire_month
+                    """)
+                    actual_months = {(row[0], hire_month(row[1])): row[2] for row in cursor.fetchall()}
+
+                    corrected = 0
+                    for department in stored.keys() | actual.keys():
+                        if stored.get(department) == actual.get(department):
+                            continue
+                        corrected += 1
+                        if department in actual:
+                            cursor.execute("""
+                                REPLACE INTO department_stats (department, headcount, salary_sum, salary_min, salary_max)
+                                VALUES (%s, %s, %s, %s, %s)
+                            """, (department, *actual[department]))
+                        else:
+                            cursor.execute("DELETE FROM department_stats WHERE department = %s", (department,))
+                    for key in stored_months.keys() | actual_months.keys():
+                        if stored_months.get(key) == actual_months.get(key):
+                            continue
+                        corrected += 1
+                        if key in actual_months:
+                            cursor.execute("""
+                                REPLACE INTO department_hire_stats (department, hire_month, headcount)
+                                VALUES (%s, %s, %s)
+                            """, (*key, actual_months[key]))
+                        else:
+                            cursor.execute("""
+                                DELETE FROM department_hire_stats WHERE department = %s AND hire_month = %s
+                            """, key)
+                    connection.commit()
+                    query.rows = corrected
+            except Error:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        if corrected:
+            logger.warning("Stats reconciliation corrected %d rollup rows", corrected)
+            invalidate_employee()
+        return corrected
+
+    @staticmethod
+    def ensure_populated():
+        """Build the rollups on first start against an existing employees table"""
+        try:
+            with db.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute("SELECT 1 FROM department_stats LIMIT 1")
+                    has_stats = cursor.fetchone() is not None
+                    cursor.execute("SELECT 1 FROM employees LIMIT 1")
+                    has_employees = cursor.fetchone() is not None
+                finally:
+                    cursor.close()
+            if has_employees and not has_stats:
+                EmployeeStats.reconcile()
+        except Error as e:
+            logger.error("Error populating employee stats: %s", e)
@@ -0,0 +1,50 @@
+import logging
+from db import db, IntegrityError
+from metrics import timed_query
+from models.queries import execute, fetch_all, register
+
+logger = logging.getLogger(__name__)
+
+INSERT_REVOKED = register('revoked_tokens.insert', "INSERT INTO revoked_tokens (jti, expires_at) VALUES (%s, %s)")
+GET_REVOKED_SINCE = register('revoked_tokens.since', """
+    SELECT id, jti, expires_at FROM revoked_tokens WHERE id > %s AND expires_at > %s ORDER BY id
+""")
+PRUNE_REVOKED = register('revoked_tokens.prune', "DELETE FROM revoked_tokens WHERE expires_at <= %s")
+
+class RevokedTokens:
+    """The revoked_tokens table, shared by every server process.
+
+    Each revocation is one row keyed by the token's unique jti, so revoking
+    a token twice fails; the refresh handler relies on that to let each
+    refresh token be used only once, whichever process sees it.
+    """
+
+    @staticmethod
+    def revoke(jti, expires_at):
+        """Record the token id as revoked; returns False if it already was"""
+        try:
+            with db.connection() as connection:
+                with timed_query('revoked_tokens.insert'):
+                    execute(connection, INSERT_REVOKED, (jti, expires_at))
+            return True
+        except IntegrityError:
+            return False
+
+    @staticmethod
+    def get_since(last_id, now):
+        """Return (id, jti, expires_at) for unexpired revocations after last_id, oldest first"""
+        with db.connection() as connection:
+            with timed_query('revoked_tokens.since') as query:
+                rows = fetch_all(connection, GET_REVOKED_SINCE, (last_id, now))
+                query.rows = len(rows)
+        return rows
+
+    @staticmethod
+    def prune(now):
+        """Drop revocations of tokens that have expired anyway; returns how many were removed"""
+        with db.connection() as connection:
+            with timed_query('revoked_tokens.prune') as query:
+                query.rows = execute(connection, PRUNE_REVOKED, (now,)).rowcount
+        if query.rows:
+            logger.debug("Pruned %d revoked tokens", query.rows)
+        return query.rows
@@ -1,9 +1,29 @@
+import logging
 from datetime import datetime
-import mysql.connector
-from mysql.connector import Error
-from db import db
+from db import db, Error
+from metrics import timed_query
+from models.queries import QUERIES, execute, fetch_one, register, update_statement
+from passwords import DUMMY_HASH, hash_password, needs_rehash, verify_password
+from serialization import encode_user
+
+logger = logging.getLogger(__name__)
+
+# Field order of the rows get_by_username reads
+USER_COLUMNS = ('id', 'username', 'password', 'role', 'employee_id', 'created_at', 'updated_at')
+
+# Fixed statements, run as prepared statements through models/queries.py
+GET_BY_USERNAME = register('users.get_by_username',
+                           f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE username = %s")
+GET_BY_ID = register('users.get_by_id', f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE id = %s")
+USERNAME_EXISTS = register('users.username_exists', "SELECT id FROM users WHERE username = %s")
+INSERT_EMPLOYEE_USER = register('users.insert', """
+    INSERT INTO users (username, password, role, employee_id)
+    VALUES (%s, %s, 'employee', %s)
+""")
 
 class User:
+    __slots__ = USER_COLUMNS
+
     def __init__(self, username=None, password=None, role='employee', employee_id=None, id=None):
         self.id = id
         self.username = username
@@ -15,82 +35,115 @@ class User:
     
     def to_dict(self):
         """Convert user object to dictionary"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'role': self.role,
-            'employee_id': self.employee_id,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
-        }
+        return encode_user(self)
     
     @staticmethod
     def authenticate(username, password):
-        """Authenticate user with username and password"""
-        connection = db.get_connection()
-        if not connection:
+        """Authenticate user with username and password.
+
+        Runs the password KDF on the calling thread; LoginHandler does the
+        same steps with the KDF on the dedicated pool instead.
+        """
+        user = User.get_by_username(username)
+        if not verify_password(password, user.password if user else DUMMY_HASH) or not user:
             return None
-        
-        cursor = None
+        if needs_rehash(user.password):
+            User.update_password(user.id, hash_password(password))
+        return user
+    
+    @staticmethod
+    def get_by_username(username):
+        """Load a user, including the stored password hash, by username"""
         try:
-            cursor = connection.cursor(dictionary=True)  # FIXED: Use dictionary cursor
-            query = "SELECT * FROM users WHERE username = %s AND password = %s"
-            cursor.execute(query, (username, password))
-            row = cursor.fetchone()
+            with db.connection(read=True) as connection:
+                with timed_query('users.get_by_username') as query:
+                    row = fetch_one(connection, GET_BY_USERNAME, (username,))
+                    query.rows = int(row is not None)
             
             if row:
                 user = User()
-                user.id = row['id']
-                user.username = row['username']
-                user.password = row['password']
-                user.role = row['role']
-                user.employee_id = row['employee_id']  # This was the problem!
-                user.created_at = row['created_at']
-                user.updated_at = row['updated_at']
+                (user.id, user.username, user.password, user.role, user.employee_id,
+                 user.created_at, user.updated_at) = row
                 return user
             return None
             
         except Error as e:
-            print(f"Error authenticating user: {e}")
+            logger.error("Error authenticating user: %s", e)
             return None
-        finally:
-            if cursor:
-                cursor.close()
     
     @staticmethod
-    def create_employee_user(username, password, employee_id):
-        """Create a user account for an employee"""
-        connection = db.get_connection()
-        if not connection:
+    def get_by_id(user_id):
+        """Load a user by id, or return None if there is no such user.
+
+        Reads the primary, so a role change or deletion is seen right away.
+        """
+        with db.connection() as connection:
+            with timed_query('users.get_by_id') as query:
+                row = fetch_one(connection, GET_BY_ID, (user_id,))
+                query.rows = int(row is not None)
+        if row is None:
+            return None
+        user = User()
+        (user.id, user.username, user.password, user.role, user.employee_id,
+         user.created_at, user.updated_at) = row
+        return user
+    
+    @staticmethod
+    def update_password(user_id, password_hash):
+        """Store a new password hash, e.g. when upgrading a legacy or outdated one"""
+        try:
+            update, _ = update_statement('users', ('password',))
+            with db.connection() as connection:
+                with timed_query('users.update_password') as query:
+                    query.rows = execute(connection, update, (password_hash, user_id)).rowcount
+            db.record_write()
+            return query.rows > 0
+        except Error as e:
+            logger.error("Error updating password: %s", e)
             return False
-        
-        cursor = None
+    
+    @staticmethod
+    def create_employee_user(username, password, employee_id, password_hash=None):
+        """Create a user account for an employee.
+
+        Pass password_hash when the password was already hashed off-thread;
+        otherwise it is hashed here.
+        """
+        if password_hash is None:
+            password_hash = hash_password(password)
         try:
-            cursor = connection.cursor()
-            
-            # Check if username already exists
-            cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
-            if cursor.fetchone():
-                raise Exception("Username already exists")
-            
-            # Insert new user
-            insert_query = """
-            INSERT INTO users (username, password, role, employee_id)
-            VALUES (%s, %s, 'employee', %s)
-            """
-            
-            cursor.execute(insert_query, (username, password, employee_id))
-            
-            if not connection.autocommit:
-                connection.commit()
-            
+            with db.connection() as connection:
+                if fetch_one(connection, USERNAME_EXISTS, (username,)):
+                    raise Exception("Username already exists")
+                
+                execute(connection, INSERT_EMPLOYEE_USER, (username, password_hash, employee_id))
+                
+                if not connection.autocommit:
+                    connection.commit()
+            db.record_write()
             return True
             
         except Error as e:
-            print(f"Error creating user: {e}")
-            if connection and not connection.autocommit:
-                connection.rollback()
+            logger.error("Error creating user: %s", e)
             return False
-        finally:
-            if cursor:
-                cursor.close()
\ No newline at end of file
+    
+    @staticmethod
+    def find_existing_usernames(cursor, usernames):
+        """Return which of the given usernames are already taken"""
+        if not usernames:
+            return set()
+        placeholders = ', '.join(['%s'] * len(usernames))
+        cursor.execute(f"SELECT username FROM users WHERE username IN ({placeholders})", list(usernames))
+        return {row[0].lower() for row in cursor.fetchall()}
+    
+    @staticmethod
+    def insert_employee_users(cursor, accounts):
+        """Insert (username, password_hash, employee_id) rows in one multi-row statement.
+
+        Runs on the caller's cursor so it shares the caller's transaction.
+        """
+        if not accounts:
+            return
+        # A plain cursor's executemany folds the rows into one multi-row
+        # INSERT; a prepared one would send them one at a time
+        cursor.executemany(QUERIES[INSERT_EMPLOYEE_USER], accounts)
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = 'scrypt'
+
+# scrypt cost parameters for new hashes; tune with benchmarks/login_benchmark.py
+SCRYPT_N = int(os.getenv('SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.getenv('SCRYPT_R', 8))
+SCRYPT_P = int(os.getenv('SCRYPT_P', 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# hashlib.scrypt releases the GIL while it runs, so a thread per core is
+# enough to use every core without blocking the IOLoop
+_kdf_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('KDF_WORKERS', os.cpu_count() or 1)),
+    thread_name_prefix='kdf-worker'
+)
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL's default 32 MiB memory cap is too small for n >= 2**15
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=KEY_BYTES)
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + '$')
+
+def hash_password(password, n=None, r=None, p=None):
+    """Hash a password as 'scrypt$n$r$p$salt$key'"""
+    n = n or SCRYPT_N
+    r = r or SCRYPT_R
+    p = p or SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{ALGORITHM}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+def verify_password(password, stored):
+    """Check a password against a stored hash.
+
+    Rows created before hashing was introduced hold the plaintext password;
+    those are compared in constant time and flagged by needs_rehash.
+    """
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        _, n, r, p, salt, key = stored.split('$')
+        expected = _b64decode(key)
+        actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def needs_rehash(stored):
+    """True for plaintext passwords and hashes made with other cost parameters"""
+    if not is_hashed(stored):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split('$')
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel on the KDF pool (blocking)"""
+    return list(_kdf_executor.map(hash_password, passwords))
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, hash_password, password)
+
+async def verify_password_async(password, stored):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_executor, verify_password, password, stored)
+
+# Verified against when the username is unknown, so a miss costs as much as a
+# wrong password and response times don't reveal which usernames exist
+DUMMY_HASH = hash_password(os.urandom(16).hex())
@@ -0,0 +1,305 @@
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from models.employee_model import Employee
+
+logger = logging.getLogger(__name__)
+
+# Letters and digits form separate terms, so 'jsmith42' is found by 'jsmith'
+TOKEN_PATTERN = re.compile(r'[a-z]+|[0-9]+')
+
+# How much a hit in each field counts towards a result's rank
+FIELD_WEIGHTS = (('name', 4.0), ('email', 3.0), ('position', 2.0), ('department', 2.0))
+ID_WEIGHT = 5.0
+# Multipliers for how closely a term matched the query token
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+FUZZY_MATCH = 0.4
+
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_TOKENS = 8
+# Tokens shorter than this only match exactly or by prefix
+FUZZY_MIN_LENGTH = 4
+# Typo matching only kicks in when exact and prefix matches find fewer employees
+FUZZY_FALLBACK_RESULTS = 100
+RESULT_CACHE_SIZE = 256
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def deletions(term):
+    """The term with each single character removed, plus the term itself.
+
+    Two words within one typo (insertion, deletion, substitution or swap of
+    neighbours) always share at least one of these variants.
+    """
+    return {term[:i] + term[i + 1:] for i in range(len(term))} | {term}
+
+def fuzzy_indexed(term):
+    return len(term) >= FUZZY_MIN_LENGTH - 1 and not term.isdigit()
+
+class TermIndex:
+    """Inverted index from terms to employees, plus a deletion-variant index over the terms for typo tolerance"""
+
+    def __init__(self):
+        self.rows = {}
+        self.doc_terms = {}
+        self.postings = {}
+        self.terms = []
+        self.variants = {}
+        # Terms added since self.terms was last sorted
+        self._new_terms = []
+
+    def add(self, row):
+        employee_id = row.id
+        self.remove(employee_id)
+        terms = {str(employee_id): ID_WEIGHT}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(getattr(row, field)):
+                if weight > terms.get(term, 0):
+                    terms[term] = weight
+
+        for term, weight in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._new_terms.append(term)
+                if fuzzy_indexed(term):
+                    for variant in deletions(term):
+                        self.variants.setdefault(variant, set()).add(term)
+            postings[employee_id] = weight
+        self.doc_terms[employee_id] = terms
+        self.rows[employee_id] = row
+
+    def remove(self, employee_id):
+        terms = self.doc_terms.pop(employee_id, None)
+        if terms is None:
+            return
+        del self.rows[employee_id]
+        for term in terms:
+            postings = self.postings[term]
+            del postings[employee_id]
+            if postings:
+                continue
+            del self.postings[term]
+            terms = self.sorted_terms()
+            del terms[bisect.bisect_left(terms, term)]
+            if fuzzy_indexed(term):
+                for variant in deletions(term):
+                    terms = self.variants[variant]
+                    terms.discard(term)
+                    if not terms:
+                        del self.variants[variant]
+
+    def sorted_terms(self):
+        """Return every term in order, merging in new terms with one sort rather than an insert each"""
+        if self._new_terms:
+            self.terms.extend(self._new_terms)
+            self.terms.sort()
+            self._new_terms = []
+        return self.terms
+
+    def match(self, token):
+        """Return {term: factor} for the terms equal to, starting with or one typo away from token"""
+        matches = {}
+        hits = 0
+        terms = self.sorted_terms()
+        i = bisect.bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token):
+            term = terms[i]
+            matches[term] = EXACT_MATCH if term == token else PREFIX_MATCH
+            hits += len(self.postings[term])
+            i += 1
+
+        if hits < FUZZY_FALLBACK_RESULTS and len(token) >= FUZZY_MIN_LENGTH and not token.isdigit():
+            for variant in deletions(token):
+                for term in self.variants.get(variant, ()):
+                    matches.setdefault(term, FUZZY_MATCH)
+        return matches
+
+    def rank(self, tokens):
+        """Return the ids of employees matching every token, best first"""
+        token_matches = [self.match(token) for token in set(tokens)]
+        # Start from the token with the fewest postings; the others only filter its employees
+        token_matches.sort(key=lambda matches: sum(len(self.postings[term]) for term in matches))
+
+        scores = {}
+        for term, factor in token_matches[0].items():
+            for employee_id, weight in self.postings[term].items():
+                score = weight * factor
+                if score > scores.get(employee_id, 0):
+                    scores[employee_id] = score
+
+        for matches in token_matches[1:]:
+            if not scores:
+                break
+            narrowed = {}
+            for term, factor in matches.items():
+                for employee_id, weight in self.postings[term].items():
+                    score = scores.get(employee_id)
+                    if score is not None:
+                        narrowed[employee_id] = max(narrowed.get(employee_id, score), score + weight * factor)
+            scores = narrowed
+        return sorted(scores, key=lambda employee_id: (-scores[employee_id], self.rows[employee_id].name, employee_id))
+
+class EmployeeSearchIndex:
+    """In-process search over employee name, email, position, department and id.
+
+    Each server process keeps its own index. Writes made through the
+    Employee model in this process are picked up on the next search; writes
+    from other processes are found by polling updated_at every
+    refresh_interval seconds, and the whole index is rebuilt every
+    rebuild_interval seconds to drop employees deleted elsewhere.
+
+    Builds run on a background thread, started by start() when the process
+    comes up; searches keep using the previous index until the new one is
+    swapped in. Only a search that arrives before the first build finishes
+    waits for it.
+    """
+
+    def __init__(self, refresh_interval=1.0, rebuild_interval=300.0):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._index = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._results = OrderedDict()
+        self._changed = set()
+        self._deleted = set()
+        self._watermark = None
+        self._built_at = 0
+        self._synced_at = 0
+        self._rebuilding = False
+        # Set whenever no build is running
+        self._idle = threading.Event()
+        self._idle.set()
+        # Employees removed while a rebuild streams rows, to drop from the new index
+        self._removed_during_rebuild = set()
+
+    def start(self):
+        """Build the index in the background, so no search has to wait for it"""
+        self._start_rebuild()
+
+    def mark_changed(self, employee_ids, deleted=False):
+        """Employee change listener; the rows are reloaded on the next search"""
+        with self._lock:
+            (self._deleted if deleted else self._changed).update(employee_ids)
+
+    def search(self, query, limit=20, offset=0):
+        """Return (employees, total) for one page of results ranked by relevance"""
+        tokens = tokenize(query)[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return [], 0
+        self._refresh()
+
+        key = ' '.join(tokens)
+        with self._lock:
+            ranked = self._results.get(key)
+            if ranked is None:
+                ranked = self._index.rank(tokens)
+                self._results[key] = ranked
+                if len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+            return [self._index.rows[employee_id] for employee_id in ranked[offset:offset + limit]], len(ranked)
+
+    def _refresh(self):
+        if self._index is None:
+            self._start_rebuild()
+            self._idle.wait()
+            if self._index is None:
+                raise RuntimeError("Search index is not available yet")
+        now = time.monotonic()
+        if now - self._built_at >= self.rebuild_interval:
+            self._start_rebuild()
+        if not (self._changed or self._deleted) and now - self._synced_at < self.refresh_interval:
+            return
+        # Only one thread talks to the database; the others search the current index
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._sync()
+        finally:
+            self._refresh_lock.release()
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+            self._removed_during_rebuild = set()
+            self._idle.clear()
+        threading.Thread(target=self._run_rebuild, name='search-index-rebuild', daemon=True).start()
+
+    def _run_rebuild(self):
+        try:
+            self._rebuild()
+        except Exception as e:
+            logger.error("Building the search index failed: %s", e)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            self._idle.set()
+
+    def _rebuild(self):
+        started = time.monotonic()
+        index = TermIndex()
+        watermark = None
+        for batch in Employee.iter_batches():
+            for row in batch:
+                index.add(row)
+                if row.updated_at and (watermark is None or row.updated_at > watermark):
+                    watermark = row.updated_at
+        with self._refresh_lock:
+            with self._lock:
+                for employee_id in self._removed_during_rebuild:
+                    index.remove(employee_id)
+                self._index = index
+                self._watermark = watermark
+                self._rebuilding = False
+                self._results.clear()
+            self._built_at = self._synced_at = time.monotonic()
+            logger.info("Built search index over %d employees in %.2fs", len(index.rows), self._built_at - started)
+            # Catch writes made while the rows were being streamed
+            self._sync()
+
+    def _sync(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            deleted, self._deleted = self._deleted, set()
+        self._synced_at = time.monotonic()
+        try:
+            rows = Employee.get_updated_since(self._watermark)
+            if changed:
+                rows += Employee.get_rows_by_ids(changed)
+        except Exception:
+            with self._lock:
+                self._changed |= changed
+                self._deleted |= deleted
+            raise
+        found = {row.id for row in rows}
+        with self._lock:
+            if self._rebuilding:
+                self._removed_during_rebuild |= deleted | (changed - found)
+            # Rows stamped in the watermark's second come back on every poll
+            rows = [row for row in rows if self._index.rows.get(row.id) != row]
+            if not (rows or deleted or changed - found):
+                return
+            for employee_id in deleted | (changed - found):
+                self._index.remove(employee_id)
+            for row in rows:
+                self._index.add(row)
+                if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                    self._watermark = row.updated_at
+            self._results.clear()
+
+employee_search = EmployeeSearchIndex(
+    refresh_interval=float(os.getenv('SEARCH_REFRESH_INTERVAL', 1)),
+    rebuild_interval=float(os.getenv('SEARCH_REBUILD_INTERVAL', 300)),
+)
+Employee.add_change_listener(employee_search.mark_changed)
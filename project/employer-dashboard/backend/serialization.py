@@ -0,0 +1,103 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def format_datetime(value):
+    """'YYYY-MM-DD HH:MM:SS', the format every timestamp in the API uses"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat(' ', 'seconds')
+
+def format_date(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+def format_decimal(value):
+    return float(value) if value is not None else None
+
+# Fields of the JSON objects the API returns, each with the converter its
+# database value needs (None when it is JSON-ready as is)
+EMPLOYEE_FIELDS = (
+    ('id', None),
+    ('name', None),
+    ('email', None),
+    ('position', None),
+    ('department', None),
+    ('salary', format_decimal),
+    ('hire_date', format_date),
+    ('created_at', format_datetime),
+    ('updated_at', format_datetime),
+)
+USER_FIELDS = (
+    ('id', None),
+    ('username', None),
+    ('role', None),
+    ('employee_id', None),
+    ('created_at', format_datetime),
+    ('updated_at', format_datetime),
+)
+
+def compile_encoder(fields):
+    """Build a function that turns a row into a JSON-ready dict of the given fields.
+
+    Rows are read by attribute, so model objects and the models' row tuples
+    both work. The function is generated as a single dict display, so
+    encoding a row costs one call per converted field and no per-field loop.
+    """
+    namespace = {}
+    items = []
+    for name, convert in fields:
+        if convert is None:
+            items.append(f"{name!r}: row.{name}")
+        else:
+            namespace[f"convert_{name}"] = convert
+            items.append(f"{name!r}: convert_{name}(row.{name})")
+    exec(f"def encode(row):\n    return {{{', '.join(items)}}}", namespace)
+    return namespace['encode']
+
+encode_employee = compile_encoder(EMPLOYEE_FIELDS)
+encode_user = compile_encoder(USER_FIELDS)
+
+def encode_employees(rows):
+    return list(map(encode_employee, rows))
+
+def encode_employees_by_id(rows):
+    """Encode rows into an object keyed by id; JSON object keys are strings"""
+    return {str(row.id): encode_employee(row) for row in rows}
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(value):
+        """Encode value as compact UTF-8 JSON bytes"""
+        # Datetimes go through _default so they match the stdlib path
+        return orjson.dumps(value, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_default)
+
+    def dumps(value):
+        """Encode value as compact UTF-8 JSON bytes"""
+        return _encoder.encode(value).encode('utf-8')
+
+def dumps_lines(values):
+    """Encode each value as one line of newline-delimited JSON"""
+    return b''.join(dumps(value) + b'\n' for value in values)
+
+def dumps_items(values):
+    """Encode values as the comma-separated items of a JSON array, without the brackets"""
+    return dumps(list(values))[1:-1]
@@ -0,0 +1,70 @@
+"""Run the suite against a throwaway SQLite database.
+
+The modules read their settings from the environment when first imported,
+so it is set here, before any of them are.
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_data_dir = tempfile.mkdtemp(prefix='employer-dashboard-tests-')
+os.environ.update({
+    'DB_BACKEND': 'sqlite',
+    'SQLITE_PATH': os.path.join(_data_dir, 'employer_dashboard.db'),
+    'CACHE_BACKEND': 'memory',
+    'WEB_WORKERS': '1',
+    'AUTH_SECRET': 'test-secret',
+    # Cheap hashes; the cost itself is measured by benchmarks/login_benchmark.py
+    'SCRYPT_N': str(2 ** 10),
+})
+
+import pytest
+from tornado.testing import AsyncHTTPTestCase
+from app import make_app
+from auth_tokens import issue_token_pair, revoked_tokens
+from cache import invalidate_employee
+from db import db
+from models.user_model import User
+
+# Everything a test may have written; the default admin is kept
+TABLES = ('employee_history', 'employee_changes', 'revoked_tokens', 'employees')
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    db.initialize_database()
+    yield db
+    db.close_all()
+
+@pytest.fixture(autouse=True)
+def clean_database(database):
+    yield
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        for table in TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.execute("DELETE FROM users WHERE username <> 'admin'")
+        cursor.close()
+    revoked_tokens._revoked.clear()
+    invalidate_employee()
+
+class ApiTestCase(AsyncHTTPTestCase):
+    """Calls the API in-process, authenticated as the default admin"""
+
+    def get_app(self):
+        return make_app()
+
+    def setUp(self):
+        super().setUp()
+        self.tokens = issue_token_pair(User.get_by_username('admin'))
+
+    def api(self, method, path, body=None, token=None, headers=None):
+        headers = dict(headers or {})
+        headers.setdefault('Authorization', f"Bearer {token or self.tokens['access_token']}")
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+        if body is None and method in ('POST', 'PUT'):
+            body = ''
+        return self.fetch(path, method=method, body=body, headers=headers)
@@ -0,0 +1,106 @@
+import json
+import time
+import pytest
+import audit
+from audit import AuditWriter
+from conftest import ApiTestCase
+from models import employee_model
+from models.employee_model import Employee
+from test_bulk_import import row
+
+@pytest.fixture
+def written(monkeypatch):
+    """Rows the writers hand to the history table, which the writer thread may not have flushed yet"""
+    rows = []
+    monkeypatch.setattr(audit.EmployeeHistory, 'write', rows.extend)
+    return rows
+
+def events(count):
+    return [(employee_id, 'update', {'name': ['Old', 'New']}) for employee_id in range(count)]
+
+def test_record_drops_what_does_not_fit(written):
+    # A long flush interval keeps everything queued until close()
+    writer = AuditWriter(max_queue=3, batch_size=100, flush_interval=60)
+    started = time.monotonic()
+    writer.record(events(2))
+    writer.record(events(2))
+    writer.record(events(1))
+    assert time.monotonic() - started < 1
+    stats = writer.stats()
+    assert (stats['queued'], stats['recorded'], stats['dropped']) == (3, 3, 2)
+
+    assert writer.close()
+    assert len(written) == 3
+    assert writer.stats()['written'] == 3
+
+def test_record_after_close_drops_everything(written):
+    writer = AuditWriter(max_queue=3)
+    writer.close()
+    writer.record(events(1))
+    assert writer.stats()['dropped'] == 1
+    assert not written
+
+def test_wait_for_room_times_out_while_full(written):
+    writer = AuditWriter(max_queue=2, batch_size=100, flush_interval=60)
+    writer.record(events(2))
+    assert not writer.wait_for_room(1, timeout=0.05)
+    assert writer.stats()['waits'] >= 1
+    writer.close()
+
+def test_wait_for_room_returns_once_the_writer_catches_up(written):
+    writer = AuditWriter(max_queue=2, batch_size=2, flush_interval=0.05)
+    writer.record(events(1))
+    assert writer.wait_for_room(2, timeout=5)
+    # More than the queue holds waits for it to be empty
+    writer.record(events(2))
+    assert writer.wait_for_room(10, timeout=5)
+    assert writer.close()
+    assert len(written) == 3
+
+def test_failed_flushes_are_retried(monkeypatch):
+    rows = []
+    failures = iter([True])
+
+    def flaky_write(batch):
+        if next(failures, False):
+            raise RuntimeError("database is down")
+        rows.extend(batch)
+
+    monkeypatch.setattr(audit.EmployeeHistory, 'write', flaky_write)
+    writer = AuditWriter(max_queue=2, batch_size=2, flush_interval=0.01)
+    writer.record(events(2))
+    # The failed batch keeps its room, so nothing more fits until it is written
+    writer.record(events(1))
+    assert writer.close()
+    stats = writer.stats()
+    assert (stats['failed_flushes'], stats['written'], stats['dropped']) == (1, 2, 1)
+    assert len(rows) == 2
+
+class BulkImportBackpressureTest(ApiTestCase):
+    def use_writer(self, writer):
+        original = employee_model.audit_writer
+        employee_model.audit_writer = writer
+        self.addCleanup(setattr, employee_model, 'audit_writer', original)
+        self.addCleanup(writer.close)
+
+    def test_chunks_wait_for_the_history_to_be_written(self):
+        writer = AuditWriter(max_queue=2, batch_size=2, flush_interval=0.01, enqueue_timeout=5)
+        self.use_writer(writer)
+        results = Employee.bulk_create([row(f"Person{n}") for n in range(6)], chunk_size=2)
+        self.assertTrue(all('id' in result for result in results))
+        self.assertTrue(writer.close())
+        stats = writer.stats()
+        self.assertEqual((stats['written'], stats['dropped']), (6, 0))
+
+    def test_a_full_queue_fails_the_remaining_rows_before_they_commit(self):
+        writer = AuditWriter(max_queue=1, batch_size=100, flush_interval=60, enqueue_timeout=0.05)
+        self.use_writer(writer)
+        writer.record(events(1))
+
+        response = self.api('POST', '/api/employees/bulk', body=[row('Avery'), row('Blake')])
+        self.assertEqual(response.code, 200)
+        body = json.loads(response.body)
+        self.assertEqual((body['created'], body['failed']), (0, 2))
+        self.assertEqual(body['results'][0]['error'], "History queue is full; retry later")
+        self.assertEqual(Employee.get_all(), [])
+        self.assertEqual(writer.stats()['dropped'], 0)
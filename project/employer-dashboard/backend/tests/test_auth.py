@@ -0,0 +1,70 @@
+import json
+from auth_tokens import issue_token_pair, revoked_tokens
+from conftest import ApiTestCase
+from db import db
+from models.user_model import User
+
+class AuthTest(ApiTestCase):
+    def login(self, username='admin', password='admin123'):
+        response = self.fetch('/api/login', method='POST', body=json.dumps({'username': username, 'password': password}))
+        return response.code, json.loads(response.body)
+
+    def refresh(self, refresh_token):
+        response = self.fetch('/api/token/refresh', method='POST', body=json.dumps({'refresh_token': refresh_token}))
+        return response.code, json.loads(response.body)
+
+    def test_login_issues_a_working_token_pair(self):
+        code, body = self.login()
+        self.assertEqual(code, 200)
+        self.assertEqual(body['user']['role'], 'admin')
+        self.assertEqual(self.api('GET', '/api/employees', token=body['access_token']).code, 200)
+
+    def test_login_rejects_a_wrong_password(self):
+        code, body = self.login(password='wrong')
+        self.assertEqual(code, 401)
+        self.assertNotIn('access_token', body)
+
+    def test_requests_need_a_valid_token(self):
+        self.assertEqual(self.fetch('/api/employees').code, 401)
+        self.assertEqual(self.api('GET', '/api/employees', token=self.tokens['access_token'] + 'x').code, 401)
+        # A refresh token is not an access token
+        self.assertEqual(self.api('GET', '/api/employees', token=self.tokens['refresh_token']).code, 401)
+
+    def test_refresh_issues_a_new_pair_once(self):
+        code, body = self.refresh(self.tokens['refresh_token'])
+        self.assertEqual(code, 200)
+        self.assertNotEqual(body['refresh_token'], self.tokens['refresh_token'])
+        self.assertEqual(self.api('GET', '/api/employees', token=body['access_token']).code, 200)
+
+        code, body = self.refresh(self.tokens['refresh_token'])
+        self.assertEqual(code, 401)
+        self.assertEqual(body['error'], "Token has been revoked")
+
+    def test_replay_is_rejected_by_the_shared_list(self):
+        self.assertEqual(self.refresh(self.tokens['refresh_token'])[0], 200)
+        # As if the replay reached another worker that hasn't synced yet
+        revoked_tokens._revoked.clear()
+        self.assertEqual(self.refresh(self.tokens['refresh_token'])[0], 401)
+
+    def test_refresh_rereads_the_user(self):
+        self.assertTrue(User.create_employee_user('leaver', 'secret123', None))
+        tokens = issue_token_pair(User.get_by_username('leaver'))
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM users WHERE username = 'leaver'")
+            cursor.close()
+
+        code, body = self.refresh(tokens['refresh_token'])
+        self.assertEqual(code, 401)
+        self.assertEqual(body['error'], "User no longer exists")
+
+    def test_logout_revokes_both_tokens(self):
+        response = self.api('POST', '/api/logout', body={'refresh_token': self.tokens['refresh_token']})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self.api('GET', '/api/employees').code, 401)
+        self.assertEqual(self.refresh(self.tokens['refresh_token'])[0], 401)
+
+        # Other processes pick the revocations up from the shared table
+        revoked_tokens._revoked.clear()
+        self.assertEqual(revoked_tokens.sync(), 2)
+        self.assertEqual(self.api('GET', '/api/employees').code, 401)
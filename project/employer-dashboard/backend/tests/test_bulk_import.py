@@ -0,0 +1,68 @@
+import json
+from conftest import ApiTestCase
+from models.employee_model import Employee
+from models.user_model import User
+
+def row(name, **overrides):
+    values = {'name': name, 'email': f"{name.lower()}@example.com", 'position': 'Engineer',
+              'department': 'Platform', 'salary': 80000, 'hire_date': '2022-04-01'}
+    values.update(overrides)
+    return values
+
+def count_employees():
+    return len(Employee.get_all())
+
+class BulkImportTest(ApiTestCase):
+    def test_bad_rows_fail_alone(self):
+        existing = Employee.bulk_create([row('Taken')])
+        self.assertIn('id', existing[0])
+
+        rows = [
+            row('Avery'),
+            row('Blake', salary='lots'),
+            row('Casey', email='avery@example.com'),
+            row('Taken'),
+            row('Drew', hire_date='01/02/2020'),
+            {'name': 'Emery'},
+            row('Finley', username='finley', password='secret123'),
+            'not an object',
+        ]
+        response = self.api('POST', '/api/employees/bulk', body=rows)
+        self.assertEqual(response.code, 201)
+        body = json.loads(response.body)
+        self.assertEqual((body['created'], body['failed']), (2, 6))
+
+        results = body['results']
+        self.assertEqual([result['index'] for result in results], list(range(len(rows))))
+        self.assertEqual([index for index, result in enumerate(results) if 'id' in result], [0, 6])
+        self.assertEqual(results[1]['error'], "Salary must be a number")
+        self.assertIn("Duplicate email in import", results[2]['error'])
+        self.assertEqual(results[3]['error'], "Email already exists: taken@example.com")
+        self.assertEqual(results[4]['error'], "hire_date must be a YYYY-MM-DD date")
+        self.assertEqual(results[5]['error'], "Missing required field: email")
+        self.assertEqual(results[7]['error'], "Row must be an object")
+
+        self.assertEqual(count_employees(), 3)
+        self.assertEqual(User.get_by_username('finley').employee_id, results[6]['id'])
+
+    def test_a_conflict_only_fails_its_row_across_chunks(self):
+        Employee.bulk_create([row('Taken')])
+        rows = [row('Avery'), row('Blake'), row('Taken'), row('Casey'), row('Drew')]
+        results = Employee.bulk_create(rows, chunk_size=2)
+        self.assertEqual(['id' in result for result in results], [True, True, False, True, True])
+        self.assertEqual(count_employees(), 5)
+
+    def test_nothing_valid_is_not_created(self):
+        response = self.api('POST', '/api/employees/bulk', body=[row('Avery', salary=-1)])
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)['created'], 0)
+        self.assertEqual(count_employees(), 0)
+
+    def test_csv_upload(self):
+        body = "name,email,position,department,salary,hire_date\n" \
+               "Avery,avery@example.com,Engineer,Platform,80000,2022-04-01\n" \
+               "Blake,,Engineer,Platform,80000,2022-04-01\n"
+        response = self.api('POST', '/api/employees/bulk', body=body, headers={'Content-Type': 'text/csv'})
+        body = json.loads(response.body)
+        self.assertEqual((body['created'], body['failed']), (1, 1))
+        self.assertEqual(body['results'][1]['error'], "Missing required field: email")
@@ -0,0 +1,102 @@
+import json
+from urllib.parse import urlencode
+from conftest import ApiTestCase
+from models.employee_model import SORT_COLUMNS, Employee
+
+# Repeated salaries and hire dates, so pages have to break ties on id
+ROWS = [
+    ('Avery', 'Engineer', 95000, '2021-03-01'),
+    ('Blake', 'Engineer', 72000, '2019-07-15'),
+    ('Casey', 'Manager', 95000, '2021-03-01'),
+    ('Drew', 'Analyst', 58000, '2020-01-06'),
+    ('Emery', 'Engineer', 72000, '2022-11-30'),
+    ('Finley', 'Analyst', 101000, '2019-07-15'),
+    ('Gray', 'Manager', 64000, '2023-05-22'),
+]
+
+def create_employees(department='Platform'):
+    results = Employee.bulk_create([
+        {'name': name, 'email': f"{name.lower()}@{department.lower()}.example.com", 'position': position,
+         'department': department, 'salary': salary, 'hire_date': hire_date}
+        for name, position, salary, hire_date in ROWS
+    ])
+    return [result['id'] for result in results]
+
+class PaginationTest(ApiTestCase):
+    def walk(self, sort, order, limit=3):
+        """Follow next_cursor through every page, returning the employees in the order served"""
+        employees = []
+        query = {'department': 'Platform', 'sort': sort, 'order': order, 'limit': limit}
+        while True:
+            response = self.api('GET', '/api/employees?' + urlencode(query))
+            self.assertEqual(response.code, 200)
+            page = json.loads(response.body)
+            self.assertLessEqual(len(page['employees']), limit)
+            employees.extend(page['employees'])
+            if not page['next_cursor']:
+                return employees
+            query['cursor'] = page['next_cursor']
+
+    def test_every_sort_pages_through_all_rows_once(self):
+        create_employees()
+        create_employees('Sales')
+        for sort in SORT_COLUMNS:
+            for order in ('asc', 'desc'):
+                with self.subTest(sort=sort, order=order):
+                    employees = self.walk(sort, order)
+                    expected = sorted(employees, key=lambda e: (e[sort], e['id']), reverse=order == 'desc')
+                    self.assertEqual([e['id'] for e in employees], [e['id'] for e in expected])
+                    self.assertEqual(len(employees), len(ROWS))
+                    self.assertEqual({e['department'] for e in employees}, {'Platform'})
+
+    def test_rejects_bad_parameters(self):
+        for query in ('sort=email', 'order=sideways', 'limit=0', 'cursor=not-a-cursor'):
+            with self.subTest(query=query):
+                self.assertEqual(self.api('GET', '/api/employees?' + query).code, 400)
+
+class ConditionalRequestTest(ApiTestCase):
+    def get(self, path, etag=None):
+        return self.api('GET', path, headers={'If-None-Match': etag} if etag else None)
+
+    def test_list_answers_304_until_a_write(self):
+        ids = create_employees()
+        path = '/api/employees?sort=id&order=asc&limit=5'
+        first = self.get(path)
+        etag = first.headers['Etag']
+        self.assertEqual(first.code, 200)
+        self.assertEqual(self.get(path, etag).code, 304)
+        # Each query string has its own tag
+        self.assertNotEqual(self.get(path.replace('limit=5', 'limit=4')).headers['Etag'], etag)
+
+        # Usually in the same second as the import, so only the change log tells the versions apart
+        self.assertEqual(self.api('PUT', f'/api/profile/{ids[0]}', body={'name': 'Avery Stone'}).code, 200)
+        second = self.get(path, etag)
+        self.assertEqual(second.code, 200)
+        self.assertNotEqual(second.headers['Etag'], etag)
+        self.assertIn('Avery Stone', [e['name'] for e in json.loads(second.body)['employees']])
+
+        self.assertEqual(self.api('DELETE', f'/api/employees/{ids[1]}').code, 200)
+        third = self.get(path, second.headers['Etag'])
+        self.assertEqual(third.code, 200)
+        self.assertNotIn(ids[1], [e['id'] for e in json.loads(third.body)['employees']])
+
+    def test_detail_answers_304_until_the_employee_changes(self):
+        ids = create_employees()
+        path = f'/api/employees/{ids[0]}'
+        first = self.get(path)
+        etag = first.headers['Etag']
+        self.assertEqual(self.get(path, etag).code, 304)
+        # Writes to other employees leave it alone
+        self.assertEqual(self.api('PUT', f'/api/profile/{ids[1]}', body={'name': 'Blake Moss'}).code, 200)
+        self.assertEqual(self.get(path, etag).code, 304)
+
+        self.assertEqual(self.api('PUT', f'/api/profile/{ids[0]}', body={'name': 'Avery Stone'}).code, 200)
+        second = self.get(path, etag)
+        self.assertEqual(second.code, 200)
+        self.assertNotEqual(second.headers['Etag'], etag)
+        self.assertEqual(json.loads(second.body)['name'], 'Avery Stone')
+
+    def test_errors_carry_no_validators(self):
+        response = self.get('/api/employees?sort=email')
+        self.assertEqual(response.code, 400)
+        self.assertNotIn('Etag', response.headers)
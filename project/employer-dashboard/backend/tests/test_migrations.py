@@ -0,0 +1,52 @@
+import os
+import pytest
+import migrations
+from db_sqlite import SQLiteDatabase
+from migrations import LATEST_VERSION, MIGRATIONS, Migration, migrate
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    database = SQLiteDatabase(os.fspath(tmp_path / 'fresh.db'))
+    yield database
+    database.close_all()
+
+def scalar(database, sql):
+    with database.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        value = cursor.fetchone()[0]
+        cursor.close()
+    return value
+
+def test_migrates_an_empty_database_to_the_latest_version(fresh_db):
+    with fresh_db.connection() as connection:
+        assert migrate(fresh_db, connection) == LATEST_VERSION
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM schema_version") == len(MIGRATIONS)
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM users WHERE username = 'admin'") == 1
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_revoked_tokens_expires_at'") == 1
+
+def test_rerunning_is_a_no_op(fresh_db):
+    fresh_db.initialize_database()
+    fresh_db.initialize_database()
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM schema_version") == len(MIGRATIONS)
+
+def test_every_migration_is_safe_to_apply_again(fresh_db):
+    fresh_db.initialize_database()
+    # A database from before schema_version existed is adopted by running them all once more
+    with fresh_db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("DROP TABLE schema_version")
+        cursor.close()
+        assert migrate(fresh_db, connection) == LATEST_VERSION
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM users WHERE username = 'admin'") == 1
+
+def test_a_failed_migration_stops_startup(fresh_db, monkeypatch):
+    def broken(db, cursor):
+        cursor.execute("CREATE TABLE broken (")
+
+    last = MIGRATIONS[-1]
+    monkeypatch.setattr(migrations, 'MIGRATIONS', MIGRATIONS[:-1] + [Migration(last.version, last.description, broken)])
+    with pytest.raises(fresh_db.Error):
+        fresh_db.initialize_database()
+    # SQLite rolls the whole run back, so the next start begins again from 0
+    assert scalar(fresh_db, "SELECT COUNT(*) FROM sqlite_master WHERE name = 'schema_version'") == 0
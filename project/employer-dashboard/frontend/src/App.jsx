@@ -7,6 +7,7 @@ import Employees from './pages/Employees'
 import AddEmployee from './pages/AddEmployee'
 import Profile from './pages/Profile'
 import About from './pages/About'
+import { apiFetch } from './api'
 import './App.css'
 
 function App() {
@@ -28,6 +29,13 @@ function App() {
   }
   
   const handleLogout = () => {
+    apiFetch('/api/logout', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ refresh_token: user.refreshToken })
+    }).catch(() => {})
     setUser(null)
     localStorage.removeItem('user')
   }
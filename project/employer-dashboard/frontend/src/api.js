@@ -0,0 +1,99 @@
+const API_BASE = 'http://localhost:8000'
+
+const loadSession = () => {
+  const savedUser = localStorage.getItem('user')
+  return savedUser ? JSON.parse(savedUser) : null
+}
+
+const refreshTokens = async (session) => {
+  const response = await fetch(`${API_BASE}/api/token/refresh`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ refresh_token: session.refreshToken })
+  })
+  if (!response.ok) {
+    return null
+  }
+  const tokens = await response.json()
+  const updated = { ...session, token: tokens.access_token, refreshToken: tokens.refresh_token }
+  localStorage.setItem('user', JSON.stringify(updated))
+  return updated
+}
+
+// fetch() for the API: sends the bearer token and renews it once when it has expired
+export const apiFetch = async (path, options = {}) => {
+  let session = loadSession()
+  const send = (token) => fetch(`${API_BASE}${path}`, {
+    ...options,
+    headers: {
+      ...(options.headers || {}),
+      ...(token ? { Authorization: `Bearer ${token}` } : {})
+    }
+  })
+
+  let response = await send(session && session.token)
+  if (response.status === 401 && session) {
+    session = session.refreshToken ? await refreshTokens(session) : null
+    if (session) {
+      response = await send(session.token)
+    } else {
+      // Session can't be renewed (or predates tokens), so sign in again
+      localStorage.removeItem('user')
+      window.location.reload()
+    }
+  }
+  return response
+}
+
+const RECONNECT_DELAY_MS = 3000
+// Close code the change feed uses when the access token runs out
+const TOKEN_EXPIRED = 4001
+
+// Live employee changes over a WebSocket: calls onMessage with each message, and
+// reconnects after a drop, resuming from the last sequence number seen.
+// Returns a function that stops the subscription.
+export const subscribeChanges = (onMessage) => {
+  let socket = null
+  let seq = null
+  let stopped = false
+  let retryTimer = null
+
+  const connect = () => {
+    const session = loadSession()
+    if (stopped || !session || !session.token) {
+      return
+    }
+    const params = new URLSearchParams({ token: session.token })
+    if (seq !== null) {
+      params.set('since', seq)
+    }
+    socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/api/employees/changes?${params}`)
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      seq = message.seq
+      onMessage(message)
+    }
+    socket.onclose = async (event) => {
+      if (stopped) {
+        return
+      }
+      if (event.code === TOKEN_EXPIRED && !(session.refreshToken && await refreshTokens(session))) {
+        return
+      }
+      retryTimer = setTimeout(connect, RECONNECT_DELAY_MS)
+    }
+  }
+
+  connect()
+  return () => {
+    stopped = true
+    clearTimeout(retryTimer)
+    if (socket) {
+      socket.close()
+    }
+  }
+}
+
+export default API_BASE
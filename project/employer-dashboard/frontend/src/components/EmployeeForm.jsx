@@ -1,4 +1,5 @@
 import React, { useState } from 'react'
+import { apiFetch } from '../api'
 
 function EmployeeForm({ onEmployeeAdded }) {
   const [formData, setFormData] = useState({
@@ -75,7 +76,7 @@ function EmployeeForm({ onEmployeeAdded }) {
     
     try {
       setLoading(true)
-      const response = await fetch('http://localhost:8000/api/employees', {
+      const response = await apiFetch('/api/employees', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -1,9 +1,27 @@
 import React, { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
+import { apiFetch, subscribeChanges } from '../api'
+
+const PAGE_SIZE = 100
+const MIN_SEARCH_LENGTH = 2
+const SEARCH_DELAY_MS = 250
+
+// Folds one change feed event into the loaded employees
+const applyChange = (employees, event) => {
+  if (event.op === 'deleted') {
+    return employees.filter(employee => employee.id !== event.id)
+  }
+  if (event.op === 'created') {
+    return [{ id: event.id, ...event.fields }, ...employees.filter(employee => employee.id !== event.id)]
+  }
+  return employees.map(employee => employee.id === event.id ? { ...employee, ...event.fields } : employee)
+}
 
 function EmployeeList({ user }) {
   const [employees, setEmployees] = useState([])
-  const [filteredEmployees, setFilteredEmployees] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [searchResults, setSearchResults] = useState(null)
   const [loading, setLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState('')
   const [message, setMessage] = useState('')
@@ -13,28 +31,58 @@ function EmployeeList({ user }) {
     fetchEmployees()
   }, [])
   
+  // Keep the list current as employees are added, edited and removed
+  useEffect(() => subscribeChanges((message) => {
+    if (message.type === 'changes') {
+      setEmployees(prev => message.events.reduce(applyChange, prev))
+    } else if (message.type === 'resync') {
+      fetchEmployees()
+    }
+  }), [])
+  
   useEffect(() => {
-    if (searchTerm.trim() === '') {
-      setFilteredEmployees(employees)
-    } else {
-      const filtered = employees.filter(employee =>
-        employee.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        employee.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        employee.position.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        employee.department.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        employee.id.toString().includes(searchTerm)
+    const query = searchTerm.trim()
+    if (query.length < MIN_SEARCH_LENGTH) {
+      setSearchResults(null)
+      return
+    }
+    // Wait for a pause in typing before asking the server
+    const timer = setTimeout(() => searchEmployees(query, 0), SEARCH_DELAY_MS)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
+  
+  const searchEmployees = async (query, offset) => {
+    try {
+      const response = await apiFetch(
+        `/api/employees/search?q=${encodeURIComponent(query)}&limit=${PAGE_SIZE}&offset=${offset}`
       )
-      setFilteredEmployees(filtered)
+      if (response.ok) {
+        const data = await response.json()
+        setSearchResults(prev => ({
+          query,
+          employees: offset > 0 && prev ? [...prev.employees, ...data.employees] : data.employees,
+          total: data.total,
+          nextOffset: data.next_offset
+        }))
+      } else {
+        showMessage('Failed to search employees', 'error')
+      }
+    } catch (error) {
+      console.error('Error searching employees:', error)
+      showMessage('Error connecting to server', 'error')
     }
-  }, [employees, searchTerm])
+  }
+  
+  const filteredEmployees = searchResults ? searchResults.employees : employees
   
   const fetchEmployees = async () => {
     try {
       setLoading(true)
-      const response = await fetch('http://localhost:8000/api/employees')
+      const response = await apiFetch(`/api/employees?limit=${PAGE_SIZE}`)
       if (response.ok) {
         const data = await response.json()
-        setEmployees(data)
+        setEmployees(data.employees)
+        setNextCursor(data.next_cursor)
       } else {
         showMessage('Failed to fetch employees', 'error')
       }
@@ -46,16 +94,44 @@ function EmployeeList({ user }) {
     }
   }
   
+  const loadMore = async () => {
+    if (searchResults) {
+      setLoadingMore(true)
+      await searchEmployees(searchResults.query, searchResults.nextOffset)
+      setLoadingMore(false)
+      return
+    }
+    try {
+      setLoadingMore(true)
+      const response = await apiFetch(`/api/employees?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`)
+      if (response.ok) {
+        const data = await response.json()
+        setEmployees(prev => [...prev, ...data.employees])
+        setNextCursor(data.next_cursor)
+      } else {
+        showMessage('Failed to fetch employees', 'error')
+      }
+    } catch (error) {
+      console.error('Error fetching employees:', error)
+      showMessage('Error connecting to server', 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+  
   const handleDelete = async (id, name) => {
     if (window.confirm(`Are you sure you want to delete ${name}?`)) {
       try {
-        const response = await fetch(`http://localhost:8000/api/employees/${id}`, {
+        const response = await apiFetch(`/api/employees/${id}`, {
           method: 'DELETE'
         })
         
         if (response.ok) {
           showMessage('Employee deleted successfully!', 'success')
           fetchEmployees()
+          if (searchResults) {
+            searchEmployees(searchResults.query, 0)
+          }
         } else {
           const errorData = await response.json()
           showMessage(errorData.error || 'Failed to delete employee', 'error')
@@ -108,9 +184,9 @@ function EmployeeList({ user }) {
           className="search-input"
         />
         
-        {searchTerm && (
+        {searchResults && (
           <div className="search-info">
-            Showing {filteredEmployees.length} of {employees.length} employees
+            Showing {filteredEmployees.length} of {searchResults.total} matching employees
             <button 
               onClick={() => setSearchTerm('')}
               className="clear-search"
@@ -125,7 +201,7 @@ function EmployeeList({ user }) {
         <div className="loading">Loading employees...</div>
       ) : filteredEmployees.length === 0 ? (
         <div className="no-results">
-          {searchTerm ? (
+          {searchResults ? (
             <div>
               <h3>No employees found</h3>
               <p>No employees match your search: "{searchTerm}"</p>
@@ -182,6 +258,17 @@ function EmployeeList({ user }) {
               ))}
             </tbody>
           </table>
+          {(searchResults ? searchResults.nextOffset !== null : nextCursor) && (
+            <div style={{ textAlign: 'center', padding: '1rem' }}>
+              <button
+                className="btn btn-secondary"
+                onClick={loadMore}
+                disabled={loadingMore}
+              >
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
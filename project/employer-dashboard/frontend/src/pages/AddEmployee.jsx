@@ -1,5 +1,6 @@
 import React, { useState } from 'react'
 import { useNavigate } from 'react-router-dom'
+import { apiFetch } from '../api'
 
 function AddEmployee() {
   const navigate = useNavigate()
@@ -65,7 +66,7 @@ function AddEmployee() {
     
     try {
       setLoading(true)
-      const response = await fetch('http://localhost:8000/api/employees', {
+      const response = await apiFetch('/api/employees', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react'
+import { apiFetch } from '../api'
 
 function Home() {
   const [stats, setStats] = useState({
@@ -15,10 +16,15 @@ function Home() {
   
   const fetchEmployeeStats = async () => {
     try {
-      const response = await fetch('http://localhost:8000/api/employees')
+      const response = await apiFetch('/api/stats')
       if (response.ok) {
-        const employees = await response.json()
-        calculateStats(employees)
+        const summary = await response.json()
+        setStats({
+          totalEmployees: summary.total_employees,
+          totalSalary: summary.total_salary,
+          departments: summary.department_count,
+          avgSalary: summary.average_salary
+        })
       }
     } catch (error) {
       console.error('Error fetching employee stats:', error)
@@ -27,20 +33,6 @@ function Home() {
     }
   }
   
-  const calculateStats = (employees) => {
-    const totalEmployees = employees.length
-    const totalSalary = employees.reduce((sum, emp) => sum + parseFloat(emp.salary || 0), 0)
-    const departments = new Set(employees.map(emp => emp.department)).size
-    const avgSalary = totalEmployees > 0 ? totalSalary / totalEmployees : 0
-    
-    setStats({
-      totalEmployees,
-      totalSalary,
-      departments,
-      avgSalary
-    })
-  }
-  
   const formatCurrency = (amount) => {
     return new Intl.NumberFormat('en-US', {
       style: 'currency',
@@ -38,7 +38,7 @@ function Login({ onLogin }) {
       const data = await response.json()
       
       if (response.ok) {
-        onLogin(data.user)
+        onLogin({ ...data.user, token: data.access_token, refreshToken: data.refresh_token })
       } else {
         setError(data.error || 'Login failed')
       }
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { useParams } from 'react-router-dom'
+import { apiFetch } from '../api'
 
 function Profile({ user }) {
   const { id } = useParams()
@@ -37,7 +38,7 @@ function Profile({ user }) {
     try {
       setLoading(true)
       console.log(`🔄 Fetching employee ID: ${profileId}`)
-      const response = await fetch(`http://localhost:8000/api/profile/${profileId}`)
+      const response = await apiFetch(`/api/profile/${profileId}`)
       
       console.log(`📊 Response status: ${response.status}`)
       
@@ -78,7 +79,7 @@ function Profile({ user }) {
     e.preventDefault()
     
     try {
-      const response = await fetch(`http://localhost:8000/api/profile/${profileId}`, {
+      const response = await apiFetch(`/api/profile/${profileId}`, {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',